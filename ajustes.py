@@ -0,0 +1,70 @@
+"""Ajustes de usuario guardados en MongoDB.
+
+``st.session_state`` vive en la memoria del proceso que atiende la sesión:
+se pierde al recargar la página y no existe en las demás réplicas. Los
+ajustes que deben persistir (por ejemplo, los enlaces de ThingSpeak) se
+guardan en la colección ``ajustes_usuario``, un documento por usuario.
+
+Si la app tiene login de Streamlit (``[auth]`` en secrets.toml), los
+ajustes se guardan con el correo de la cuenta. Sin login se acepta el
+parámetro ``?usuario=`` de la URL, que es solo un espacio de nombres y no una
+identidad: cualquiera que conozca el valor puede leer o cambiar esos
+ajustes, así que no debe guardarse ahí nada privado. Los visitantes sin uno
+ni otro no escriben nada en la base y sus ajustes quedan en la sesión.
+"""
+from datetime import datetime, timezone
+
+import streamlit as st
+
+COLECCION_AJUSTES = "ajustes_usuario"
+# Prefijo de los documentos de cuentas autenticadas (no se acepta desde la URL)
+PREFIJO_CUENTA = "cuenta:"
+
+
+def usuario_actual():
+    """Cuenta autenticada o espacio ``?usuario=...`` de la sesión; None si es anónimo"""
+    try:
+        if st.user.get("is_logged_in") is True and st.user.get("email"):
+            return PREFIJO_CUENTA + st.user["email"]
+    except Exception:
+        pass  # Streamlit sin st.user (versiones anteriores a 1.42)
+    espacio = st.query_params.get("usuario")
+    if not espacio or espacio.startswith(PREFIJO_CUENTA):
+        return None
+    return espacio
+
+
+class Ajustes:
+    """Lectura y escritura de los ajustes de un usuario"""
+
+    def __init__(self, coleccion, usuario):
+        self.coleccion = coleccion
+        self.usuario = usuario
+
+    def leer(self, clave, defecto=None):
+        documento = self.coleccion.find_one({"_id": self.usuario}, {clave: 1})
+        if documento is None or clave not in documento:
+            return defecto
+        return documento[clave]
+
+    def guardar(self, clave, valor):
+        self.coleccion.update_one(
+            {"_id": self.usuario},
+            {"$set": {clave: valor, "actualizado": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+    def agregar(self, clave, valor):
+        """Agregar ``valor`` a la lista ``clave`` si no estaba (crea el documento si falta)"""
+        self.coleccion.update_one(
+            {"_id": self.usuario},
+            {"$addToSet": {clave: valor}, "$set": {"actualizado": datetime.now(timezone.utc)}},
+            upsert=True,
+        )
+
+    def quitar(self, clave, valor):
+        """Quitar ``valor`` de la lista ``clave``"""
+        self.coleccion.update_one(
+            {"_id": self.usuario},
+            {"$pull": {clave: valor}, "$set": {"actualizado": datetime.now(timezone.utc)}},
+        )
@@ -0,0 +1,260 @@
+"""Análisis espacio-temporal de fauna, clima y sensores IoT.
+
+Los registros se resumen por día y zona (celdas de ``ZONA`` grados) con
+pipelines de agregación en MongoDB y el resultado se guarda en la colección
+``analitica_diaria``: a Streamlit solo llegan filas ya agrupadas, nunca los
+registros crudos. Al actualizar, cada día se compara con el conteo del
+resumen del dashboard (``resumen.py``, que se incrementa con cada registro
+insertado) y solo se recalculan los días que recibieron registros nuevos.
+
+Las tendencias diarias o semanales por zona cruzan los avistamientos con la
+lectura de clima más reciente de la misma zona (``merge_asof``, hasta
+``TOLERANCIA_CLIMA`` antes) y, opcionalmente, con el promedio diario de un
+sensor de ThingSpeak guardado en el almacén de series.
+
+Reconstrucción completa (si se borran registros o cambia ``ZONA``)::
+
+    python analitica.py
+"""
+import os
+
+import pandas as pd
+from pymongo import ReplaceOne
+
+from geo import CAMPO_GEO
+from resumen import COLECCION_RESUMEN, centro_celda, conteos
+
+COLECCION_ANALITICA = "analitica_diaria"
+# Tamaño en grados de las zonas de análisis (~55 km en el ecuador)
+ZONA = float(os.environ.get("ANALITICA_ZONA", "0.5"))
+# Días que se recalculan por consulta de agregación
+DIAS_POR_LOTE = 60
+# Antigüedad máxima de la lectura de clima que acompaña a un avistamiento
+TOLERANCIA_CLIMA = pd.Timedelta(days=3)
+TOLERANCIA_IOT = pd.Timedelta(days=1)
+# Rangos de temperatura (°C) del histograma de lecturas de clima
+LIMITES_TEMPERATURA = [-10, 0, 5, 10, 15, 20, 25, 30, 35, 50]
+# Intensidad de lluvia (1-10) agrupada para cruzar con las especies
+LIMITES_INTENSIDAD = [0, 3, 6, 10]
+NIVELES_INTENSIDAD = ["Baja (1-3)", "Media (4-6)", "Alta (7-10)"]
+SIN_LLUVIA = ("No", "Sin lluvia")
+# Cambia cuando cambian los pipelines: los días calculados con otro esquema se recalculan
+ESQUEMA = 2
+
+
+def _intensidad_lluvia():
+    # El formulario guarda intensidad 1 aunque no llueva: solo cuentan las lecturas con lluvia
+    return {"$avg": {"$cond": [{"$in": ["$lluvia", list(SIN_LLUVIA)]}, None, "$intensidad"]}}
+
+
+def _zona(tamano):
+    coordenada = f"${CAMPO_GEO}.coordinates"
+    return {
+        "x": {"$floor": {"$divide": [{"$arrayElemAt": [coordenada, 0]}, tamano]}},
+        "y": {"$floor": {"$divide": [{"$arrayElemAt": [coordenada, 1]}, tamano]}},
+    }
+
+
+def pipeline_fauna(dias, tamano=ZONA):
+    """Avistamientos e individuos por día, zona, tipo y especie"""
+    return [
+        {"$match": {"fecha": {"$in": dias}, CAMPO_GEO: {"$exists": True}}},
+        {"$group": {
+            "_id": {"dia": "$fecha", **_zona(tamano), "tipo": "$tipo", "especie": "$especie"},
+            "n": {"$sum": 1},
+            "cantidad": {"$sum": "$cantidad"},
+        }},
+    ]
+
+
+def pipeline_clima(dias, tamano=ZONA):
+    """Lecturas, temperatura, lecturas con lluvia e intensidad media de esas lecturas por día y zona"""
+    return [
+        {"$match": {"fecha": {"$in": dias}, CAMPO_GEO: {"$exists": True}}},
+        {"$group": {
+            "_id": {"dia": "$fecha", **_zona(tamano)},
+            "n": {"$sum": 1},
+            "temperatura": {"$avg": "$temperatura"},
+            "intensidad": _intensidad_lluvia(),
+            "con_lluvia": {"$sum": {"$cond": [{"$in": ["$lluvia", list(SIN_LLUVIA)]}, 0, 1]}},
+        }},
+    ]
+
+
+PIPELINES = {"catalogo_fauna": pipeline_fauna, "registros_clima": pipeline_clima}
+
+
+def asegurar_analitica(analitica):
+    """Índice de la colección de resultados"""
+    analitica.create_index([("clase", 1), ("coleccion", 1), ("zona_grados", 1), ("dia", 1)], name="clase_coleccion_dia")
+
+
+def dias_pendientes(analitica, resumen, nombre, tamano=ZONA):
+    """``{dia: n}`` de los días cuyo conteo en el resumen cambió desde el último cálculo"""
+    actuales = conteos(resumen, nombre, "dia")
+    calculados = {
+        d["dia"]: d["n"]
+        for d in analitica.find({"clase": "version", "coleccion": nombre, "zona_grados": tamano, "esquema": ESQUEMA},
+                                {"dia": 1, "n": 1})
+    }
+    return {dia: n for dia, n in actuales.items() if calculados.get(dia) != n}
+
+
+def recalcular(analitica, coleccion, nombre, dias, tamano=ZONA):
+    """Agregar en MongoDB los días indicados (``{dia: n}``) y reemplazar sus filas guardadas"""
+    filas = []
+    for f in coleccion.aggregate(PIPELINES[nombre](list(dias), tamano), allowDiskUse=True):
+        clave = f.pop("_id")
+        x, y = int(clave.pop("x")), int(clave.pop("y"))
+        filas.append({"clase": "dato", "coleccion": nombre, "zona_grados": tamano, "zona": f"{x}:{y}", **clave, **f})
+    filtro = {"clase": "dato", "coleccion": nombre, "zona_grados": tamano, "dia": {"$in": list(dias)}}
+    analitica.delete_many(filtro)
+    if filas:
+        analitica.insert_many(filas, ordered=False)
+    # El conteo que se guarda es el leído antes de agregar: si llegó algo
+    # mientras tanto, el día vuelve a quedar pendiente
+    analitica.bulk_write([
+        ReplaceOne({"_id": f"version|{nombre}|{tamano}|{dia}"},
+                   {"clase": "version", "coleccion": nombre, "zona_grados": tamano, "dia": dia, "n": n,
+                    "esquema": ESQUEMA}, upsert=True)
+        for dia, n in dias.items()
+    ], ordered=False)
+    return len(filas)
+
+
+def actualizar(db, tamano=ZONA):
+    """Recalcular solo los días con registros nuevos; devuelve ``{coleccion: dias}``"""
+    analitica, resumen = db[COLECCION_ANALITICA], db[COLECCION_RESUMEN]
+    recalculados = {}
+    for nombre in PIPELINES:
+        pendientes = sorted(dias_pendientes(analitica, resumen, nombre, tamano).items())
+        for i in range(0, len(pendientes), DIAS_POR_LOTE):
+            recalcular(analitica, db[nombre], nombre, dict(pendientes[i:i + DIAS_POR_LOTE]), tamano)
+        recalculados[nombre] = len(pendientes)
+    return recalculados
+
+
+def reconstruir(db, tamano=ZONA):
+    """Borrar los resultados guardados y recalcular todos los días"""
+    db[COLECCION_ANALITICA].delete_many({"zona_grados": tamano})
+    return actualizar(db, tamano)
+
+
+def diarios(analitica, nombre, desde, hasta, tamano=ZONA, zona=None):
+    """Filas diarias guardadas de una colección entre dos fechas (inclusive)"""
+    filtro = {"clase": "dato", "coleccion": nombre, "zona_grados": tamano, "dia": {"$gte": str(desde), "$lte": str(hasta)}}
+    if zona:
+        filtro["zona"] = zona
+    df = pd.DataFrame(list(analitica.find(filtro, {"_id": 0, "clase": 0, "coleccion": 0, "zona_grados": 0})))
+    if df.empty:
+        return df
+    df["dia"] = pd.to_datetime(df["dia"], errors="coerce")
+    return df[df["dia"].notna()]
+
+
+def zonas(analitica, tamano=ZONA):
+    """Zonas con datos y el centro (lat, lon) de cada una"""
+    claves = analitica.distinct("zona", {"clase": "dato", "zona_grados": tamano})
+    return {z: centro_celda(z, tamano) for z in sorted(claves)}
+
+
+def _con_clima(fauna, clima):
+    """Cada fila de fauna con la lectura de clima más reciente de su zona"""
+    if clima.empty:
+        return fauna.assign(temperatura=float("nan"), intensidad=float("nan"), con_lluvia=float("nan"))
+    return pd.merge_asof(
+        fauna.sort_values("dia"),
+        clima[["dia", "zona", "temperatura", "intensidad", "con_lluvia"]].sort_values("dia"),
+        on="dia", by="zona", direction="backward", tolerance=TOLERANCIA_CLIMA,
+    )
+
+
+def iot_diario(store, canal, campo, desde, hasta):
+    """Promedio diario de un campo del almacén de series (``dia``, ``iot``)"""
+    from datetime import datetime
+
+    inicio = datetime.combine(desde, datetime.min.time())
+    fin = datetime.combine(hasta, datetime.max.time())
+    serie = store.consultar(canal, campo, inicio, fin, puntos=max((hasta - desde).days + 1, 1))
+    if serie.empty:
+        return pd.DataFrame(columns=["dia", "iot"])
+    diario = serie["mean"].resample("D").mean().dropna()
+    return pd.DataFrame({"dia": diario.index.tz_localize(None), "iot": diario.to_numpy()})
+
+
+def tendencias(analitica, desde, hasta, frecuencia="D", zona=None, iot=None, tamano=ZONA):
+    """Avistamientos por periodo y zona junto al clima (y al sensor IoT) de esos días.
+
+    ``frecuencia`` es ``"D"`` (diaria) o ``"W"`` (semanal); ``iot`` es el
+    resultado de ``iot_diario`` o None.
+    """
+    fauna = diarios(analitica, "catalogo_fauna", desde, hasta, tamano, zona)
+    clima = diarios(analitica, "registros_clima", desde, hasta, tamano, zona)
+    columnas = ["periodo", "zona", "avistamientos", "individuos", "temperatura", "intensidad", "con_lluvia", "iot"]
+    if fauna.empty:
+        return pd.DataFrame(columns=columnas)
+    por_dia = (fauna.groupby(["dia", "zona"], as_index=False)
+               .agg(avistamientos=("n", "sum"), individuos=("cantidad", "sum")))
+    unida = _con_clima(por_dia, clima)
+    if iot is not None and not iot.empty:
+        unida = pd.merge_asof(unida.sort_values("dia"), iot.sort_values("dia"), on="dia",
+                              direction="nearest", tolerance=TOLERANCIA_IOT)
+    else:
+        unida["iot"] = float("nan")
+    unida["periodo"] = unida["dia"].dt.to_period(frecuencia).dt.start_time
+    resultado = (unida.groupby(["periodo", "zona"], as_index=False)
+                 .agg(avistamientos=("avistamientos", "sum"), individuos=("individuos", "sum"),
+                      temperatura=("temperatura", "mean"), intensidad=("intensidad", "mean"),
+                      iot=("iot", "mean")))
+    # Las lecturas con lluvia se suman sobre el clima del periodo, no sobre la unión:
+    # merge_asof copia una misma lectura a varios días de avistamientos
+    if clima.empty:
+        resultado["con_lluvia"] = float("nan")
+    else:
+        clima["periodo"] = clima["dia"].dt.to_period(frecuencia).dt.start_time
+        lluvia = clima.groupby(["periodo", "zona"], as_index=False).agg(con_lluvia=("con_lluvia", "sum"))
+        resultado = resultado.merge(lluvia, on=["periodo", "zona"], how="left")
+    return resultado[columnas]
+
+
+def especies_por_lluvia(analitica, desde, hasta, zona=None, tamano=ZONA):
+    """Avistamientos de cada especie según la intensidad de lluvia de la zona ese día"""
+    fauna = diarios(analitica, "catalogo_fauna", desde, hasta, tamano, zona)
+    clima = diarios(analitica, "registros_clima", desde, hasta, tamano, zona)
+    if fauna.empty:
+        return pd.DataFrame()
+    fauna["especie"] = fauna["especie"].where(fauna["especie"].fillna("") != "", fauna["tipo"]).fillna("Sin dato")
+    unida = _con_clima(fauna, clima)
+    unida["lluvia"] = pd.cut(unida["intensidad"], LIMITES_INTENSIDAD, labels=NIVELES_INTENSIDAD,
+                             include_lowest=True).astype(object)
+    # Con lectura de clima pero sin lecturas con lluvia: día seco
+    unida.loc[unida["con_lluvia"] == 0, "lluvia"] = "Sin lluvia"
+    unida["lluvia"] = unida["lluvia"].fillna("Sin lectura")
+    tabla = unida.pivot_table(index="especie", columns="lluvia", values="n", aggfunc="sum", fill_value=0)
+    orden = ["Sin lluvia", *NIVELES_INTENSIDAD, "Sin lectura"]
+    return tabla[[c for c in orden if c in tabla.columns]]
+
+
+def distribucion_temperatura(coleccion, desde, hasta, limites=LIMITES_TEMPERATURA):
+    """Lecturas de clima por rango de temperatura (``$bucket`` en el servidor)"""
+    pipeline = [
+        {"$match": {"fecha": {"$gte": str(desde), "$lte": str(hasta)}, "temperatura": {"$type": "number"}}},
+        {"$bucket": {"groupBy": "$temperatura", "boundaries": limites, "default": "fuera",
+                     "output": {"lecturas": {"$sum": 1}, "intensidad": _intensidad_lluvia()}}},
+    ]
+    filas = []
+    for b in coleccion.aggregate(pipeline):
+        i = limites.index(b["_id"]) if b["_id"] in limites else None
+        rango = "Fuera de rango" if i is None else f"{limites[i]} a {limites[i + 1]} °C"
+        filas.append({"rango": rango, "lecturas": b["lecturas"], "intensidad": b.get("intensidad")})
+    return pd.DataFrame(filas, columns=["rango", "lecturas", "intensidad"])
+
+
+if __name__ == "__main__":
+    from mongo import MongoManager, base_datos, uri
+
+    manager = MongoManager(uri, base_datos)
+    asegurar_analitica(manager.collection(COLECCION_ANALITICA))
+    for nombre, dias in reconstruir(manager.db).items():
+        print(f"{nombre}: {dias} días recalculados")
+    manager.close()
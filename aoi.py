@@ -0,0 +1,131 @@
+"""Áreas de interés (AOI) y agregaciones por polígono.
+
+Los puntos de cada fuente (fauna, clima, filas de un CSV) se cargan una sola
+vez en un ``STRtree`` de shapely, con sus atributos en un DataFrame alineado
+por posición. Un área dibujada o subida se resuelve con una consulta al
+árbol (primero por rectángulos, después el predicado exacto sobre los
+candidatos), sin recorrer los registros uno por uno en Python.
+"""
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import mapping, shape
+
+from geo import CAMPO_GEO
+
+# Formatos de AOI que se aceptan al subir un archivo
+EXTENSIONES_AREA = ["geojson", "json", "kml", "gpkg", "zip"]
+
+
+def area_desde_geojson(datos):
+    """Unir los polígonos de un GeoJSON (FeatureCollection, Feature o geometría)"""
+    if isinstance(datos, (str, bytes)):
+        datos = json.loads(datos)
+    if datos.get("type") == "FeatureCollection":
+        geometrias = [f["geometry"] for f in datos.get("features", []) if f.get("geometry")]
+    elif datos.get("type") == "Feature":
+        geometrias = [datos["geometry"]] if datos.get("geometry") else []
+    else:
+        geometrias = [datos]
+    return _poligonal([shape(g) for g in geometrias])
+
+
+def leer_area(contenido, nombre):
+    """Área de interés a partir de un archivo subido (GeoJSON, KML, GeoPackage o shapefile en .zip)"""
+    extension = os.path.splitext(nombre)[1].lower().lstrip(".")
+    if extension in ("geojson", "json"):
+        return area_desde_geojson(contenido)
+    import geopandas as gpd
+
+    gdf = gpd.read_file(io.BytesIO(contenido))
+    if gdf.crs is not None:
+        gdf = gdf.to_crs(epsg=4326)
+    return _poligonal(list(gdf.geometry.dropna()))
+
+
+def _poligonal(geometrias):
+    poligonos = [g for g in geometrias if g.geom_type in ("Polygon", "MultiPolygon")]
+    if not poligonos:
+        raise ValueError("El área de interés no contiene polígonos")
+    return shapely.make_valid(shapely.union_all(poligonos))
+
+
+def geojson_de_area(area):
+    """Geometría GeoJSON (dict) para guardar el área en ``st.session_state``"""
+    return mapping(area)
+
+
+def version_coleccion(coleccion):
+    """Versión barata de una colección para invalidar índices cacheados.
+
+    Cambia al insertar (último ``_id``) o al borrar (conteo estimado, que sale
+    de los metadatos de la colección sin recorrerla).
+    """
+    ultimo = coleccion.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    return f"{ultimo['_id'] if ultimo else ''}:{coleccion.estimated_document_count()}"
+
+
+class IndiceEspacial:
+    """Puntos con atributos y un STRtree para consultar qué puntos caen en un área"""
+
+    def __init__(self, lon, lat, atributos=None):
+        lon = np.asarray(lon, dtype="float64")
+        lat = np.asarray(lat, dtype="float64")
+        self.puntos = shapely.points(lon, lat)
+        self.arbol = shapely.STRtree(self.puntos)
+        self.atributos = (pd.DataFrame(index=range(len(lon))) if atributos is None
+                          else atributos.reset_index(drop=True))
+
+    def __len__(self):
+        return len(self.puntos)
+
+    @classmethod
+    def desde_coleccion(cls, coleccion, campos=()):
+        """Construir el índice con los puntos GeoJSON de una colección de MongoDB"""
+        proyeccion = {f"{CAMPO_GEO}.coordinates": 1, "_id": 0, **{c: 1 for c in campos}}
+        lon, lat, filas = [], [], []
+        for doc in coleccion.find({CAMPO_GEO: {"$exists": True}}, proyeccion):
+            x, y = doc.pop(CAMPO_GEO)["coordinates"]
+            lon.append(x)
+            lat.append(y)
+            filas.append(doc)
+        return cls(lon, lat, pd.DataFrame.from_records(filas, columns=list(campos)))
+
+    @classmethod
+    def desde_dataframe(cls, df, columna_lat, columna_lon):
+        """Construir el índice con las filas de un DataFrame que tengan coordenadas numéricas"""
+        # Columnas detectadas como texto ("4,5", "N/D"...): lo que no es número queda fuera
+        lat = pd.to_numeric(df[columna_lat], errors="coerce")
+        lon = pd.to_numeric(df[columna_lon], errors="coerce")
+        validas = lat.notna() & lon.notna()
+        atributos = df[validas].drop(columns=[columna_lat, columna_lon])
+        return cls(lon[validas].to_numpy(), lat[validas].to_numpy(), atributos)
+
+    def dentro(self, area):
+        """Posiciones (ordenadas) de los puntos dentro del área, incluido el borde"""
+        return np.sort(self.arbol.query(area, predicate="intersects"))
+
+    def agregar(self, area, medias=(), sumas=(), por=None):
+        """Resumen de los puntos dentro del área.
+
+        Devuelve ``registros``, la media de cada columna de ``medias``, la
+        suma de cada columna de ``sumas`` y, si se indica ``por``, el conteo
+        de registros por valor de esa columna.
+        """
+        seleccion = self.atributos.iloc[self.dentro(area)]
+        resumen = {"registros": len(seleccion)}
+        resumen["medias"] = {c: _numerica(seleccion, c).mean() for c in medias}
+        resumen["sumas"] = {c: _numerica(seleccion, c).sum() for c in sumas}
+        if por is not None:
+            resumen["por"] = seleccion[por].fillna("—").value_counts() if por in seleccion else pd.Series(dtype="int64")
+        return resumen
+
+
+def _numerica(df, columna):
+    if columna not in df:
+        return pd.Series(dtype="float64")
+    return pd.to_numeric(df[columna], errors="coerce")
@@ -0,0 +1,478 @@
+"""Benchmarks reproducibles de los caminos más costosos de la app.
+
+Todo corre sin red ni servidor: los registros de campo se insertan en una
+base ``mongomock`` en memoria, ThingSpeak se reemplaza por un servidor HTTP
+local que sirve ``feeds.json`` con los parámetros ``results``/``start``/
+``end``, y las imágenes, CSV y feeds se generan con una semilla fija. Por
+cada caso se informa el mejor tiempo de varias repeticiones, el rendimiento
+(unidades por segundo) y la memoria pico de Python (``tracemalloc``, en una
+corrida aparte para no afectar los tiempos; no incluye los buffers de Arrow
+ni las páginas mapeadas de las imágenes).
+
+Los resultados se comparan con ``benchmark_base.json``: un caso cuyo tiempo
+supera la base en más de ``--tolerancia`` (con los mismos parámetros) cuenta
+como regresión y el proceso termina con código 1. Uso::
+
+    pip install -r requirements-dev.txt
+    python benchmark.py                         # todos los casos
+    python benchmark.py --casos drone,mapa --megapixeles 200
+    python benchmark.py --guardar-base          # actualizar la base
+"""
+import argparse
+import json
+import os
+import platform
+import re
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+BASE = os.path.join(RAIZ, "benchmark_base.json")
+SEMILLA = 934
+REPETICIONES = 3
+# Un caso es regresión si tarda más que la base multiplicada por este factor
+TOLERANCIA = 1.25
+CANAL = "1293177"
+INICIO_FEEDS = datetime(2024, 1, 1, tzinfo=timezone.utc)
+SEGUNDOS_ENTRE_FEEDS = 20
+FORMATO_FEED = "%Y-%m-%dT%H:%M:%SZ"
+# Zona de los registros sintéticos (alrededor de Bogotá)
+LAT, LON, RADIO = 4.6097, -74.0817, 2.0
+ESPECIES = ("Colibrí", "Garza", "Tucán", "Mono aullador", "Rana dorada", "Danta", "Cóndor", "Oso de anteojos")
+TIPOS = ("Ave", "Mamífero", "Anfibio", "Reptil")
+LLUVIAS = ("Sin lluvia", "Llovizna", "Moderada", "Fuerte")
+
+
+# --- Datos sintéticos ---
+
+def registros_fauna(n, semilla=SEMILLA):
+    """``n`` avistamientos con el formato que guardan los formularios"""
+    from geo import CAMPO_GEO, punto_geojson
+
+    rng = np.random.default_rng(semilla)
+    lat = LAT + rng.uniform(-RADIO, RADIO, n)
+    lon = LON + rng.uniform(-RADIO, RADIO, n)
+    dias = rng.integers(0, 365, n)
+    return [{
+        "fecha": str(INICIO_FEEDS.date() + timedelta(days=int(dias[i]))),
+        "ubicacion": f"{lat[i]:.5f},{lon[i]:.5f}",
+        CAMPO_GEO: punto_geojson(lat[i], lon[i]),
+        "tipo": TIPOS[i % len(TIPOS)],
+        "especie": ESPECIES[i % len(ESPECIES)],
+        "cantidad": int(rng.integers(1, 30)),
+    } for i in range(n)]
+
+
+def registros_clima(n, semilla=SEMILLA + 1):
+    """``n`` registros de clima con el formato que guardan los formularios"""
+    from geo import CAMPO_GEO, punto_geojson
+
+    rng = np.random.default_rng(semilla)
+    lat = LAT + rng.uniform(-RADIO, RADIO, n)
+    lon = LON + rng.uniform(-RADIO, RADIO, n)
+    temperatura = rng.normal(18, 6, n)
+    return [{
+        "fecha": str(INICIO_FEEDS.date() + timedelta(days=i % 365)),
+        "ubicacion": f"{lat[i]:.5f},{lon[i]:.5f}",
+        CAMPO_GEO: punto_geojson(lat[i], lon[i]),
+        "lluvia": LLUVIAS[i % len(LLUVIAS)],
+        "temperatura": round(float(temperatura[i]), 1),
+        "intensidad": i % 5,
+    } for i in range(n)]
+
+
+def feeds_sinteticos(n, campos=4, semilla=SEMILLA):
+    """``n`` entradas de ``feeds.json`` cada ``SEGUNDOS_ENTRE_FEEDS``, con valores como texto"""
+    rng = np.random.default_rng(semilla)
+    valores = rng.normal(20, 5, (n, campos)).round(2)
+    # Algunas lecturas faltan, como en los canales reales
+    vacios = rng.random((n, campos)) < 0.02
+    feeds = []
+    for i in range(n):
+        entrada = {
+            "created_at": (INICIO_FEEDS + timedelta(seconds=i * SEGUNDOS_ENTRE_FEEDS)).strftime(FORMATO_FEED),
+            "entry_id": i + 1,
+        }
+        for c in range(campos):
+            entrada[f"field{c + 1}"] = None if vacios[i, c] else str(valores[i, c])
+        feeds.append(entrada)
+    return feeds
+
+
+def csv_sintetico(ruta, filas, semilla=SEMILLA):
+    """CSV satelital con coordenadas, fecha, bandas numéricas y una clase de texto"""
+    import pandas as pd
+
+    rng = np.random.default_rng(semilla)
+    pd.DataFrame({
+        "fecha": pd.date_range("2024-01-01", periods=filas, freq="min").strftime("%Y-%m-%d %H:%M:%S"),
+        "latitud": (LAT + rng.uniform(-RADIO, RADIO, filas)).round(6),
+        "longitud": (LON + rng.uniform(-RADIO, RADIO, filas)).round(6),
+        "ndvi": rng.uniform(-1, 1, filas).round(4),
+        "temperatura": rng.normal(18, 6, filas).round(2),
+        "banda_nir": rng.integers(0, 10000, filas),
+        "cobertura": rng.choice(["Bosque", "Pastizal", "Cultivo", "Agua", "Urbano"], filas),
+    }).to_csv(ruta, index=False)
+    return ruta
+
+
+def imagen_sintetica(ruta, megapixeles, semilla=SEMILLA):
+    """TIFF RGB sin comprimir de ``megapixeles`` escrito por bandas (memoria acotada)"""
+    import tifffile
+
+    ancho = int(np.sqrt(megapixeles * 1e6 * 4 / 3))
+    alto = int(megapixeles * 1e6 // ancho)
+    imagen = tifffile.memmap(ruta, shape=(alto, ancho, 3), dtype=np.uint8, photometric="rgb")
+    rng = np.random.default_rng(semilla)
+    # Tonos de vegetación, suelo y ruido para que todas las clases aparezcan
+    paleta = np.array([[60, 140, 50], [150, 130, 60], [120, 80, 40], [90, 90, 90]], np.uint8)
+    filas = max(4_000_000 // ancho, 1)
+    for y in range(0, alto, filas):
+        fin = min(y + filas, alto)
+        bloque = paleta[rng.integers(0, len(paleta), (fin - y, ancho))]
+        bloque = bloque.astype(np.int16) + rng.integers(-25, 26, (fin - y, ancho, 3), dtype=np.int16)
+        imagen[y:fin] = np.clip(bloque, 0, 255)
+    imagen.flush()
+    del imagen
+    return ruta
+
+
+# --- ThingSpeak local ---
+
+class _ThingSpeakLocal(BaseHTTPRequestHandler):
+    feeds = []
+    _ruta = re.compile(r"^/channels/(\w+)/feeds\.json$")
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        m = self._ruta.match(url.path)
+        if not m:
+            self.send_error(404)
+            return
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+        feeds = self.feeds
+        # ThingSpeak compara fechas "YYYY-MM-DD HH:MM:SS"; con el formato ISO basta comparar texto
+        if "start" in params:
+            inicio = params["start"].replace(" ", "T") + "Z"
+            feeds = [f for f in feeds if f["created_at"] >= inicio]
+        if "end" in params:
+            fin = params["end"].replace(" ", "T") + "Z"
+            feeds = [f for f in feeds if f["created_at"] <= fin]
+        # Como la API: las últimas ``results`` entradas (100 por defecto, 8000 como máximo)
+        feeds = feeds[-min(int(params.get("results", 100)), 8000):]
+        cuerpo = json.dumps({
+            "channel": {"id": int(m.group(1)), "name": "Canal sintético", "field1": "Temperatura",
+                        "field2": "Humedad", "field3": "Presión", "field4": "Luz",
+                        "last_entry_id": len(self.feeds)},
+            "feeds": feeds,
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def servidor_thingspeak(feeds):
+    """Servidor ``feeds.json`` en un puerto libre de 127.0.0.1; devuelve ``(servidor, url_base)``"""
+    manejador = type("ThingSpeakLocal", (_ThingSpeakLocal,), {"feeds": feeds})
+    servidor = ThreadingHTTPServer(("127.0.0.1", 0), manejador)
+    threading.Thread(target=servidor.serve_forever, name="thingspeak-local", daemon=True).start()
+    return servidor, f"http://127.0.0.1:{servidor.server_address[1]}"
+
+
+def base_mongo():
+    """Base de datos ``mongomock`` en memoria"""
+    try:
+        import mongomock
+    except ImportError:
+        sys.exit("Los benchmarks necesitan mongomock: pip install -r requirements-dev.txt")
+    return mongomock.MongoClient()["geodata_benchmark"]
+
+
+# --- Casos ---
+#
+# Cada caso recibe los parámetros y una carpeta temporal y devuelve
+# ``(unidades, nombre_unidad, preparar)``: ``preparar()`` deja todo listo
+# fuera de la medición y devuelve la función que se mide.
+
+def caso_drone(p, carpeta):
+    from drone import analizar_imagen
+
+    ruta = imagen_sintetica(os.path.join(carpeta, "ortomosaico.tif"), p.megapixeles)
+    # La LUT se construye una vez por proceso; se deja fuera de la medición
+    analizar_imagen(ruta, vista_previa=True)
+    return p.megapixeles, "MP", lambda: (lambda: analizar_imagen(ruta, mapa=True))
+
+
+def caso_mapa_marcadores(p, carpeta):
+    from geo import CAMPO_GEO, filtro_viewport
+    from mapa import puntos_clima, puntos_fauna
+
+    db = base_mongo()
+    db.catalogo_fauna.insert_many(registros_fauna(p.registros))
+    db.registros_clima.insert_many(registros_clima(p.registros))
+    filtro = filtro_viewport(None)
+
+    def marcadores():
+        # Igual que el dashboard: consulta con proyección y un marcador por documento
+        fauna = list(db.catalogo_fauna.find(filtro, {CAMPO_GEO: 1, "tipo": 1, "especie": 1, "cantidad": 1, "fotos": 1, "_id": 0}))
+        clima = list(db.registros_clima.find(filtro, {CAMPO_GEO: 1, "lluvia": 1, "temperatura": 1, "fotos": 1, "_id": 0}))
+        return puntos_fauna(fauna, {}), puntos_clima(clima, {})
+
+    return 2 * p.registros, "registros", lambda: marcadores
+
+
+def caso_mapa_folium(p, carpeta):
+    import folium
+
+    from mapa import agregar_puntos_al_mapa, puntos_clima, puntos_fauna
+
+    fauna = puntos_fauna(registros_fauna(p.registros))
+    clima = puntos_clima(registros_clima(p.registros))
+
+    def construir():
+        m = folium.Map(location=[LAT, LON], zoom_start=8, tiles="OpenStreetMap")
+        agregar_puntos_al_mapa(m, fauna, "green")
+        agregar_puntos_al_mapa(m, clima, "blue")
+        # st_folium serializa el mapa a HTML en cada rerun
+        return m.get_root().render()
+
+    return 2 * p.registros, "marcadores", lambda: construir
+
+
+def caso_thingspeak(p, carpeta):
+    from thingspeak import ThingSpeakClient, feeds_a_dataframe
+
+    servidor, url = servidor_thingspeak(feeds_sinteticos(p.feeds))
+    carpeta.servidores.append(servidor)
+
+    def preparar():
+        # Cliente nuevo en cada repetición: carga inicial completa, sin caché
+        client = ThingSpeakClient(base_url=url, ttl=0)
+        return lambda: feeds_a_dataframe(client.feeds(CANAL, results=p.feeds))
+
+    return p.feeds, "entradas", preparar
+
+
+def caso_feeds_dataframe(p, carpeta):
+    from thingspeak import feeds_a_dataframe
+
+    data = {"channel": {"id": int(CANAL)}, "feeds": feeds_sinteticos(p.feeds)}
+    return p.feeds, "entradas", lambda: (lambda: feeds_a_dataframe(data))
+
+
+def caso_series(p, carpeta):
+    from series import SeriesStore
+
+    # Tres páginas de 8000 entradas: ejercita la paginación hacia atrás
+    n = 3 * p.feeds
+    feeds = feeds_sinteticos(n)
+    servidor, url = servidor_thingspeak(feeds)
+    carpeta.servidores.append(servidor)
+    desde = INICIO_FEEDS.replace(tzinfo=None)
+
+    def preparar():
+        from thingspeak import ThingSpeakClient
+
+        ruta = os.path.join(carpeta.ruta, f"series_{time.monotonic_ns()}.sqlite")
+        store, client = SeriesStore(ruta), ThingSpeakClient(base_url=url, ttl=0)
+        return lambda: store.sincronizar(client, CANAL, desde)
+
+    return n, "entradas", preparar
+
+
+def caso_csv(p, carpeta):
+    from ingesta import cargar_parquet, csv_a_parquet
+
+    ruta = csv_sintetico(os.path.join(carpeta.ruta, "satelite.csv"), p.filas_csv)
+
+    def preparar():
+        # Caché vacía en cada repetición para medir la conversión completa
+        destino = tempfile.mkdtemp(dir=carpeta.ruta)
+
+        def convertir():
+            parquet, metadatos = csv_a_parquet(ruta, destino)
+            return cargar_parquet(parquet, ["latitud", "longitud", "ndvi"])
+        return convertir
+
+    return p.filas_csv, "filas", preparar
+
+
+def caso_aoi(p, carpeta):
+    import shapely
+
+    from aoi import IndiceEspacial
+
+    db = base_mongo()
+    db.catalogo_fauna.insert_many(registros_fauna(p.registros * 10))
+    area = shapely.Polygon([(LON - 1, LAT - 1), (LON + 0.5, LAT - 1.2), (LON + 1, LAT + 0.8), (LON - 0.7, LAT + 1)])
+
+    def agregar():
+        indice = IndiceEspacial.desde_coleccion(db.catalogo_fauna, ("tipo", "especie", "cantidad"))
+        return indice.agregar(area, sumas=("cantidad",), por="especie")
+
+    return p.registros * 10, "registros", lambda: agregar
+
+
+CASOS = {
+    "drone:analizar_imagen": caso_drone,
+    "mapa:marcadores": caso_mapa_marcadores,
+    "mapa:folium": caso_mapa_folium,
+    "thingspeak:feeds": caso_thingspeak,
+    "thingspeak:feeds_a_dataframe": caso_feeds_dataframe,
+    "series:sincronizar": caso_series,
+    "ingesta:csv_a_parquet": caso_csv,
+    "aoi:agregar": caso_aoi,
+}
+
+
+# --- Medición ---
+
+class _Carpeta:
+    """Carpeta temporal del benchmark y servidores locales que hay que cerrar"""
+
+    def __init__(self):
+        self.ruta = tempfile.mkdtemp(prefix="geodata_benchmark_")
+        self.servidores = []
+
+    def __fspath__(self):
+        return self.ruta
+
+    def cerrar(self):
+        for servidor in self.servidores:
+            servidor.shutdown()
+            servidor.server_close()
+        shutil.rmtree(self.ruta, ignore_errors=True)
+
+
+def medir_caso(nombre, p):
+    """Mejor tiempo de ``p.repeticiones`` corridas y memoria pico de una corrida extra"""
+    carpeta = _Carpeta()
+    try:
+        unidades, unidad, preparar = CASOS[nombre](p, carpeta)
+        tiempos = []
+        for _ in range(p.repeticiones):
+            funcion = preparar()
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        funcion = preparar()
+        tracemalloc.start()
+        try:
+            funcion()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        carpeta.cerrar()
+    segundos = min(tiempos)
+    return {
+        "segundos": round(segundos, 4),
+        "mediana": round(sorted(tiempos)[len(tiempos) // 2], 4),
+        "unidades": unidades,
+        "unidad": unidad,
+        "por_segundo": round(unidades / segundos, 1) if segundos else None,
+        "pico_mb": round(pico / 2**20, 1),
+        "parametros": parametros_caso(nombre, p),
+    }
+
+
+def parametros_caso(nombre, p):
+    """Parámetros de los que depende un caso (la base solo se compara si coinciden)"""
+    if nombre.startswith("drone"):
+        return {"megapixeles": p.megapixeles}
+    if nombre.startswith(("thingspeak", "series")):
+        return {"feeds": p.feeds}
+    if nombre.startswith("ingesta"):
+        return {"filas_csv": p.filas_csv}
+    return {"registros": p.registros}
+
+
+def comparar(resultados, base, tolerancia=TOLERANCIA):
+    """``{caso: razón}`` respecto a la base y lista de casos que empeoraron"""
+    razones, regresiones = {}, []
+    for nombre, r in resultados.items():
+        anterior = base.get("casos", {}).get(nombre)
+        if not anterior or anterior.get("parametros") != r["parametros"]:
+            continue
+        razones[nombre] = r["segundos"] / anterior["segundos"] if anterior["segundos"] else 1.0
+        if razones[nombre] > tolerancia:
+            regresiones.append(nombre)
+    return razones, regresiones
+
+
+def entorno():
+    """Datos de la máquina para interpretar la base"""
+    return {"python": platform.python_version(), "sistema": platform.platform(),
+            "procesador": platform.machine(), "cpus": os.cpu_count()}
+
+
+def argumentos(args=None):
+    parser = argparse.ArgumentParser(description="Benchmarks reproducibles de geodata")
+    parser.add_argument("--casos", help="Casos a correr separados por coma (prefijos: drone,mapa,...)")
+    parser.add_argument("--registros", type=int, default=1000, help="Registros de fauna y de clima")
+    parser.add_argument("--feeds", type=int, default=8000, help="Entradas de ThingSpeak por página")
+    parser.add_argument("--megapixeles", type=int, default=20, help="Tamaño de la imagen de drone (20-200)")
+    parser.add_argument("--filas-csv", type=int, default=200_000, help="Filas del CSV satelital")
+    parser.add_argument("--repeticiones", type=int, default=REPETICIONES)
+    parser.add_argument("--base", default=BASE, help="Archivo JSON con los resultados de referencia")
+    parser.add_argument("--tolerancia", type=float, default=TOLERANCIA)
+    parser.add_argument("--guardar-base", action="store_true", help="Guardar estos resultados como base")
+    parser.add_argument("--salida", help="Guardar también los resultados en este JSON")
+    return parser.parse_args(args)
+
+
+def main(args=None):
+    p = argumentos(args)
+    sys.path.insert(0, RAIZ)
+    prefijos = [c.strip() for c in p.casos.split(",")] if p.casos else None
+    nombres = [n for n in CASOS if prefijos is None or any(n.startswith(c) for c in prefijos)]
+    base = {}
+    if os.path.exists(p.base):
+        with open(p.base) as f:
+            base = json.load(f)
+
+    resultados = {}
+    for nombre in nombres:
+        resultados[nombre] = medir_caso(nombre, p)
+    razones, regresiones = comparar(resultados, base, p.tolerancia)
+
+    print(f"{'caso':32} {'mejor s':>9} {'rendimiento':>22} {'pico MB':>9} {'vs base':>8}")
+    for nombre, r in resultados.items():
+        rendimiento = f"{r['por_segundo']:,.0f} {r['unidad']}/s"
+        razon = f"{razones[nombre]:.2f}x" if nombre in razones else "—"
+        marca = "  ❌" if nombre in regresiones else ""
+        print(f"{nombre:32} {r['segundos']:9.3f} {rendimiento:>22} {r['pico_mb']:9.1f} {razon:>8}{marca}")
+
+    documento = {"fecha": datetime.now(timezone.utc).strftime(FORMATO_FEED), "entorno": entorno(), "casos": resultados}
+    if p.salida:
+        with open(p.salida, "w") as f:
+            json.dump(documento, f, ensure_ascii=False, indent=2)
+    if p.guardar_base:
+        # Se conservan los casos de la base que no se corrieron esta vez
+        documento["casos"] = {**base.get("casos", {}), **resultados}
+        with open(p.base, "w") as f:
+            json.dump(documento, f, ensure_ascii=False, indent=2)
+            f.write("\n")
+        print(f"Base guardada en {p.base}")
+    elif regresiones:
+        print(f"❌ {len(regresiones)} caso(s) superan {p.tolerancia:.2f}x el tiempo de la base: {', '.join(regresiones)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
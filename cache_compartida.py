@@ -0,0 +1,167 @@
+"""Caché compartida entre procesos de la app.
+
+Con un solo ``streamlit run`` basta la memoria del proceso; con varias
+réplicas detrás de un balanceador (y los trabajadores de ``trabajos.py``)
+cada proceso tendría su propia copia y repetiría las mismas consultas.
+``CACHE_URL`` elige dónde se guardan los valores:
+
+- ``redis://host:6379/0``: Redis o un servidor compatible (Valkey, KeyDB);
+  requiere ``pip install redis``.
+- ``disco:/ruta``: un archivo por clave en un directorio compartido (por
+  ejemplo, un volumen montado en todas las réplicas).
+- vacío: memoria del proceso, como en el modo de un solo servidor.
+
+Los valores se guardan con pickle, así que el servidor o el directorio
+deben ser de uso exclusivo de la app.
+"""
+import functools
+import hashlib
+import os
+import pickle
+import threading
+import time
+
+import streamlit as st
+
+CACHE_URL = os.environ.get("CACHE_URL", "")
+PREFIJO = os.environ.get("CACHE_PREFIJO", "geodata:")
+
+
+class CacheMemoria:
+    """Valores con vencimiento en la memoria del proceso"""
+
+    compartida = False
+
+    def __init__(self):
+        self._valores = {}
+        self._lock = threading.Lock()
+
+    def obtener(self, clave):
+        with self._lock:
+            valor, vence = self._valores.get(clave, (None, None))
+            if vence is not None and vence < time.time():
+                del self._valores[clave]
+                return None
+            return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        with self._lock:
+            self._valores[clave] = (valor, time.time() + ttl if ttl else None)
+
+    def borrar(self, clave):
+        with self._lock:
+            self._valores.pop(clave, None)
+
+
+class CacheDisco:
+    """Un archivo pickle por clave; el vencimiento va al inicio del archivo"""
+
+    compartida = True
+
+    def __init__(self, directorio):
+        self.directorio = directorio
+        os.makedirs(directorio, exist_ok=True)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, hashlib.blake2b(clave.encode(), digest_size=20).hexdigest())
+
+    def obtener(self, clave):
+        try:
+            with open(self._ruta(clave), "rb") as archivo:
+                vence, valor = pickle.load(archivo)
+        except (FileNotFoundError, EOFError, pickle.UnpicklingError):
+            return None
+        if vence is not None and vence < time.time():
+            self.borrar(clave)
+            return None
+        return valor
+
+    def guardar(self, clave, valor, ttl=None):
+        # Escritura atómica: los demás procesos ven el archivo viejo o el nuevo completo
+        ruta = self._ruta(clave)
+        temporal = f"{ruta}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temporal, "wb") as archivo:
+            pickle.dump((time.time() + ttl if ttl else None, valor), archivo, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporal, ruta)
+
+    def borrar(self, clave):
+        try:
+            os.remove(self._ruta(clave))
+        except FileNotFoundError:
+            pass
+
+
+class CacheRedis:
+    """Valores en Redis con ``SET ... PX`` (el servidor se encarga del vencimiento)"""
+
+    compartida = True
+
+    def __init__(self, url, prefijo=PREFIJO):
+        import redis
+
+        self.cliente = redis.Redis.from_url(url)
+        self.prefijo = prefijo
+
+    def obtener(self, clave):
+        datos = self.cliente.get(self.prefijo + clave)
+        return None if datos is None else pickle.loads(datos)
+
+    def guardar(self, clave, valor, ttl=None):
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        self.cliente.set(self.prefijo + clave, datos, px=int(ttl * 1000) if ttl else None)
+
+    def borrar(self, clave):
+        self.cliente.delete(self.prefijo + clave)
+
+
+def crear_cache(url=CACHE_URL):
+    """Backend según ``url`` (ver el docstring del módulo)"""
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return CacheRedis(url)
+    if url.startswith("disco:"):
+        return CacheDisco(url[len("disco:"):])
+    if url:
+        raise ValueError(f"CACHE_URL no reconocida: {url}")
+    return CacheMemoria()
+
+
+@st.cache_resource
+def get_cache_compartida():
+    """Backend de caché único por proceso"""
+    return crear_cache()
+
+
+def clave_llamada(funcion, args, kwargs):
+    """Clave estable para una llamada: nombre de la función y hash de sus argumentos"""
+    h = hashlib.blake2b(pickle.dumps((args, sorted(kwargs.items())), protocol=4), digest_size=16)
+    return f"{funcion.__module__}.{funcion.__qualname__}:{h.hexdigest()}"
+
+
+def en_cache(ttl):
+    """Decorador al estilo de ``st.cache_data(ttl=...)`` sobre la caché compartida.
+
+    Todas las réplicas ven el mismo resultado: la función se ejecuta como
+    mucho una vez por ``ttl`` en todo el despliegue (salvo llamadas
+    simultáneas antes de la primera escritura). Los resultados ``None`` no se
+    guardan.
+    """
+    def decorador(funcion):
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            cache = get_cache_compartida()
+            clave = clave_llamada(funcion, args, kwargs)
+            try:
+                resultado = cache.obtener(clave)
+            except Exception:
+                # Una caché caída no debe tumbar la vista: se calcula de nuevo
+                resultado = None
+            if resultado is None:
+                resultado = funcion(*args, **kwargs)
+                if resultado is not None:
+                    try:
+                        cache.guardar(clave, resultado, ttl)
+                    except Exception:
+                        pass
+            return resultado
+        return envoltura
+    return decorador
@@ -0,0 +1,293 @@
+"""Importación y exportación masiva de registros de fauna y clima.
+
+La importación lee el archivo (CSV o Parquet) por bloques con ``pyarrow``,
+normaliza cada bloque con operaciones vectorizadas de pandas (ubicación
+"lat,lon" o columnas de latitud/longitud, fecha, números y listas) y lo
+escribe con ``insert_many`` sin orden en lotes de ``LOTE`` registros. Las
+filas sin ubicación o fecha válidas se rechazan y se informan. Si el archivo
+trae ``_id`` (por ejemplo, una exportación anterior), volver a importarlo no
+duplica nada.
+
+La exportación recorre la colección con un cursor y escribe cada lote al
+archivo a medida que llega, sin tener la colección completa en memoria.
+
+Uso por consola::
+
+    python carga_masiva.py importar catalogo_fauna historico_fauna.csv
+    python carga_masiva.py exportar registros_clima clima.parquet
+"""
+import os
+import re
+from dataclasses import dataclass, field
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+import pytz
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+from cola_escritura import CLAVE_DUPLICADA
+from geo import CAMPO_GEO, punto_geojson
+from ingesta import detectar_columnas
+from resumen import registrar
+
+LOTE = int(os.environ.get("CARGA_LOTE", "5000"))
+BLOQUE_BYTES = 4 * 1024 * 1024
+# Filas rechazadas que se conservan para mostrar (el total se cuenta siempre)
+MAX_RECHAZOS = 100
+FORMATOS = ("csv", "parquet")
+# Campos de cada colección según su tipo; ``fecha`` y la ubicación son obligatorios
+TEXTOS = {
+    "catalogo_fauna": ("hora", "tipo", "especie", "descripcion", "condiciones", "timestamp"),
+    "registros_clima": ("hora", "lluvia", "observaciones", "timestamp"),
+}
+ENTEROS = {
+    "catalogo_fauna": ("cantidad",),
+    "registros_clima": ("intensidad",),
+}
+REALES = {
+    "catalogo_fauna": (),
+    "registros_clima": ("temperatura",),
+}
+LISTAS = {
+    "catalogo_fauna": ("comportamiento",),
+    "registros_clima": (),
+}
+SEPARADOR_LISTA = ";"
+# Zona de las fechas y horas que guardan los formularios (comun.timezone)
+ZONA_HORARIA = pytz.timezone("America/Bogota")
+
+_UBICACION = r"^\s*([-+]?\d+(?:\.\d+)?)\s*[,\s]\s*([-+]?\d+(?:\.\d+)?)\s*$"
+_OBJECT_ID = re.compile(r"^[0-9a-fA-F]{24}$")
+
+
+@dataclass
+class ResultadoCarga:
+    """Resumen de una importación"""
+    leidos: int = 0
+    insertados: int = 0
+    repetidos: int = 0  # ya estaban en la colección (mismo _id)
+    rechazados: int = 0
+    motivos: list = field(default_factory=list)  # (fila, motivo) de los primeros rechazos
+
+
+def formato_de(nombre):
+    """``csv`` o ``parquet`` según la extensión del archivo"""
+    extension = os.path.splitext(str(nombre))[1].lower().lstrip(".")
+    formato = "parquet" if extension in ("parquet", "pq") else extension
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato no soportado: {extension or nombre} (se aceptan CSV y Parquet)")
+    return formato
+
+
+def leer_bloques(origen, formato):
+    """DataFrames sucesivos de un CSV o Parquet (ruta o bytes), sin cargar el archivo entero"""
+    fuente = pa.BufferReader(origen) if isinstance(origen, (bytes, bytearray)) else origen
+    if formato == "parquet":
+        for lote in pq.ParquetFile(fuente).iter_batches(batch_size=LOTE):
+            yield lote.to_pandas()
+        return
+    # Todo como texto: la conversión y validación se hacen al normalizar
+    lectura = pacsv.ReadOptions(block_size=BLOQUE_BYTES)
+    nombres = pacsv.open_csv(fuente, read_options=lectura).schema.names
+    if isinstance(fuente, pa.BufferReader):
+        fuente = pa.BufferReader(origen)
+    lector = pacsv.open_csv(fuente, read_options=lectura, convert_options=pacsv.ConvertOptions(
+        column_types={n: pa.string() for n in nombres}, strings_can_be_null=True,
+    ))
+    for lote in lector:
+        yield lote.to_pandas()
+
+
+def _coordenadas(df):
+    detectadas = detectar_columnas(list(df.columns))
+    if detectadas["lat"] and detectadas["lon"]:
+        lat = pd.to_numeric(df[detectadas["lat"]], errors="coerce")
+        lon = pd.to_numeric(df[detectadas["lon"]], errors="coerce")
+    elif "ubicacion" in df:
+        partes = df["ubicacion"].astype("string").str.extract(_UBICACION)
+        lat = pd.to_numeric(partes[0], errors="coerce")
+        lon = pd.to_numeric(partes[1], errors="coerce")
+    else:
+        raise ValueError("El archivo no tiene columna 'ubicacion' ni columnas de latitud/longitud")
+    return lat, lon
+
+
+def _texto(serie):
+    serie = serie.astype("string").str.strip()
+    return serie.where(serie != "")
+
+
+def normalizar(df, nombre, fila0=0):
+    """Documentos listos para insertar y ``[(fila, motivo)]`` de las filas rechazadas.
+
+    ``fila0`` es el número de la primera fila del bloque en el archivo (para
+    los mensajes).
+    """
+    df = df.reset_index(drop=True)
+    lat, lon = _coordenadas(df)
+    # lat/lon son Float64 con <NA> donde no se pudo leer: esas filas también se rechazan
+    ubicacion_ok = (lat.between(-90, 90) & lon.between(-180, 180)).fillna(False).astype(bool)
+    if "fecha" in df:
+        fecha = pd.to_datetime(df["fecha"], errors="coerce")
+    elif "timestamp" in df:
+        # Instante absoluto: la fecha (y la hora, si falta) son las locales, como en los formularios
+        fecha = pd.to_datetime(df["timestamp"], errors="coerce", utc=True).dt.tz_convert(ZONA_HORARIA)
+    else:
+        raise ValueError("El archivo no tiene columna 'fecha'")
+    fecha_ok = fecha.notna().fillna(False).astype(bool)
+
+    validas = ubicacion_ok & fecha_ok
+    rechazos = [(fila0 + i, "ubicación inválida" if not ubicacion_ok[i] else "fecha inválida")
+                for i in df.index[~validas]]
+    df, lat, lon, fecha = df[validas], lat[validas], lon[validas], fecha[validas]
+
+    salida = pd.DataFrame(index=df.index)
+    if "_id" in df:
+        ids = df["_id"].astype("string")
+        salida["_id"] = [ObjectId(i) if isinstance(i, str) and _OBJECT_ID.match(i) else None for i in ids]
+    salida["fecha"] = fecha.dt.strftime("%Y-%m-%d")
+    if "fecha" not in df and "hora" not in df:
+        salida["hora"] = fecha.dt.strftime("%H:%M:%S")
+    salida["ubicacion"] = lat.astype(str) + "," + lon.astype(str)
+    salida[CAMPO_GEO] = [punto_geojson(la, lo) for la, lo in zip(lat, lon)]
+    for campo in TEXTOS[nombre]:
+        if campo in df:
+            salida[campo] = _texto(df[campo])
+    for campo in ENTEROS[nombre]:
+        if campo in df:
+            salida[campo] = pd.to_numeric(df[campo], errors="coerce").round().astype("Int64")
+    for campo in REALES[nombre]:
+        if campo in df:
+            salida[campo] = pd.to_numeric(df[campo], errors="coerce")
+    for campo in LISTAS[nombre]:
+        if campo in df:
+            salida[campo] = [
+                v if isinstance(v, list) else
+                [p.strip() for p in str(v).split(SEPARADOR_LISTA) if p.strip()] if pd.notna(v) else []
+                for v in df[campo]
+            ]
+    # Los campos vacíos no se guardan (igual que un formulario sin ese dato)
+    salida = salida.astype(object).where(salida.notna(), None)
+    documentos = [{k: v for k, v in r.items() if v is not None} for r in salida.to_dict("records")]
+    return documentos, rechazos
+
+
+def insertar(coleccion, documentos):
+    """``insert_many`` sin orden; devuelve ``(insertados, repetidos)``"""
+    if not documentos:
+        return [], 0
+    try:
+        coleccion.insert_many(documentos, ordered=False)
+        return documentos, 0
+    except BulkWriteError as e:
+        errores = e.details.get("writeErrors", [])
+        # Registros con un _id que ya existe: importados antes, se omiten
+        if any(err.get("code") != CLAVE_DUPLICADA for err in errores):
+            raise
+        repetidos = {err["index"] for err in errores}
+        return [d for i, d in enumerate(documentos) if i not in repetidos], len(repetidos)
+
+
+def importar(coleccion, nombre, origen, formato=None, resumen=None, al_avanzar=None):
+    """Importar un CSV/Parquet (ruta o bytes) a la colección ``nombre``.
+
+    Si se indica ``resumen`` se actualizan los contadores del dashboard con
+    los registros insertados. ``al_avanzar(resultado)`` se llama tras cada
+    lote.
+    """
+    if nombre not in TEXTOS:
+        raise ValueError(f"Colección desconocida: {nombre}")
+    formato = formato or formato_de(origen)
+    resultado = ResultadoCarga()
+    for bloque in leer_bloques(origen, formato):
+        for inicio in range(0, len(bloque), LOTE):
+            documentos, rechazos = normalizar(bloque.iloc[inicio:inicio + LOTE], nombre, resultado.leidos)
+            resultado.leidos += min(LOTE, len(bloque) - inicio)
+            resultado.rechazados += len(rechazos)
+            resultado.motivos.extend(rechazos[:MAX_RECHAZOS - len(resultado.motivos)])
+            insertados, repetidos = insertar(coleccion, documentos)
+            resultado.insertados += len(insertados)
+            resultado.repetidos += repetidos
+            if resumen is not None and insertados:
+                registrar(resumen, nombre, insertados)
+            if al_avanzar:
+                al_avanzar(resultado)
+    return resultado
+
+
+def esquema_exportacion(nombre):
+    """Columnas y tipos del archivo exportado (iguales en todos los lotes)"""
+    return pa.schema(
+        [("_id", pa.string()), ("fecha", pa.string()), ("lat", pa.float64()), ("lon", pa.float64())]
+        + [(c, pa.string()) for c in TEXTOS[nombre]]
+        + [(c, pa.int64()) for c in ENTEROS[nombre]]
+        + [(c, pa.float64()) for c in REALES[nombre]]
+        + [(c, pa.string()) for c in LISTAS[nombre]]
+    )
+
+
+def _fila_exportada(doc, nombre):
+    fila = {"_id": str(doc["_id"]), "fecha": doc.get("fecha")}
+    punto = doc.get(CAMPO_GEO)
+    fila["lon"], fila["lat"] = punto["coordinates"] if punto else (None, None)
+    for campo in TEXTOS[nombre]:
+        fila[campo] = None if doc.get(campo) is None else str(doc[campo])
+    for campo in ENTEROS[nombre] + REALES[nombre]:
+        valor = doc.get(campo)
+        fila[campo] = valor if isinstance(valor, (int, float)) and not isinstance(valor, bool) else None
+    for campo in LISTAS[nombre]:
+        valor = doc.get(campo)
+        fila[campo] = f"{SEPARADOR_LISTA} ".join(map(str, valor)) if isinstance(valor, list) else valor
+    return fila
+
+
+def exportar(coleccion, nombre, destino, formato=None, filtro=None, lote=LOTE):
+    """Escribir los registros de la colección en un CSV/Parquet por lotes; devuelve cuántos"""
+    formato = formato or formato_de(destino)
+    esquema = esquema_exportacion(nombre)
+    proyeccion = {c: 1 for c in esquema.names if c not in ("lat", "lon")}
+    proyeccion[CAMPO_GEO] = 1
+    cursor = coleccion.find(filtro or {}, proyeccion, batch_size=lote)
+    escritor = (pq.ParquetWriter(destino, esquema, compression="zstd") if formato == "parquet"
+                else pacsv.CSVWriter(destino, esquema))
+    total, filas = 0, []
+    with escritor:
+        for doc in cursor:
+            filas.append(_fila_exportada(doc, nombre))
+            if len(filas) >= lote:
+                escritor.write_table(pa.Table.from_pylist(filas, schema=esquema))
+                total += len(filas)
+                filas = []
+        if filas or total == 0:
+            escritor.write_table(pa.Table.from_pylist(filas, schema=esquema))
+            total += len(filas)
+    return total
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from mongo import MongoManager, base_datos, uri
+    from resumen import COLECCION_RESUMEN
+
+    parser = argparse.ArgumentParser(description="Importación y exportación masiva de registros")
+    parser.add_argument("accion", choices=["importar", "exportar"])
+    parser.add_argument("coleccion", choices=list(TEXTOS))
+    parser.add_argument("archivo")
+    args = parser.parse_args()
+
+    manager = MongoManager(uri, base_datos)
+    coleccion = manager.collection(args.coleccion)
+    if args.accion == "importar":
+        r = importar(coleccion, args.coleccion, args.archivo, resumen=manager.collection(COLECCION_RESUMEN),
+                     al_avanzar=lambda r: print(f"\r{r.leidos:,} filas leídas, {r.insertados:,} insertadas", end=""))
+        print(f"\n{r.insertados:,} insertados, {r.repetidos:,} ya existían, {r.rechazados:,} rechazados")
+        for fila, motivo in r.motivos[:20]:
+            print(f"  fila {fila + 1}: {motivo}")
+    else:
+        total = exportar(coleccion, args.coleccion, args.archivo)
+        print(f"{total:,} registros exportados a {args.archivo}")
+    manager.close()
@@ -0,0 +1,207 @@
+"""Cola local de escritura para los registros de campo.
+
+Los formularios guardan cada registro en un archivo SQLite local (WAL) y
+responden de inmediato; un hilo de fondo los envía a MongoDB en lotes con
+``insert_many``. Cada registro recibe al encolarse un ``ObjectId`` que se usa
+como ``_id``, de modo que reintentar un lote ya enviado no duplica nada. Si
+no hay red, los registros esperan en disco y se reintenta con espera
+exponencial. Un registro que MongoDB rechaza (validación, tamaño) no frena
+a los demás: se reintenta hasta ``COLA_MAX_INTENTOS`` veces y luego pasa a
+la tabla ``descartados`` con el motivo.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+import bson
+import streamlit as st
+from bson import ObjectId
+from pymongo.errors import BulkWriteError
+
+COLA_DB = os.environ.get("COLA_DB", "cola_registros.sqlite")
+LOTE = int(os.environ.get("COLA_LOTE", "100"))
+# Espera entre revisiones de la cola cuando no hay nada pendiente
+INTERVALO = float(os.environ.get("COLA_INTERVALO", "5"))
+BACKOFF_MAX = float(os.environ.get("COLA_BACKOFF_MAX", "300"))
+# Rechazos de MongoDB por registro antes de pasarlo a ``descartados``
+MAX_INTENTOS = int(os.environ.get("COLA_MAX_INTENTOS", "5"))
+CLAVE_DUPLICADA = 11000
+# Límite de tamaño de un documento en MongoDB
+MAX_BSON = 16 * 1024 * 1024
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS pendientes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    coleccion TEXT NOT NULL,
+    clave TEXT NOT NULL UNIQUE,
+    documento TEXT NOT NULL,
+    intentos INTEGER NOT NULL DEFAULT 0,
+    creado REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS descartados (
+    id INTEGER PRIMARY KEY,
+    coleccion TEXT NOT NULL,
+    clave TEXT NOT NULL,
+    documento TEXT NOT NULL,
+    intentos INTEGER NOT NULL,
+    creado REAL NOT NULL,
+    error TEXT,
+    descartado REAL NOT NULL
+);
+"""
+
+
+class ColaEscritura:
+    """Registros pendientes en SQLite y envío por lotes a MongoDB en segundo plano.
+
+    ``coleccion(nombre)`` devuelve la colección de destino y
+    ``al_insertar(nombre, documentos)``, si se indica, se llama con los
+    documentos efectivamente insertados (por ejemplo, para el resumen del
+    dashboard).
+    """
+
+    def __init__(self, coleccion, al_insertar=None, ruta=COLA_DB, lote=LOTE, intervalo=INTERVALO):
+        self.ruta = ruta
+        self.coleccion = coleccion
+        self.al_insertar = al_insertar
+        self.lote = lote
+        self.intervalo = intervalo
+        self.ultimo_error = None
+        self._fallos = 0
+        self._escritura = threading.Lock()
+        self._aviso = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        with self._conectar() as con:
+            con.executescript(_ESQUEMA)
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def encolar(self, nombre, documento):
+        """Guardar un registro en disco y devolver su ``_id`` (hex)"""
+        clave = str(documento.get("_id") or ObjectId())
+        datos = json.dumps({k: v for k, v in documento.items() if k != "_id"}, default=str)
+        with self._escritura, self._conectar() as con:
+            con.execute(
+                "INSERT OR IGNORE INTO pendientes (coleccion, clave, documento, creado) VALUES (?, ?, ?, ?)",
+                (nombre, clave, datos, time.time()),
+            )
+        self.asegurar()
+        self._aviso.set()
+        return clave
+
+    def pendientes(self, nombre=None):
+        """Número de registros que aún no llegaron a MongoDB"""
+        with self._conectar() as con:
+            if nombre is None:
+                return con.execute("SELECT COUNT(*) FROM pendientes").fetchone()[0]
+            return con.execute("SELECT COUNT(*) FROM pendientes WHERE coleccion = ?", (nombre,)).fetchone()[0]
+
+    def descartados(self):
+        """Número de registros que MongoDB rechazó ``MAX_INTENTOS`` veces"""
+        with self._conectar() as con:
+            return con.execute("SELECT COUNT(*) FROM descartados").fetchone()[0]
+
+    def enviar(self):
+        """Enviar un lote por colección; devuelve cuántos registros salieron de la cola"""
+        with self._conectar() as con:
+            nombres = [n for (n,) in con.execute("SELECT DISTINCT coleccion FROM pendientes")]
+        enviados = 0
+        for nombre in nombres:
+            with self._conectar() as con:
+                filas = con.execute(
+                    "SELECT id, clave, documento FROM pendientes WHERE coleccion = ? ORDER BY id LIMIT ?",
+                    (nombre, self.lote),
+                ).fetchall()
+            enviados += self._enviar_lote(nombre, filas)
+        return enviados
+
+    def _enviar_lote(self, nombre, filas):
+        documentos = [dict(json.loads(doc), _id=ObjectId(clave)) for _, clave, doc in filas]
+        # Un documento demasiado grande haría fallar todo el insert_many: se aparta antes
+        fallidos = {i: "documento de más de 16 MB" for i, d in enumerate(documentos) if len(bson.encode(d)) > MAX_BSON}
+        a_enviar = [i for i in range(len(documentos)) if i not in fallidos]
+        repetidos = set()
+        try:
+            if a_enviar:
+                self.coleccion(nombre).insert_many([documentos[i] for i in a_enviar], ordered=False)
+        except BulkWriteError as e:
+            for err in e.details.get("writeErrors", []):
+                indice = a_enviar[err["index"]]
+                # Las claves duplicadas son registros que ya llegaron en un intento anterior
+                if err.get("code") == CLAVE_DUPLICADA:
+                    repetidos.add(indice)
+                else:
+                    fallidos[indice] = err.get("errmsg", str(err.get("code")))
+        insertados = [documentos[i] for i in a_enviar if i not in repetidos and i not in fallidos]
+
+        # Los enviados salen de la cola antes de avisar: si el aviso falla no se reenvían
+        salieron = [filas[i][0] for i in range(len(filas)) if i not in fallidos]
+        with self._escritura, self._conectar() as con:
+            con.executemany("DELETE FROM pendientes WHERE id = ?", [(i,) for i in salieron])
+            salieron += self._registrar_fallidos(con, [(filas[i][0], error) for i, error in fallidos.items()])
+        if fallidos:
+            self.ultimo_error = f"{len(fallidos)} registro(s) rechazados por MongoDB: {next(iter(fallidos.values()))}"
+        if insertados and self.al_insertar:
+            self.al_insertar(nombre, insertados)
+        return len(salieron)
+
+    def _registrar_fallidos(self, con, fallidos):
+        """Sumar un intento a cada rechazado; los que llegan al límite pasan a ``descartados``"""
+        descartados = []
+        for id_fila, error in fallidos:
+            con.execute("UPDATE pendientes SET intentos = intentos + 1 WHERE id = ?", (id_fila,))
+            intentos, = con.execute("SELECT intentos FROM pendientes WHERE id = ?", (id_fila,)).fetchone()
+            if intentos >= MAX_INTENTOS:
+                con.execute(
+                    "INSERT OR REPLACE INTO descartados (id, coleccion, clave, documento, intentos, creado, error, descartado) "
+                    "SELECT id, coleccion, clave, documento, intentos, creado, ?, ? FROM pendientes WHERE id = ?",
+                    (error, time.time(), id_fila),
+                )
+                con.execute("DELETE FROM pendientes WHERE id = ?", (id_fila,))
+                descartados.append(id_fila)
+        return descartados
+
+    def asegurar(self):
+        """Arrancar el hilo de envío si no está corriendo"""
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ciclo, name="cola-escritura", daemon=True)
+                self._hilo.start()
+
+    def _ciclo(self):
+        while True:
+            try:
+                self.ultimo_error = None
+                enviados = self.enviar()
+                self._fallos = 0
+                if enviados:
+                    # Puede quedar más de un lote: seguir sin esperar
+                    continue
+                espera = self.intervalo
+            except Exception as e:
+                # Fallos de conexión: no cuentan como intentos de los registros
+                self._fallos += 1
+                self.ultimo_error = e
+                espera = min(self.intervalo * 2 ** self._fallos, BACKOFF_MAX)
+            self._aviso.wait(espera)
+            self._aviso.clear()
+
+
+@st.cache_resource
+def get_cola_escritura(_coleccion, _al_insertar=None):
+    """Cola de escritura única por proceso, con su hilo de envío en marcha"""
+    cola = ColaEscritura(_coleccion, _al_insertar)
+    cola.asegurar()
+    return cola
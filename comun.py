@@ -0,0 +1,89 @@
+"""Recursos compartidos por todas las secciones de la app.
+
+Solo depende de módulos livianos (Streamlit, PyMongo): se importa en cada
+arranque, mientras que cada sección importa lo suyo al abrirse (ver
+``secciones``). El administrador de MongoDB, la cola y los medios son los
+mismos para todo el proceso, igual que los ``st.cache_resource`` de los que
+salen; las colecciones se obtienen de él con las funciones ``coleccion_*``.
+"""
+import pytz
+import streamlit as st
+
+from cola_escritura import get_cola_escritura
+from geo import asegurar_indice_geo, migrar_ubicaciones
+from historial import asegurar_indices
+from medios import get_medios
+from metricas import PUERTO as PUERTO_METRICAS, servir_metricas
+from mongo import get_mongo_manager
+from resumen import COLECCION_RESUMEN, asegurar_resumen, registrar
+
+timezone = pytz.timezone('America/Bogota')
+
+# Cliente compartido entre reruns y sesiones (ver mongo.py)
+mongo = get_mongo_manager()
+
+
+# Las colecciones se piden al administrador en cada uso (no se guardan a nivel
+# de módulo): si MongoDB no respondía al arrancar, el próximo rerun reintenta
+def coleccion_clima():
+    return mongo.collection("registros_clima")
+
+
+def coleccion_fauna():
+    return mongo.collection("catalogo_fauna")
+
+
+def coleccion_indices():
+    """Índices de vegetación por celda"""
+    return mongo.collection("indices_drone")
+
+
+def coleccion_resumen():
+    """Contadores precalculados del dashboard"""
+    return mongo.collection(COLECCION_RESUMEN)
+
+
+def estado_mongo():
+    """Texto con el estado de la conexión (se recalcula en cada rerun)"""
+    return mongo.estado()
+
+
+def resumir_insertados(nombre, documentos):
+    """Actualizar el resumen del dashboard con los registros que llegaron a MongoDB"""
+    registrar(coleccion_resumen(), nombre, documentos)
+
+
+# Los formularios escriben en la cola local; un hilo los envía a MongoDB por lotes
+cola = get_cola_escritura(mongo.collection, resumir_insertados)
+# Fotos: original al almacén de medios, miniatura WebP para mapas y listas
+medios = get_medios(lambda: mongo.db)
+
+
+@st.cache_resource
+def exportar_metricas(puerto):
+    """Servidor ``/metrics`` (Prometheus) único por proceso"""
+    return servir_metricas(puerto)
+
+
+if PUERTO_METRICAS:
+    exportar_metricas(PUERTO_METRICAS)
+
+
+@st.cache_resource
+def preparar_geo(nombre):
+    """Índice 2dsphere y migración de ubicaciones antiguas (una vez por proceso)"""
+    coleccion = mongo.collection(nombre)
+    asegurar_indice_geo(coleccion)
+    return migrar_ubicaciones(coleccion)
+
+
+@st.cache_resource
+def preparar_resumen(nombre):
+    """Índice del resumen y reconstrucción inicial si falta (una vez por proceso)"""
+    return asegurar_resumen(coleccion_resumen(), mongo.collection(nombre), nombre)
+
+
+@st.cache_resource
+def preparar_historial(nombre):
+    """Índices compuestos del historial paginado (una vez por proceso)"""
+    asegurar_indices(mongo.collection(nombre), nombre)
@@ -0,0 +1,571 @@
+"""Motor de análisis de imágenes de drone por bloques.
+
+Pensado para ortomosaicos de cientos de megapíxeles: la imagen se recorre
+por bandas de filas y cada banda se clasifica en una sola pasada con una
+tabla RGB→clases precalculada, sin convertir la imagen entera a HSV ni crear
+una máscara por clase. Los conteos se suman al final.
+
+Solo los TIFF RGB de 8 bits sin comprimir en disco se leen por bloques
+(mapeados en memoria con ``tifffile``, y repartidos entre procesos): ahí la
+memoria usada depende del tamaño del bloque y no del de la imagen. El resto
+(JPEG, PNG, TIFF comprimidos) lo decodifica PIL entero al leer la primera
+banda. Los archivos subidos pasan por ``fuente_de_bytes``, que guarda los
+TIFF en un archivo temporal para poder mapearlos.
+
+Uso por consola::
+
+    python drone.py ortomosaico.tif --procesos 4
+"""
+import hashlib
+import io
+import math
+import os
+import pickle
+import re
+import tempfile
+import threading
+import warnings
+from collections import OrderedDict, namedtuple
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import contextmanager
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+
+import numpy as np
+import pandas as pd
+from PIL import ExifTags, Image
+
+from geo import CAMPO_GEO, punto_geojson
+
+# Los ortomosaicos superan el límite anti "decompression bomb" de PIL
+Image.MAX_IMAGE_PIXELS = int(os.environ.get("DRONE_MAX_PIXELES", "600000000"))
+
+# Rangos HSV (OpenCV: H 0-180) para diferentes tipos de vegetación
+RANGOS_VEGETACION = {
+    'Vegetación Sana': ([35, 40, 40], [85, 255, 255]),
+    'Vegetación Seca': ([15, 30, 30], [35, 255, 200]),
+    'Suelo/Tierra': ([8, 50, 20], [25, 255, 200])
+}
+# Píxeles por bloque (~4 MP: unos 16 MB de índices por bloque)
+PIXELES_BLOQUE = 4_000_000
+PIXELES_VISTA_PREVIA = 4_000_000
+# Resolución máxima del mapa de clases que se devuelve para mostrar
+PIXELES_MAPA = 1_000_000
+# Caché de resultados: tamaño en memoria y carpeta opcional en disco
+CACHE_MAX_BYTES = int(os.environ.get("DRONE_CACHE_MB", "64")) * 1024 * 1024
+CACHE_DIR = os.environ.get("DRONE_CACHE_DIR") or None
+# Vigencia de los resultados en la caché compartida entre réplicas (ver cache_compartida.py)
+CACHE_TTL_COMPARTIDA = float(os.environ.get("DRONE_CACHE_TTL", "86400"))
+# Grilla de índices de vegetación georreferenciados
+CELDAS_INDICES = 16
+PIXELES_INDICES = 1_000_000
+NOMBRES_INDICES = ("VARI", "ExG", "GLI")
+# Campo de visión horizontal de la cámara (DJI Phantom 4 / Mavic: ~73,7°)
+FOV_HORIZONTAL = float(os.environ.get("DRONE_FOV_GRADOS", "73.7"))
+METROS_POR_GRADO = 111320.0
+# Los DJI guardan la altura relativa al despegue en el XMP, al inicio del archivo
+_ALTURA_XMP = re.compile(rb'RelativeAltitude\s*=\s*"([+-]?[0-9.]+)"')
+XMP_BYTES = 256 * 1024
+# Procesos para el análisis por lotes de un vuelo (y por bloques de un TIFF grande)
+PROCESOS_LOTE = int(os.environ.get("DRONE_PROCESOS", str(min(4, os.cpu_count() or 1))))
+
+Fuente = namedtuple("Fuente", ["ancho", "alto", "leer", "ruta_mapeable", "imagen"])
+
+
+def clave_rangos(rangos):
+    """Representación hashable de los rangos HSV"""
+    return tuple((nombre, tuple(lower), tuple(upper)) for nombre, (lower, upper) in rangos.items())
+
+
+@lru_cache(maxsize=4)
+def lut_clases(clave):
+    """Tabla de 2^24 entradas: color empaquetado ``R | G<<8 | B<<16`` → máscara de bits.
+
+    El bit ``i`` indica que el color cae en el rango ``i``; los rangos pueden
+    solaparse, igual que con ``cv2.inRange`` por separado.
+    """
+    if len(clave) > 8:
+        raise ValueError("Se admiten como máximo 8 clases")
+    # OpenCV se importa al analizar, no al cargar el módulo (arranque de la app)
+    import cv2
+
+    lut = np.empty((256, 256, 256), np.uint8)
+    plano = np.empty((256, 256, 3), np.uint8)
+    plano[..., 1], plano[..., 0] = np.meshgrid(np.arange(256), np.arange(256), indexing="ij")
+    for b in range(256):
+        plano[..., 2] = b
+        hsv = cv2.cvtColor(plano, cv2.COLOR_RGB2HSV)
+        clases = np.zeros((256, 256), np.uint8)
+        for bit, (_, lower, upper) in enumerate(clave):
+            clases |= cv2.inRange(hsv, np.array(lower), np.array(upper)) & np.uint8(1 << bit)
+        lut[b] = clases
+    return lut.reshape(-1)
+
+
+def clasificar(bloque, lut):
+    """Máscara de bits de clases por píxel para un bloque RGB o RGBX uint8"""
+    if bloque.shape[-1] == 4 and bloque.flags.c_contiguous:
+        # RGBX: cada píxel ya es un uint32 little-endian R | G<<8 | B<<16 | X<<24
+        indice = bloque.view("<u4")[..., 0] & 0xFFFFFF
+    else:
+        indice = bloque[..., 2].astype(np.uint32) << 16
+        indice |= bloque[..., 1].astype(np.uint32) << 8
+        indice |= bloque[..., 0]
+    return lut[indice]
+
+
+def abrir_fuente(fuente):
+    """Abrir una ruta o imagen PIL como fuente de bloques RGB/RGBX.
+
+    Con una imagen PIL (o un archivo que no es TIFF sin comprimir) el primer
+    recorte decodifica la imagen completa en memoria.
+    """
+    if isinstance(fuente, Fuente):
+        return fuente
+    ruta = os.fspath(fuente) if isinstance(fuente, (str, os.PathLike)) else None
+    if ruta and ruta.lower().endswith((".tif", ".tiff")):
+        try:
+            import tifffile
+            arr = tifffile.memmap(ruta, mode="r")
+            if arr.ndim == 3 and arr.shape[2] >= 3 and arr.dtype == np.uint8:
+                return Fuente(arr.shape[1], arr.shape[0], lambda c: arr[c[1]:c[3], c[0]:c[2], :3], ruta, None)
+        except Exception:
+            pass  # TIFF comprimido o sin tifffile: se decodifica con PIL
+    imagen = fuente if isinstance(fuente, Image.Image) else Image.open(ruta)
+    if imagen.mode not in ("RGB", "RGBA"):
+        raise ValueError("La imagen debe ser RGB")
+    return Fuente(imagen.width, imagen.height, lambda c: np.asarray(imagen.crop(c).convert("RGBX")), None, imagen)
+
+
+def es_tiff(datos):
+    return datos[:4] in (b"II*\x00", b"MM\x00*")
+
+
+@contextmanager
+def fuente_de_bytes(datos):
+    """Fuente para ``analizar_imagen`` a partir de los bytes de un archivo subido.
+
+    Los TIFF se escriben en un archivo temporal (borrado al salir) para que
+    ``abrir_fuente`` los lea por bloques si no están comprimidos; el resto se
+    abre con PIL.
+    """
+    if not es_tiff(datos):
+        yield Image.open(io.BytesIO(datos))
+        return
+    with tempfile.NamedTemporaryFile(suffix=".tif", delete=False) as archivo:
+        archivo.write(datos)
+    try:
+        yield archivo.name
+    finally:
+        os.remove(archivo.name)
+
+
+def cajas(ancho, alto, pixeles_bloque=PIXELES_BLOQUE):
+    """Bandas horizontales (izq, sup, der, inf) de unos ``pixeles_bloque`` píxeles"""
+    filas = max(pixeles_bloque // max(ancho, 1), 1)
+    return [(0, y, ancho, min(y + filas, alto)) for y in range(0, alto, filas)]
+
+
+def reducir(imagen, max_pixeles=PIXELES_VISTA_PREVIA):
+    """Versión reducida de una imagen PIL para vista previa"""
+    k = math.ceil(math.sqrt(imagen.width * imagen.height / max_pixeles))
+    if k <= 1:
+        return imagen
+    # En JPEG sin decodificar, draft escala en la propia decodificación
+    imagen.draft("RGB", (imagen.width // k, imagen.height // k))
+    k = math.ceil(math.sqrt(imagen.width * imagen.height / max_pixeles))
+    return imagen.reduce(k) if k > 1 else imagen
+
+
+def muestra_reducida(f, max_pixeles=PIXELES_VISTA_PREVIA):
+    """Arreglo RGB/RGBX de unos ``max_pixeles`` píxeles a partir de una fuente"""
+    if f.ruta_mapeable:
+        k = max(math.ceil(math.sqrt(f.ancho * f.alto / max_pixeles)), 1)
+        return f.leer((0, 0, f.ancho, f.alto))[::k, ::k]
+    return np.asarray(reducir(f.imagen, max_pixeles).convert("RGBX"))
+
+
+def prioridad_clases(n_clases):
+    """Tabla máscara de bits → índice de clase (1..n) de mayor prioridad, 0 = sin clase"""
+    tabla = np.zeros(256, np.uint8)
+    for mascara in range(1, 256):
+        primera = (mascara & -mascara).bit_length()
+        tabla[mascara] = primera if primera <= n_clases else 0
+    return tabla
+
+
+def estadisticas_bloque(bloque, lut, paso_mapa=None, fila0=0):
+    """Conteo de máscaras, histogramas RGB y (opcional) mapa de clases de un bloque.
+
+    Todo sale de una única lectura del bloque: los histogramas con
+    ``cv2.calcHist`` y las clases con la LUT más ``np.bincount``.
+    """
+    import cv2
+
+    bloque = np.ascontiguousarray(bloque)
+    mascaras = clasificar(bloque, lut)
+    conteo = np.bincount(mascaras.ravel(), minlength=256)
+    histogramas = np.stack([
+        cv2.calcHist([bloque], [canal], None, [256], [0, 256]).ravel() for canal in range(3)
+    ])
+    mapa = None
+    if paso_mapa:
+        # Filas alineadas con la grilla global para que las bandas encajen
+        mapa = mascaras[(-fila0) % paso_mapa::paso_mapa, ::paso_mapa]
+    return conteo, histogramas, mapa
+
+
+@lru_cache(maxsize=2)
+def _fuente_en_proceso(ruta):
+    return abrir_fuente(ruta)
+
+
+def _estadisticas_caja(ruta, caja, clave, paso_mapa):
+    # Se ejecuta en un proceso del pool: reabre el mapeo y usa su propia LUT
+    bloque = _fuente_en_proceso(ruta).leer(caja)
+    return estadisticas_bloque(bloque, lut_clases(clave), paso_mapa, caja[1])
+
+
+@dataclass
+class AnalisisImagen:
+    """Resultado del análisis de una imagen de drone"""
+    ancho: int
+    alto: int
+    pixeles: int  # píxeles analizados (menos que ancho x alto en vista previa)
+    promedios_rgb: dict
+    cobertura: dict
+    histogramas: np.ndarray  # (3, 256): Rojo, Verde, Azul
+    mapa_clases: np.ndarray = None  # índice de clase por píxel (reducido), 0 = sin clase
+
+
+def analizar_imagen(fuente, rangos=RANGOS_VEGETACION, procesos=1, vista_previa=False, mapa=False):
+    """Promedios RGB, cobertura por clase, histogramas y mapa de clases en una pasada"""
+    clave = clave_rangos(rangos)
+    f = abrir_fuente(fuente)
+    paso_mapa = math.ceil(math.sqrt(f.ancho * f.alto / PIXELES_MAPA)) if mapa else None
+
+    if vista_previa:
+        muestra = muestra_reducida(f)
+        paso_mapa = math.ceil(math.sqrt(muestra.shape[0] * muestra.shape[1] / PIXELES_MAPA)) if mapa else None
+        parciales = [estadisticas_bloque(muestra, lut_clases(clave), paso_mapa)]
+    else:
+        lista = cajas(f.ancho, f.alto)
+        if procesos > 1 and f.ruta_mapeable and len(lista) > 1:
+            n = len(lista)
+            with ProcessPoolExecutor(max_workers=procesos) as pool:
+                parciales = list(pool.map(_estadisticas_caja, [f.ruta_mapeable] * n, lista, [clave] * n, [paso_mapa] * n))
+        else:
+            lut = lut_clases(clave)
+            parciales = [estadisticas_bloque(f.leer(c), lut, paso_mapa, c[1]) for c in lista]
+
+    conteo = sum(p[0] for p in parciales)
+    histogramas = sum(p[1] for p in parciales)
+    pixeles = int(conteo.sum())
+    valores = np.arange(256)
+    promedios = histogramas @ valores / max(pixeles, 1)
+    mapa_clases = None
+    if mapa:
+        mapa_clases = prioridad_clases(len(rangos))[np.vstack([p[2] for p in parciales])]
+
+    return AnalisisImagen(
+        ancho=f.ancho,
+        alto=f.alto,
+        pixeles=pixeles,
+        promedios_rgb={'Rojo': float(promedios[0]), 'Verde': float(promedios[1]), 'Azul': float(promedios[2])},
+        cobertura=porcentajes(conteo, pixeles, rangos),
+        histogramas=histogramas,
+        mapa_clases=mapa_clases,
+    )
+
+
+def porcentajes(conteo, total, rangos=RANGOS_VEGETACION):
+    """Porcentaje de píxeles de cada clase a partir del histograma de máscaras"""
+    mascaras = np.arange(len(conteo))
+    return {
+        nombre: float(conteo[(mascaras & (1 << bit)) > 0].sum()) / total * 100
+        for bit, nombre in enumerate(rangos)
+    }
+
+
+def _grados(valor, ref):
+    grados, minutos, segundos = (float(v) for v in valor)
+    signo = -1 if ref in ("S", "W") else 1
+    return signo * (grados + minutos / 60 + segundos / 3600)
+
+
+def leer_gps(imagen, datos=None):
+    """Latitud, longitud y altitudes de la imagen según su EXIF (o None)
+
+    ``altitud`` es la del GPS (sobre el nivel del mar). Si se pasan los bytes
+    del archivo, también se busca la altura relativa al despegue que los
+    drones DJI escriben en el XMP (``altura_relativa``).
+    """
+    try:
+        gps = imagen.getexif().get_ifd(ExifTags.IFD.GPSInfo)
+        lat = _grados(gps[ExifTags.GPS.GPSLatitude], gps.get(ExifTags.GPS.GPSLatitudeRef, "N"))
+        lon = _grados(gps[ExifTags.GPS.GPSLongitude], gps.get(ExifTags.GPS.GPSLongitudeRef, "E"))
+    except (KeyError, TypeError, ValueError, ZeroDivisionError):
+        return None
+    altitud = gps.get(ExifTags.GPS.GPSAltitude)
+    resultado = {"lat": lat, "lon": lon, "altitud": float(altitud) if altitud is not None else None,
+                 "altura_relativa": None}
+    if datos:
+        encontrado = _ALTURA_XMP.search(datos[:XMP_BYTES])
+        if encontrado:
+            resultado["altura_relativa"] = float(encontrado.group(1))
+    return resultado
+
+
+def indices_vegetacion(rgb):
+    """VARI, ExG y GLI por píxel (float32, NaN donde el índice no está definido)"""
+    r, g, b = (rgb[..., i].astype(np.float32) for i in range(3))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        vari = np.clip((g - r) / (g + r - b), -1, 1)
+        suma = r + g + b
+        exg = (2 * g - r - b) / suma
+        gli = (2 * g - r - b) / (2 * g + r + b)
+    return {"VARI": vari, "ExG": exg, "GLI": gli}
+
+
+def indices_por_celda(fuente, filas=CELDAS_INDICES, columnas=CELDAS_INDICES):
+    """Promedio de cada índice en una grilla ``filas`` x ``columnas`` sobre la imagen"""
+    muestra = muestra_reducida(abrir_fuente(fuente), PIXELES_INDICES)
+    alto, ancho = muestra.shape[0] // filas * filas, muestra.shape[1] // columnas * columnas
+    if alto == 0 or ancho == 0:
+        raise ValueError("La imagen es demasiado pequeña para la grilla de índices")
+    resultado = {}
+    for nombre, indice in indices_vegetacion(muestra[:alto, :ancho]).items():
+        celdas = indice.reshape(filas, alto // filas, columnas, ancho // columnas)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", category=RuntimeWarning)  # celdas sin píxeles válidos
+            resultado[nombre] = np.nanmean(celdas, axis=(1, 3))
+    return resultado
+
+
+def georreferenciar_celdas(gps, altura, ancho, alto, filas=CELDAS_INDICES, columnas=CELDAS_INDICES,
+                           fov=FOV_HORIZONTAL):
+    """Centros (lat, lon) de las celdas para una foto nadir con el norte hacia arriba.
+
+    La huella en el terreno se estima con la altura sobre el terreno y el
+    campo de visión horizontal de la cámara.
+    """
+    ancho_m = 2 * altura * math.tan(math.radians(fov) / 2)
+    alto_m = ancho_m * alto / ancho
+    x = (np.arange(columnas) + 0.5) / columnas * ancho_m - ancho_m / 2
+    y = alto_m / 2 - (np.arange(filas) + 0.5) / filas * alto_m
+    lat = gps["lat"] + y / METROS_POR_GRADO
+    lon = gps["lon"] + x / (METROS_POR_GRADO * math.cos(math.radians(gps["lat"])))
+    return np.meshgrid(lat, lon, indexing="ij")
+
+
+def documento_indices(nombre, clave, gps, altura, ancho, alto, indices):
+    """Documento compacto (una imagen, una lista de celdas) para guardar en MongoDB"""
+    lat, lon = georreferenciar_celdas(gps, altura, ancho, alto, *indices["VARI"].shape)
+    celdas = [
+        [round(float(la), 6), round(float(lo), 6), *(None if np.isnan(v) else round(float(v), 4) for v in valores)]
+        for la, lo, *valores in zip(lat.ravel(), lon.ravel(), *(indices[n].ravel() for n in NOMBRES_INDICES))
+    ]
+    return {
+        "_id": clave,
+        "imagen": nombre,
+        CAMPO_GEO: punto_geojson(gps["lat"], gps["lon"]),
+        "altura": altura,
+        "indices": list(NOMBRES_INDICES),
+        "celdas": celdas,
+    }
+
+
+class CacheAnalisis:
+    """Caché de resultados por hash del contenido de la imagen y la configuración.
+
+    En memoria es un LRU limitado en bytes; si se indica ``directorio`` los
+    resultados también se guardan en disco y sobreviven a reinicios, y con
+    ``compartida`` (una caché de ``cache_compartida``) los ven las demás
+    réplicas de la app.
+    """
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES, directorio=CACHE_DIR, compartida=None):
+        self.max_bytes = max_bytes
+        self.directorio = directorio
+        self.compartida = compartida
+        self._entradas = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    @staticmethod
+    def clave(datos, rangos=RANGOS_VEGETACION, **opciones):
+        """Hash de los bytes de la imagen más los rangos HSV y opciones de análisis"""
+        h = hashlib.blake2b(datos, digest_size=20)
+        h.update(repr((clave_rangos(rangos), sorted(opciones.items()))).encode())
+        return h.hexdigest()
+
+    @staticmethod
+    def _tamano(resultado):
+        arreglos = [resultado.histogramas, resultado.mapa_clases]
+        return 1024 + sum(a.nbytes for a in arreglos if a is not None)
+
+    def _ruta(self, clave):
+        return os.path.join(self.directorio, f"{clave}.pkl")
+
+    def obtener(self, clave):
+        with self._lock:
+            if clave in self._entradas:
+                self._entradas.move_to_end(clave)
+                return self._entradas[clave]
+        if self.directorio and os.path.exists(self._ruta(clave)):
+            try:
+                with open(self._ruta(clave), "rb") as archivo:
+                    resultado = pickle.load(archivo)
+            except Exception:
+                return None
+            self._en_memoria(clave, resultado)
+            return resultado
+        if self.compartida is not None:
+            try:
+                resultado = self.compartida.obtener(f"drone:{clave}")
+            except Exception:
+                resultado = None
+            if resultado is not None:
+                self._en_memoria(clave, resultado)
+            return resultado
+        return None
+
+    def guardar(self, clave, resultado):
+        self._en_memoria(clave, resultado)
+        if self.directorio:
+            temporal = f"{self._ruta(clave)}.{os.getpid()}.tmp"
+            with open(temporal, "wb") as archivo:
+                pickle.dump(resultado, archivo, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temporal, self._ruta(clave))
+        if self.compartida is not None:
+            try:
+                self.compartida.guardar(f"drone:{clave}", resultado, CACHE_TTL_COMPARTIDA)
+            except Exception:
+                pass
+
+    def _en_memoria(self, clave, resultado):
+        tamano = self._tamano(resultado)
+        if tamano > self.max_bytes:
+            return
+        with self._lock:
+            if clave in self._entradas:
+                self._bytes -= self._tamano(self._entradas.pop(clave))
+            self._entradas[clave] = resultado
+            self._bytes += tamano
+            while self._bytes > self.max_bytes:
+                _, viejo = self._entradas.popitem(last=False)
+                self._bytes -= self._tamano(viejo)
+
+
+def _analizar_bytes(datos, vista_previa):
+    # Se ejecuta en un proceso del pool: decodifica y analiza una imagen
+    with fuente_de_bytes(datos) as fuente:
+        return analizar_imagen(fuente, vista_previa=vista_previa)
+
+
+def analizar_lote(archivos, procesos=PROCESOS_LOTE, vista_previa=False, cache=None, al_avanzar=None):
+    """Analizar las imágenes de un vuelo en un pool de procesos.
+
+    ``archivos`` es una lista de ``(nombre, bytes)``. Como mucho hay
+    ``2 * procesos`` imágenes en vuelo a la vez, para acotar la memoria.
+    ``al_avanzar(hechas, total)`` se llama cada vez que termina una imagen.
+    Devuelve una lista con un ``AnalisisImagen`` o una ``Exception`` por
+    archivo, en el mismo orden (los nombres pueden repetirse entre carpetas).
+    """
+    resultados = [None] * len(archivos)
+    pendientes = []
+    for i, (nombre, datos) in enumerate(archivos):
+        clave = cache.clave(datos, vista_previa=vista_previa, mapa=False) if cache else None
+        resultado = cache.obtener(clave) if cache else None
+        if resultado is not None:
+            resultados[i] = resultado
+        else:
+            pendientes.append((i, datos, clave))
+
+    total = len(archivos)
+    hechas = total - len(pendientes)
+    if al_avanzar:
+        al_avanzar(hechas, total)
+    if not pendientes:
+        return resultados
+
+    with ProcessPoolExecutor(max_workers=max(procesos, 1)) as pool:
+        en_vuelo = {}
+        cola = iter(pendientes)
+        while True:
+            for i, datos, clave in islice(cola, 2 * max(procesos, 1) - len(en_vuelo)):
+                en_vuelo[pool.submit(_analizar_bytes, datos, vista_previa)] = (i, clave)
+            if not en_vuelo:
+                break
+            listos, _ = wait(en_vuelo, return_when=FIRST_COMPLETED)
+            for futuro in listos:
+                i, clave = en_vuelo.pop(futuro)
+                try:
+                    resultados[i] = futuro.result()
+                    if cache:
+                        cache.guardar(clave, resultados[i])
+                except Exception as e:
+                    resultados[i] = e
+                hechas += 1
+                if al_avanzar:
+                    al_avanzar(hechas, total)
+    return resultados
+
+
+def reporte_vuelo(resultados, rangos=RANGOS_VEGETACION):
+    """Tabla por imagen, cobertura total del vuelo e imágenes atípicas.
+
+    ``resultados`` es una lista de ``(nombre, resultado)`` en el orden de
+    subida. Devuelve ``(tabla, totales, errores)``: ``tabla`` es un DataFrame
+    con una fila por imagen (``N.º`` es su posición, por si hay nombres
+    repetidos) y la columna ``Atípica`` con las clases fuera del rango
+    intercuartílico (1,5 IQR); ``totales`` es la cobertura del vuelo
+    ponderada por píxeles; ``errores`` es ``[(n, nombre, mensaje)]``.
+    """
+    filas, errores = [], []
+    for n, (nombre, r) in enumerate(resultados, 1):
+        if isinstance(r, Exception):
+            errores.append((n, nombre, str(r)))
+            continue
+        filas.append({
+            "N.º": n,
+            "Imagen": nombre,
+            "Ancho": r.ancho,
+            "Alto": r.alto,
+            "Píxeles": r.pixeles,
+            **{f"Promedio {color}": valor for color, valor in r.promedios_rgb.items()},
+            **r.cobertura,
+        })
+    tabla = pd.DataFrame(filas, columns=["N.º", "Imagen", "Ancho", "Alto", "Píxeles", "Promedio Rojo",
+                                         "Promedio Verde", "Promedio Azul", *rangos])
+    clases = list(rangos)
+    if tabla.empty:
+        return tabla.assign(Atípica=""), {c: 0.0 for c in clases}, errores
+
+    q1, q3 = tabla[clases].quantile(0.25), tabla[clases].quantile(0.75)
+    iqr = q3 - q1
+    fuera = (tabla[clases] < q1 - 1.5 * iqr) | (tabla[clases] > q3 + 1.5 * iqr)
+    tabla["Atípica"] = fuera.apply(lambda fila: ", ".join(fila.index[fila]), axis=1)
+
+    pesos = tabla["Píxeles"] / tabla["Píxeles"].sum()
+    totales = {c: float((tabla[c] * pesos).sum()) for c in clases}
+    return tabla, totales, errores
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Análisis de vegetación por bloques")
+    parser.add_argument("imagen")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--vista-previa", action="store_true")
+    args = parser.parse_args()
+
+    resultado = analizar_imagen(args.imagen, procesos=args.procesos, vista_previa=args.vista_previa)
+    for color, valor in resultado.promedios_rgb.items():
+        print(f"Promedio {color}: {valor:.1f}")
+    for nombre, porcentaje in resultado.cobertura.items():
+        print(f"{nombre}: {porcentaje:.1f}%")
@@ -0,0 +1,106 @@
+"""Almacenamiento geoespacial de registros en MongoDB.
+
+Los registros guardan, además del texto ``ubicacion`` ("lat,lon"), un punto
+GeoJSON en ``ubicacion_geo`` con índice ``2dsphere``, de modo que el
+dashboard pueda pedir solo los puntos dentro del viewport del mapa.
+
+Migración de registros antiguos (una sola vez)::
+
+    python geo.py
+"""
+from pymongo import UpdateOne
+
+CAMPO_GEO = "ubicacion_geo"
+LOTE_MIGRACION = 1000
+
+
+def parse_ubicacion(texto):
+    """Convertir "lat,lon" o "lat lon" en una tupla (lat, lon)"""
+    if not isinstance(texto, str):
+        return None
+    parts = texto.replace(",", " ").split()
+    if len(parts) < 2:
+        return None
+    try:
+        lat, lon = float(parts[0]), float(parts[1])
+    except ValueError:
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+        return None
+    return lat, lon
+
+
+def punto_geojson(lat, lon):
+    """Punto GeoJSON (el orden de coordenadas es lon, lat)"""
+    return {"type": "Point", "coordinates": [float(lon), float(lat)]}
+
+
+def coordenadas(doc):
+    """Extraer (lat, lon) de un documento con punto GeoJSON"""
+    lon, lat = doc[CAMPO_GEO]["coordinates"]
+    return lat, lon
+
+
+def asegurar_indice_geo(coleccion):
+    """Crear el índice 2dsphere si no existe"""
+    coleccion.create_index([(CAMPO_GEO, "2dsphere")], name=f"{CAMPO_GEO}_2dsphere")
+
+
+def migrar_ubicaciones(coleccion, lote=LOTE_MIGRACION):
+    """Agregar el punto GeoJSON a registros que solo tienen ``ubicacion`` en texto"""
+    pendientes = coleccion.find(
+        {CAMPO_GEO: {"$exists": False}, "ubicacion": {"$type": "string"}},
+        {"ubicacion": 1},
+    )
+    operaciones = []
+    migrados = 0
+    for doc in pendientes:
+        punto = parse_ubicacion(doc["ubicacion"])
+        if punto is None:
+            continue
+        operaciones.append(UpdateOne({"_id": doc["_id"]}, {"$set": {CAMPO_GEO: punto_geojson(*punto)}}))
+        if len(operaciones) >= lote:
+            migrados += coleccion.bulk_write(operaciones, ordered=False).modified_count
+            operaciones = []
+    if operaciones:
+        migrados += coleccion.bulk_write(operaciones, ordered=False).modified_count
+    return migrados
+
+
+def bounds_de_mapa(bounds):
+    """Normalizar los bounds devueltos por ``st_folium`` a (sur, oeste, norte, este)"""
+    if not bounds:
+        return None
+    try:
+        sw, ne = bounds["_southWest"], bounds["_northEast"]
+        sur, oeste, norte, este = sw["lat"], sw["lng"], ne["lat"], ne["lng"]
+    except (KeyError, TypeError):
+        return None
+    if None in (sur, oeste, norte, este):
+        return None
+    return (round(sur, 5), round(oeste, 5), round(norte, 5), round(este, 5))
+
+
+def filtro_viewport(viewport):
+    """Filtro ``$geoWithin`` para los puntos dentro del rectángulo visible"""
+    if viewport is None:
+        return {CAMPO_GEO: {"$exists": True}}
+    sur, oeste, norte, este = viewport
+    sur, norte = max(sur, -90.0), min(norte, 90.0)
+    # Con el mapa muy alejado el rectángulo deja de ser un polígono válido
+    if este - oeste >= 180 or norte - sur >= 180:
+        return {CAMPO_GEO: {"$exists": True}}
+    oeste, este = max(oeste, -180.0), min(este, 180.0)
+    anillo = [[oeste, sur], [este, sur], [este, norte], [oeste, norte], [oeste, sur]]
+    return {CAMPO_GEO: {"$geoWithin": {"$geometry": {"type": "Polygon", "coordinates": [anillo]}}}}
+
+
+if __name__ == "__main__":
+    from mongo import MongoManager, base_datos, uri
+
+    manager = MongoManager(uri, base_datos)
+    for nombre in ("registros_clima", "catalogo_fauna"):
+        coleccion = manager.collection(nombre)
+        asegurar_indice_geo(coleccion)
+        print(f"{nombre}: {migrar_ubicaciones(coleccion)} registros migrados")
+    manager.close()
@@ -0,0 +1,90 @@
+"""Consulta paginada del historial de registros de campo.
+
+Los registros se recorren en orden de ``fecha`` (y ``_id`` para desempatar),
+del más reciente al más antiguo, con paginación por clave: cada página
+continúa desde la última ``(fecha, _id)`` vista con un rango sobre el
+índice, en lugar de ``skip``, que obliga al servidor a recorrer todas las
+páginas anteriores. Los filtros por igualdad (tipo, especie, lluvia) van
+primero en los índices compuestos, uno por cada combinación que ofrece la
+vista (``INDICES``), y el rango de fechas después: sin filtro de área cada
+página lee solo los documentos que devuelve. El filtro de área no está en
+esos índices y se aplica al leer cada documento, así que con él se
+recorren también los registros de fuera del área. Solo se piden los campos
+que se muestran en la tabla.
+"""
+from bson import ObjectId
+from pymongo import DESCENDING
+
+from geo import CAMPO_GEO
+
+TAMANO_PAGINA = 50
+# Campos que se muestran por colección (la proyección de cada página)
+CAMPOS = {
+    "catalogo_fauna": ("fecha", "hora", "tipo", "especie", "cantidad", "comportamiento", "ubicacion"),
+    "registros_clima": ("fecha", "hora", "lluvia", "intensidad", "temperatura", "ubicacion"),
+}
+# Campos que se filtran por igualdad
+FILTROS = {
+    "catalogo_fauna": ("tipo", "especie"),
+    "registros_clima": ("lluvia",),
+}
+# Combinaciones de filtros con índice compuesto propio (seguidas del orden)
+INDICES = {
+    "catalogo_fauna": (("tipo",), ("especie",), ("tipo", "especie")),
+    "registros_clima": (("lluvia",),),
+}
+ORDEN = [("fecha", DESCENDING), ("_id", DESCENDING)]
+
+
+def asegurar_indices(coleccion, nombre):
+    """Índices ``(fecha, _id)`` y ``(filtros..., fecha, _id)`` para cada combinación de ``INDICES``"""
+    coleccion.create_index(ORDEN, name="fecha_id")
+    for campos in INDICES[nombre]:
+        coleccion.create_index([*((c, 1) for c in campos), *ORDEN], name="_".join(campos) + "_fecha_id")
+
+
+def filtro_historial(nombre, desde=None, hasta=None, area=None, **iguales):
+    """Filtro de MongoDB a partir de las opciones de la vista.
+
+    ``desde``/``hasta`` son fechas (inclusive), ``area`` una geometría
+    GeoJSON (Polygon o MultiPolygon) y ``iguales`` los valores de los campos
+    de ``FILTROS`` (los vacíos se ignoran).
+    """
+    filtro = {}
+    for campo, valor in iguales.items():
+        if campo not in FILTROS[nombre]:
+            raise ValueError(f"No se puede filtrar {nombre} por {campo}")
+        if valor not in (None, ""):
+            filtro[campo] = valor
+    # Siempre hay condición sobre la fecha: los registros sin fecha no se pueden paginar
+    rango = {"$type": "string"}
+    if desde is not None:
+        rango["$gte"] = str(desde)
+    if hasta is not None:
+        rango["$lte"] = str(hasta)
+    filtro["fecha"] = rango
+    if area is not None:
+        filtro[CAMPO_GEO] = {"$geoWithin": {"$geometry": area}}
+    return filtro
+
+
+def _despues_de(cursor):
+    fecha, id_ = cursor
+    return {"$or": [{"fecha": {"$lt": fecha}}, {"fecha": fecha, "_id": {"$lt": ObjectId(id_)}}]}
+
+
+def pagina(coleccion, nombre, filtro, despues=None, limite=TAMANO_PAGINA):
+    """Una página de registros y el cursor de la siguiente (None si es la última).
+
+    ``despues`` es el cursor ``(fecha, id)`` devuelto por la página anterior.
+    """
+    consulta = filtro if despues is None else {"$and": [filtro, _despues_de(despues)]}
+    proyeccion = {c: 1 for c in CAMPOS[nombre]}
+    # Un documento de más indica si hay otra página, sin contar el total
+    documentos = list(coleccion.find(consulta, proyeccion).sort(ORDEN).limit(limite + 1))
+    siguiente = None
+    if len(documentos) > limite:
+        documentos = documentos[:limite]
+        ultimo = documentos[-1]
+        siguiente = (ultimo["fecha"], str(ultimo["_id"]))
+    return documentos, siguiente
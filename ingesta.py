@@ -0,0 +1,212 @@
+"""Ingesta de archivos CSV/satelitales a Parquet tipado.
+
+El CSV se lee por bloques con el lector de ``pyarrow`` y tipos explícitos
+(inferidos de una muestra), y se escribe como Parquet en una carpeta de
+caché. Después se cargan solo las columnas y el rango de filas que se piden,
+sin tener nunca el archivo completo en memoria.
+"""
+import hashlib
+import json
+import os
+import re
+
+import pyarrow as pa
+import pyarrow.compute  # noqa: F401  (registra pa.compute)
+import pyarrow.csv as pacsv
+import pyarrow.parquet as pq
+
+CACHE_DIR = os.environ.get("DATOS_CACHE_DIR", ".cache_datos")
+# Carpeta del servidor con exportaciones grandes (más de lo que permite subir el navegador)
+DATOS_DIR = os.environ.get("DATOS_DIR", "datos")
+# Tamaño de cada bloque leído del CSV (y de cada row group del Parquet)
+BLOQUE_BYTES = 16 * 1024 * 1024
+CLAVE_METADATOS = b"geodata"
+# Formatos que se prueban para la columna de tiempo si Arrow no la reconoce sola
+FORMATOS_FECHA = ("%Y-%m-%d %H:%M:%S", "%Y-%m-%dT%H:%M:%S", "%Y-%m-%d", "%Y/%m/%d", "%d/%m/%Y %H:%M", "%d/%m/%Y")
+
+_PATRONES = {
+    "lat": re.compile(r"^(lat|latitud|latitude|y)$", re.IGNORECASE),
+    "lon": re.compile(r"^(lon|lng|long|longitud|longitude|x)$", re.IGNORECASE),
+    "tiempo": re.compile(r"(fecha|date|time|timestamp|datetime|hora)", re.IGNORECASE),
+}
+
+
+def detectar_columnas(nombres):
+    """Nombres de las columnas de latitud, longitud y tiempo (o None)"""
+    detectadas = {}
+    for clave, patron in _PATRONES.items():
+        detectadas[clave] = next((n for n in nombres if patron.search(n.strip())), None)
+    return detectadas
+
+
+def inferir_tipos(muestra, detectadas, permisivo=False):
+    """Tipos explícitos para el lector por bloques a partir de una tabla de muestra.
+
+    Las coordenadas quedan en float64, el resto de flotantes en float32, los
+    enteros en int64 y el texto repetitivo como diccionario. Con
+    ``permisivo`` los enteros pasan a float64 y el resto de tipos a texto,
+    para archivos cuyos primeros bloques no representan al resto.
+    """
+    coordenadas = {detectadas["lat"], detectadas["lon"]}
+    tipos = {}
+    for campo in muestra.schema:
+        t = campo.type
+        numerico = pa.types.is_integer(t) or pa.types.is_floating(t)
+        if campo.name in coordenadas and numerico:
+            tipos[campo.name] = pa.float64()
+        elif pa.types.is_floating(t):
+            tipos[campo.name] = pa.float32()
+        elif pa.types.is_integer(t):
+            tipos[campo.name] = pa.float64() if permisivo else pa.int64()
+        elif not permisivo and (pa.types.is_timestamp(t) or pa.types.is_date(t) or pa.types.is_boolean(t)):
+            tipos[campo.name] = t
+        elif campo.name == detectadas["tiempo"] and formato_fecha(muestra.column(campo.name)):
+            tipos[campo.name] = pa.timestamp("s")
+        elif _repetitivo(muestra.column(campo.name)):
+            tipos[campo.name] = pa.dictionary(pa.int32(), pa.string())
+        else:
+            tipos[campo.name] = pa.string()
+    return tipos
+
+
+def formato_fecha(columna):
+    """Primer formato de ``FORMATOS_FECHA`` que interpreta todos los valores de la muestra"""
+    valores = pa.compute.drop_null(columna.cast(pa.string()))
+    if len(valores) == 0:
+        return None
+    for formato in FORMATOS_FECHA:
+        try:
+            pa.compute.strptime(valores, format=formato, unit="s")
+            return formato
+        except pa.ArrowInvalid:
+            continue
+    return None
+
+
+def _repetitivo(columna):
+    if len(columna) == 0:
+        return False
+    if pa.types.is_dictionary(columna.type):
+        return True
+    return pa.compute.count_distinct(columna).as_py() <= len(columna) // 2
+
+
+def clave_archivo(origen):
+    """Identificador de caché: hash del contenido (bytes) o ruta + tamaño + fecha (archivo)"""
+    if isinstance(origen, (bytes, bytearray)):
+        return hashlib.blake2b(origen, digest_size=16).hexdigest()
+    info = os.stat(origen)
+    return hashlib.blake2b(f"{os.path.abspath(origen)}|{info.st_size}|{info.st_mtime_ns}".encode(), digest_size=16).hexdigest()
+
+
+def _abrir_csv(origen, tipos=None):
+    fuente = pa.BufferReader(origen) if isinstance(origen, (bytes, bytearray)) else origen
+    return pacsv.open_csv(
+        fuente,
+        read_options=pacsv.ReadOptions(block_size=BLOQUE_BYTES),
+        convert_options=pacsv.ConvertOptions(
+            column_types=tipos, strings_can_be_null=True, timestamp_parsers=[pacsv.ISO8601, *FORMATOS_FECHA]
+        ),
+    )
+
+
+def _escribir(origen, destino, tipos, metadatos):
+    lector = _abrir_csv(origen, tipos)
+    esquema = lector.schema.with_metadata({CLAVE_METADATOS: json.dumps(metadatos).encode()})
+    temporal = f"{destino}.{os.getpid()}.tmp"
+    try:
+        with pq.ParquetWriter(temporal, esquema, compression="zstd") as escritor:
+            for lote in lector:
+                escritor.write_batch(lote)
+        os.replace(temporal, destino)
+    finally:
+        if os.path.exists(temporal):
+            os.remove(temporal)
+
+
+def csv_a_parquet(origen, cache_dir=CACHE_DIR):
+    """Convertir un CSV (bytes o ruta) a Parquet en caché y devolver ``(ruta, metadatos)``"""
+    os.makedirs(cache_dir, exist_ok=True)
+    destino = os.path.join(cache_dir, f"{clave_archivo(origen)}.parquet")
+    if not os.path.exists(destino):
+        # Tipos a partir del primer bloque, luego lectura completa por bloques
+        lector = _abrir_csv(origen)
+        detectadas = detectar_columnas(lector.schema.names)
+        try:
+            muestra = pa.Table.from_batches([lector.read_next_batch()])
+        except StopIteration:
+            muestra = lector.schema.empty_table()
+        metadatos = {"columnas": detectadas}
+        try:
+            _escribir(origen, destino, inferir_tipos(muestra, detectadas), metadatos)
+        except pa.ArrowInvalid:
+            _escribir(origen, destino, inferir_tipos(muestra, detectadas, permisivo=True), metadatos)
+    return destino, leer_metadatos(destino)
+
+
+def leer_metadatos(ruta):
+    """Columnas detectadas y número de filas de un Parquet generado por ``csv_a_parquet``"""
+    archivo = pq.ParquetFile(ruta)
+    crudos = (archivo.schema_arrow.metadata or {}).get(CLAVE_METADATOS)
+    metadatos = json.loads(crudos) if crudos else {"columnas": detectar_columnas(archivo.schema_arrow.names)}
+    metadatos["filas"] = archivo.metadata.num_rows
+    metadatos["nombres"] = archivo.schema_arrow.names
+    return metadatos
+
+
+def columnas_numericas(ruta):
+    """Nombres de las columnas numéricas de un Parquet"""
+    esquema = pq.ParquetFile(ruta).schema_arrow
+    return [c.name for c in esquema if pa.types.is_integer(c.type) or pa.types.is_floating(c.type)]
+
+
+def archivos_servidor(carpeta=DATOS_DIR):
+    """CSV disponibles en la carpeta de datos del servidor"""
+    if not os.path.isdir(carpeta):
+        return []
+    return sorted(n for n in os.listdir(carpeta) if n.lower().endswith(".csv"))
+
+
+def medias_filas(ruta, filas, columnas):
+    """Media de cada columna de ``columnas`` sobre las filas ``filas`` (posiciones ordenadas).
+
+    Se lee un row group a la vez, y solo los que contienen alguna de las filas.
+    """
+    import numpy as np
+
+    archivo = pq.ParquetFile(ruta)
+    filas = np.asarray(filas, dtype="int64")
+    sumas, cuentas = dict.fromkeys(columnas, 0.0), dict.fromkeys(columnas, 0)
+    inicio = 0
+    for i in range(archivo.num_row_groups):
+        n = archivo.metadata.row_group(i).num_rows
+        a, b = np.searchsorted(filas, [inicio, inicio + n])
+        if b > a:
+            tabla = archivo.read_row_group(i, columns=list(columnas)).take(pa.array(filas[a:b] - inicio))
+            for c in columnas:
+                sumas[c] += pa.compute.sum(tabla[c]).as_py() or 0
+                cuentas[c] += pa.compute.count(tabla[c]).as_py()
+        inicio += n
+    return {c: sumas[c] / cuentas[c] if cuentas[c] else float("nan") for c in columnas}
+
+
+def cargar_parquet(ruta, columnas=None, inicio=0, fin=None):
+    """Leer solo ``columnas`` y las filas ``[inicio, fin)`` como DataFrame.
+
+    Solo se decodifican los row groups que se solapan con el rango pedido.
+    """
+    archivo = pq.ParquetFile(ruta)
+    total = archivo.metadata.num_rows
+    fin = total if fin is None else min(fin, total)
+    grupos, desplazamiento, acumulado = [], None, 0
+    for i in range(archivo.num_row_groups):
+        filas = archivo.metadata.row_group(i).num_rows
+        if acumulado + filas > inicio and acumulado < fin:
+            grupos.append(i)
+            if desplazamiento is None:
+                desplazamiento = inicio - acumulado
+        acumulado += filas
+    if not grupos:
+        return archivo.schema_arrow.empty_table().select(columnas or archivo.schema_arrow.names).to_pandas()
+    tabla = archivo.read_row_groups(grupos, columns=columnas)
+    return tabla.slice(desplazamiento, fin - inicio).to_pandas()
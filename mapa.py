@@ -0,0 +1,153 @@
+"""Agregación de puntos en celdas para el mapa del dashboard.
+
+Cuando el viewport contiene más puntos que el umbral configurado, en lugar de
+un ``CircleMarker`` con popup por registro se dibuja una celda por grupo de
+puntos. Las celdas se calculan en MongoDB con un pipeline ``$group`` cuyo
+tamaño depende del zoom, y el detalle de una celda se consulta solo cuando el
+usuario hace clic sobre ella.
+"""
+import math
+import os
+
+import folium
+from folium.plugins import HeatMap
+
+from geo import CAMPO_GEO, coordenadas, filtro_viewport
+from medios import primera_foto, uri_miniatura
+
+# Por encima de este número de puntos visibles se pasa a modo agregado
+UMBRAL_AGREGACION = int(os.environ.get("MAPA_UMBRAL_AGREGACION", "1000"))
+# Tamaño aproximado de cada celda en píxeles de pantalla
+CELDA_PX = int(os.environ.get("MAPA_CELDA_PX", "60"))
+LIMITE_DETALLE = 50
+# Máximo de imágenes de drone cuyas celdas se dibujan en la capa de índices
+LIMITE_IMAGENES_INDICES = 500
+# Máximo de popups con miniatura de foto (cada una agrega unos KB al HTML del mapa)
+LIMITE_MINIATURAS_MAPA = 100
+
+
+def tamano_celda(zoom):
+    """Tamaño de celda en grados para el nivel de zoom de Leaflet"""
+    grados_por_px = 360.0 / (256 * 2 ** zoom)
+    return CELDA_PX * grados_por_px
+
+
+def supera_umbral(coleccion, filtro, umbral=UMBRAL_AGREGACION):
+    """Indica si el filtro devuelve más puntos que el umbral (sin traer documentos)"""
+    return coleccion.count_documents(filtro, limit=umbral + 1) > umbral
+
+
+def agregar_en_celdas(coleccion, filtro, tamano):
+    """Contar puntos por celda de la grilla en el servidor"""
+    pipeline = [
+        {"$match": filtro},
+        {"$project": {
+            "_id": 0,
+            "lon": {"$arrayElemAt": [f"${CAMPO_GEO}.coordinates", 0]},
+            "lat": {"$arrayElemAt": [f"${CAMPO_GEO}.coordinates", 1]},
+        }},
+        {"$group": {
+            "_id": {
+                "x": {"$floor": {"$divide": ["$lon", tamano]}},
+                "y": {"$floor": {"$divide": ["$lat", tamano]}},
+            },
+            "n": {"$sum": 1},
+            "lat": {"$avg": "$lat"},
+            "lon": {"$avg": "$lon"},
+        }},
+    ]
+    return [
+        {"lat": c["lat"], "lon": c["lon"], "n": c["n"]}
+        for c in coleccion.aggregate(pipeline, allowDiskUse=True)
+    ]
+
+
+def filtro_celda(lat, lon, tamano):
+    """Filtro para los puntos de la celda que contiene (lat, lon)"""
+    x, y = math.floor(lon / tamano), math.floor(lat / tamano)
+    return filtro_viewport((y * tamano, x * tamano, (y + 1) * tamano, (x + 1) * tamano))
+
+
+def _foto_popup(doc, fotos):
+    miniatura = fotos.get(primera_foto(doc)) if fotos else None
+    return f'<br><img src="{uri_miniatura(miniatura)}" width="160">' if miniatura else ""
+
+
+def puntos_fauna(documentos, fotos=None):
+    """Marcadores (lat, lon, popup) de avistamientos; ``fotos`` es ``{id: miniatura}``"""
+    puntos = []
+    for f in documentos:
+        lat, lon = coordenadas(f)
+        puntos.append({
+            "lat": lat,
+            "lon": lon,
+            "popup": f"🟢 Fauna<br>Especie: {f.get('especie','')}<br>Tipo: {f.get('tipo','')}<br>Cantidad: {f.get('cantidad','')}{_foto_popup(f, fotos)}"
+        })
+    return puntos
+
+
+def puntos_clima(documentos, fotos=None):
+    """Marcadores (lat, lon, popup) de registros de clima"""
+    puntos = []
+    for c in documentos:
+        lat, lon = coordenadas(c)
+        puntos.append({
+            "lat": lat,
+            "lon": lon,
+            "popup": f"🔵 Clima<br>Lluvia: {c.get('lluvia','')}<br>Temp: {c.get('temperatura','')}°C{_foto_popup(c, fotos)}"
+        })
+    return puntos
+
+
+def agregar_puntos_al_mapa(m, puntos, color):
+    """Un ``CircleMarker`` con popup por registro"""
+    for p in puntos:
+        folium.CircleMarker(
+            location=[p["lat"], p["lon"]],
+            radius=7,
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.7,
+            popup=folium.Popup(p["popup"], max_width=250)
+        ).add_to(m)
+
+
+def agregar_celdas_al_mapa(m, celdas, color, etiqueta):
+    """Dibujar una celda agregada por grupo, con radio según la cantidad"""
+    for c in celdas:
+        folium.CircleMarker(
+            location=[c["lat"], c["lon"]],
+            radius=min(6 + 6 * math.log10(c["n"]), 30),
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.5,
+            tooltip=f"{etiqueta}: {c['n']} registros",
+        ).add_to(m)
+
+
+def agregar_capa_indices(m, documentos, indice):
+    """Capa de calor con las celdas de índices de vegetación de las imágenes de drone.
+
+    El peso de cada celda es el índice invertido y normalizado entre las
+    celdas visibles, de modo que las zonas calientes son las de menor
+    vigor (posible estrés).
+    """
+    puntos = []
+    for doc in documentos:
+        i = 2 + doc["indices"].index(indice)
+        puntos.extend((c[0], c[1], c[i]) for c in doc["celdas"] if c[i] is not None)
+    if not puntos:
+        return 0
+    valores = [p[2] for p in puntos]
+    minimo, maximo = min(valores), max(valores)
+    rango = (maximo - minimo) or 1.0
+    HeatMap(
+        [[lat, lon, (maximo - v) / rango] for lat, lon, v in puntos],
+        name=f"Estrés ({indice})",
+        radius=12,
+        blur=15,
+        min_opacity=0.3,
+    ).add_to(m)
+    return len(puntos)
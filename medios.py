@@ -0,0 +1,311 @@
+"""Fotos de los registros de campo.
+
+Al enviar un formulario, cada foto se guarda primero en una carpeta local
+(``MEDIOS_PENDIENTES``) y el registro solo recibe una referencia
+``{"id", "nombre", "tipo"}``. Un hilo de fondo genera una miniatura WebP
+(colección ``miniaturas``, documentos de pocos KB) y sube el original al
+almacén configurado:
+
+- ``gridfs`` (por defecto): bucket ``fotos`` en la misma base de MongoDB.
+- ``local``: una carpeta (``MEDIOS_DIR``), por ejemplo un bucket montado.
+- ``s3``: un almacén compatible con S3 (MinIO, R2...), requiere ``boto3``.
+
+El dashboard y las listas solo cargan miniaturas; el original se pide
+explícitamente (``Medios.original``). Si Pillow no puede abrir una foto, su
+miniatura queda marcada con el error y el original se sube igual; si una
+foto no se puede procesar tras ``MAX_INTENTOS`` ciclos, se aparta en
+``MEDIOS_PENDIENTES/fallidas`` con un archivo ``.error`` y el resto sigue.
+"""
+import base64
+import io
+import json
+import os
+import threading
+
+import streamlit as st
+from bson import Binary, ObjectId
+from pymongo.errors import ConnectionFailure
+
+BACKEND = os.environ.get("MEDIOS_BACKEND", "gridfs")
+MEDIOS_DIR = os.environ.get("MEDIOS_DIR", "medios")
+MEDIOS_PENDIENTES = os.environ.get("MEDIOS_PENDIENTES", "medios_pendientes")
+BUCKET_FOTOS = "fotos"
+COLECCION_MINIATURAS = "miniaturas"
+# Lado mayor y calidad de las miniaturas
+LADO_MINIATURA = int(os.environ.get("MEDIOS_LADO_MINIATURA", "320"))
+CALIDAD_MINIATURA = 70
+INTERVALO = float(os.environ.get("MEDIOS_INTERVALO", "5"))
+BACKOFF_MAX = float(os.environ.get("MEDIOS_BACKOFF_MAX", "300"))
+# Ciclos con error antes de apartar una foto en la carpeta de fallidas
+MAX_INTENTOS = int(os.environ.get("MEDIOS_MAX_INTENTOS", "3"))
+
+
+def miniatura(datos, lado=LADO_MINIATURA, calidad=CALIDAD_MINIATURA):
+    """Miniatura WebP (bytes, ancho, alto) respetando la orientación EXIF"""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(datos)) as imagen:
+        imagen.draft("RGB", (lado, lado))
+        imagen = ImageOps.exif_transpose(imagen).convert("RGB")
+        imagen.thumbnail((lado, lado))
+        salida = io.BytesIO()
+        imagen.save(salida, "WEBP", quality=calidad, method=4)
+        return salida.getvalue(), imagen.width, imagen.height
+
+
+def uri_miniatura(datos):
+    """URI ``data:`` para mostrar una miniatura dentro de un popup HTML"""
+    return "data:image/webp;base64," + base64.b64encode(datos).decode()
+
+
+class AlmacenGridFS:
+    """Originales en un bucket GridFS"""
+
+    def __init__(self, db, bucket=BUCKET_FOTOS):
+        import gridfs
+
+        self.fs = gridfs.GridFS(db, collection=bucket)
+
+    def guardar(self, id_foto, datos, nombre, tipo):
+        if not self.fs.exists(ObjectId(id_foto)):
+            self.fs.put(datos, _id=ObjectId(id_foto), filename=nombre, contentType=tipo)
+
+    def abrir(self, id_foto):
+        return self.fs.get(ObjectId(id_foto)).read()
+
+
+class AlmacenLocal:
+    """Originales como archivos en una carpeta"""
+
+    def __init__(self, carpeta=MEDIOS_DIR):
+        self.carpeta = carpeta
+        os.makedirs(carpeta, exist_ok=True)
+
+    def guardar(self, id_foto, datos, nombre, tipo):
+        destino = os.path.join(self.carpeta, id_foto)
+        if not os.path.exists(destino):
+            temporal = f"{destino}.tmp"
+            with open(temporal, "wb") as f:
+                f.write(datos)
+            os.replace(temporal, destino)
+
+    def abrir(self, id_foto):
+        with open(os.path.join(self.carpeta, id_foto), "rb") as f:
+            return f.read()
+
+
+class AlmacenS3:
+    """Originales en un bucket compatible con S3 (``MEDIOS_S3_*``)"""
+
+    def __init__(self):
+        import boto3
+
+        self.bucket = os.environ["MEDIOS_S3_BUCKET"]
+        self.s3 = boto3.client("s3", endpoint_url=os.environ.get("MEDIOS_S3_ENDPOINT"))
+
+    def guardar(self, id_foto, datos, nombre, tipo):
+        # put_object con la misma clave es idempotente
+        self.s3.put_object(Bucket=self.bucket, Key=f"{BUCKET_FOTOS}/{id_foto}", Body=datos,
+                           ContentType=tipo or "application/octet-stream", Metadata={"nombre": nombre})
+
+    def abrir(self, id_foto):
+        return self.s3.get_object(Bucket=self.bucket, Key=f"{BUCKET_FOTOS}/{id_foto}")["Body"].read()
+
+
+def crear_almacen(db, backend=BACKEND):
+    """Almacén de originales según ``MEDIOS_BACKEND``"""
+    if backend == "local":
+        return AlmacenLocal()
+    if backend == "s3":
+        return AlmacenS3()
+    return AlmacenGridFS(db)
+
+
+class Medios:
+    """Fotos pendientes en disco, miniaturas en MongoDB y originales en el almacén.
+
+    ``db`` es una función que devuelve la base de datos (se llama recién al
+    procesar, así un fallo de conexión solo retrasa el envío).
+    """
+
+    def __init__(self, db, pendientes=MEDIOS_PENDIENTES, backend=BACKEND, intervalo=INTERVALO):
+        self.db = db
+        self.backend = backend
+        self.pendientes = pendientes
+        self.intervalo = intervalo
+        self.ultimo_error = None
+        self._almacen = None
+        self._fallos = 0
+        self._aviso = threading.Event()
+        self._hilo = None
+        self._lock = threading.Lock()
+        self.fallidas = os.path.join(pendientes, "fallidas")
+        os.makedirs(self.fallidas, exist_ok=True)
+
+    @property
+    def almacen(self):
+        if self._almacen is None:
+            self._almacen = crear_almacen(self.db(), self.backend)
+        return self._almacen
+
+    def recibir(self, archivo):
+        """Guardar en disco una foto subida y devolver la referencia para el registro"""
+        id_foto = str(ObjectId())
+        referencia = {"id": id_foto, "nombre": archivo.name, "tipo": archivo.type}
+        ruta = os.path.join(self.pendientes, id_foto)
+        with open(f"{ruta}.tmp", "wb") as f:
+            f.write(archivo.getvalue())
+        with open(f"{ruta}.json", "w") as f:
+            json.dump(referencia, f)
+        # El original queda visible para el hilo solo cuando los metadatos ya existen
+        os.replace(f"{ruta}.tmp", ruta)
+        self.asegurar()
+        self._aviso.set()
+        return referencia
+
+    def en_espera(self):
+        """Número de fotos que aún no se procesaron"""
+        return sum(1 for n in os.listdir(self.pendientes) if n.endswith(".json"))
+
+    def con_error(self):
+        """Número de fotos apartadas en ``fallidas`` por no poder procesarse"""
+        return sum(1 for n in os.listdir(self.fallidas) if n.endswith(".error"))
+
+    def procesar(self):
+        """Miniatura y subida de cada foto pendiente; devuelve cuántas se procesaron.
+
+        Un error de conexión con MongoDB corta el ciclo (se reintenta todo más
+        tarde); cualquier otro error afecta solo a esa foto.
+        """
+        procesadas = 0
+        for nombre in sorted(os.listdir(self.pendientes)):
+            ruta = os.path.join(self.pendientes, nombre)
+            if "." in nombre or not os.path.exists(f"{ruta}.json"):
+                continue
+            try:
+                with open(f"{ruta}.json") as f:
+                    referencia = json.load(f)
+                with open(ruta, "rb") as f:
+                    datos = f.read()
+                self._procesar(referencia, datos)
+            except ConnectionFailure:
+                raise
+            except Exception as e:
+                self._fallo(nombre, e)
+                continue
+            os.remove(ruta)
+            os.remove(f"{ruta}.json")
+            procesadas += 1
+        return procesadas
+
+    def _fallo(self, id_foto, error):
+        """Contar un intento fallido y apartar la foto al llegar a ``MAX_INTENTOS``"""
+        ruta = os.path.join(self.pendientes, id_foto)
+        try:
+            with open(f"{ruta}.json") as f:
+                referencia = json.load(f)
+        except (OSError, ValueError):
+            referencia = {"id": id_foto, "nombre": id_foto, "tipo": None}
+        referencia["intentos"] = referencia.get("intentos", 0) + 1
+        if referencia["intentos"] < MAX_INTENTOS:
+            with open(f"{ruta}.json", "w") as f:
+                json.dump(referencia, f)
+            return
+        destino = os.path.join(self.fallidas, id_foto)
+        os.replace(ruta, destino)
+        with open(f"{destino}.json", "w") as f:
+            json.dump(referencia, f)
+        with open(f"{destino}.error", "w") as f:
+            f.write(f"{type(error).__name__}: {error}\n")
+        os.remove(f"{ruta}.json")
+        try:
+            self._marcar(referencia, f"No se pudo procesar: {error}")
+        except Exception:
+            pass
+
+    def _marcar(self, referencia, error):
+        # Marca de error en la miniatura: la foto ya no está en proceso (si había miniatura, se conserva)
+        self.db()[COLECCION_MINIATURAS].update_one(
+            {"_id": ObjectId(referencia["id"])},
+            {"$set": {"error": str(error)[:200], "nombre": referencia["nombre"]}},
+            upsert=True,
+        )
+
+    def _procesar(self, referencia, datos):
+        try:
+            webp, ancho, alto = miniatura(datos)
+        except Exception:
+            # Archivo que Pillow no puede abrir: se guarda el original sin miniatura
+            self._marcar(referencia, "Sin miniatura: el archivo no se pudo abrir como imagen")
+        else:
+            self.db()[COLECCION_MINIATURAS].replace_one(
+                {"_id": ObjectId(referencia["id"])},
+                {"datos": Binary(webp), "ancho": ancho, "alto": alto, "nombre": referencia["nombre"]},
+                upsert=True,
+            )
+        self.almacen.guardar(referencia["id"], datos, referencia["nombre"], referencia["tipo"])
+
+    def miniaturas(self, ids):
+        """``{id: bytes WebP}`` de las miniaturas disponibles, en una sola consulta"""
+        ids = [ObjectId(i) for i in ids]
+        if not ids:
+            return {}
+        return {
+            str(d["_id"]): bytes(d["datos"])
+            for d in self.db()[COLECCION_MINIATURAS].find({"_id": {"$in": ids}, "datos": {"$exists": True}},
+                                                          {"datos": 1})
+        }
+
+    def errores(self, ids):
+        """``{id: mensaje}`` de las fotos que no tienen ni tendrán miniatura"""
+        ids = [ObjectId(i) for i in ids]
+        if not ids:
+            return {}
+        return {
+            str(d["_id"]): d["error"]
+            for d in self.db()[COLECCION_MINIATURAS].find({"_id": {"$in": ids}, "error": {"$exists": True}},
+                                                          {"error": 1})
+        }
+
+    def original(self, id_foto):
+        """Bytes de la foto original (del disco local si aún no se subió o se apartó)"""
+        for carpeta in (self.pendientes, self.fallidas):
+            ruta = os.path.join(carpeta, id_foto)
+            if os.path.exists(ruta):
+                with open(ruta, "rb") as f:
+                    return f.read()
+        return self.almacen.abrir(id_foto)
+
+    def asegurar(self):
+        """Arrancar el hilo de procesamiento si no está corriendo"""
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._ciclo, name="medios", daemon=True)
+                self._hilo.start()
+
+    def _ciclo(self):
+        while True:
+            try:
+                self.procesar()
+                self._fallos, self.ultimo_error = 0, None
+                espera = self.intervalo
+            except Exception as e:
+                self._fallos += 1
+                self.ultimo_error = e
+                espera = min(self.intervalo * 2 ** self._fallos, BACKOFF_MAX)
+            self._aviso.wait(espera)
+            self._aviso.clear()
+
+
+def primera_foto(doc):
+    """Id de la primera foto de un registro (o None)"""
+    fotos = doc.get("fotos") or []
+    return fotos[0]["id"] if fotos else None
+
+
+@st.cache_resource
+def get_medios(_db):
+    """Procesador de fotos único por proceso, con su hilo en marcha"""
+    medios = Medios(_db)
+    medios.asegurar()
+    return medios
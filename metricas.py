@@ -0,0 +1,265 @@
+"""Instrumentación de rendimiento.
+
+Cada operación medida (sección, consulta a MongoDB, llamada a ThingSpeak,
+construcción del mapa, análisis de imágenes...) se registra como un *span*
+con su duración, tamaño de la respuesta y atributos. El registro es único
+por proceso y se consulta desde el panel de administración de la barra
+lateral, o se exporta como JSON o en formato de texto de Prometheus.
+
+Con la instrumentación apagada (por defecto, ``METRICAS=1`` la enciende al
+arrancar), ``medir`` devuelve un span vacío compartido y no se registra
+nada. Si se define ``METRICAS_PUERTO``, un servidor HTTP mínimo expone
+``/metrics`` para que Prometheus lo consulte.
+"""
+import json
+import os
+import threading
+import time
+from collections import defaultdict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from pymongo import monitoring
+
+ACTIVO = os.environ.get("METRICAS", "0") == "1"
+# Muestra el panel de administración en la barra lateral
+PANEL_ADMIN = os.environ.get("METRICAS_ADMIN", "0") == "1"
+PUERTO = os.environ.get("METRICAS_PUERTO")
+# Spans recientes que se conservan y muestras por nombre para percentiles
+MAX_SPANS = 2000
+MAX_MUESTRAS = 500
+# Límites (segundos) de los buckets del histograma de Prometheus
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+PREFIJO = "geodata"
+
+
+class _Agregado:
+    __slots__ = ("n", "total", "maximo", "bytes", "buckets", "muestras")
+
+    def __init__(self):
+        self.n = 0
+        self.total = 0.0
+        self.maximo = 0.0
+        self.bytes = 0
+        self.buckets = [0] * len(BUCKETS)
+        self.muestras = deque(maxlen=MAX_MUESTRAS)
+
+    def agregar(self, segundos, tamano):
+        self.n += 1
+        self.total += segundos
+        self.maximo = max(self.maximo, segundos)
+        self.bytes += tamano or 0
+        self.muestras.append(segundos)
+        for i, limite in enumerate(BUCKETS):
+            if segundos <= limite:
+                self.buckets[i] += 1
+
+
+class Registro:
+    """Spans recientes, agregados por nombre y contadores de caché (seguro entre hilos)"""
+
+    def __init__(self, activo=ACTIVO):
+        self.activo = activo
+        self._lock = threading.Lock()
+        self._spans = deque(maxlen=MAX_SPANS)
+        self._agregados = defaultdict(_Agregado)
+        self._cache = defaultdict(int)
+
+    def registrar(self, nombre, segundos, tamano=None, **atributos):
+        span = {"nombre": nombre, "ms": round(segundos * 1000, 3), "fin": time.time(),
+                "hilo": threading.current_thread().name, **atributos}
+        if tamano is not None:
+            span["bytes"] = tamano
+        with self._lock:
+            self._spans.append(span)
+            self._agregados[nombre].agregar(segundos, tamano)
+
+    def cache(self, nombre, acierto):
+        """Contar un acierto o fallo de la caché ``nombre``"""
+        if self.activo:
+            with self._lock:
+                self._cache[(nombre, "acierto" if acierto else "fallo")] += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._spans.clear()
+            self._agregados.clear()
+            self._cache.clear()
+
+    def spans(self, n=100):
+        """Últimos ``n`` spans, del más reciente al más antiguo"""
+        with self._lock:
+            return list(self._spans)[-n:][::-1]
+
+    def resumen(self):
+        """Filas por nombre: cantidad, media, p50, p95, máximo (ms) y bytes"""
+        with self._lock:
+            agregados = {nombre: (a.n, a.total, a.maximo, a.bytes, sorted(a.muestras))
+                         for nombre, a in self._agregados.items()}
+        filas = []
+        for nombre, (n, total, maximo, tamano, muestras) in sorted(agregados.items()):
+            filas.append({
+                "nombre": nombre,
+                "n": n,
+                "media_ms": round(total / n * 1000, 2),
+                "p50_ms": round(_percentil(muestras, 0.5) * 1000, 2),
+                "p95_ms": round(_percentil(muestras, 0.95) * 1000, 2),
+                "max_ms": round(maximo * 1000, 2),
+                "bytes": tamano,
+            })
+        return filas
+
+    def a_json(self, spans=200):
+        """Resumen, cachés y spans recientes como texto JSON"""
+        with self._lock:
+            cache = [{"cache": n, "resultado": r, "n": v} for (n, r), v in sorted(self._cache.items())]
+        return json.dumps(
+            {"activo": self.activo, "resumen": self.resumen(), "cache": cache, "spans": self.spans(spans)},
+            ensure_ascii=False, default=str, indent=2,
+        )
+
+    def a_prometheus(self):
+        """Histogramas, bytes y cachés en el formato de texto de Prometheus"""
+        with self._lock:
+            agregados = {n: (a.n, a.total, a.bytes, list(a.buckets)) for n, a in self._agregados.items()}
+            cache = dict(self._cache)
+        lineas = [
+            f"# HELP {PREFIJO}_span_segundos Duración de las operaciones instrumentadas",
+            f"# TYPE {PREFIJO}_span_segundos histogram",
+        ]
+        for nombre, (n, total, _, buckets) in sorted(agregados.items()):
+            etiqueta = _etiqueta(nombre)
+            for limite, cuenta in zip(BUCKETS, buckets):
+                lineas.append(f'{PREFIJO}_span_segundos_bucket{{nombre="{etiqueta}",le="{limite}"}} {cuenta}')
+            lineas.append(f'{PREFIJO}_span_segundos_bucket{{nombre="{etiqueta}",le="+Inf"}} {n}')
+            lineas.append(f'{PREFIJO}_span_segundos_sum{{nombre="{etiqueta}"}} {total:.6f}')
+            lineas.append(f'{PREFIJO}_span_segundos_count{{nombre="{etiqueta}"}} {n}')
+        lineas += [
+            f"# HELP {PREFIJO}_bytes_total Bytes recibidos o producidos por operación",
+            f"# TYPE {PREFIJO}_bytes_total counter",
+        ]
+        for nombre, (_, _, tamano, _) in sorted(agregados.items()):
+            lineas.append(f'{PREFIJO}_bytes_total{{nombre="{_etiqueta(nombre)}"}} {tamano}')
+        lineas += [
+            f"# HELP {PREFIJO}_cache_total Aciertos y fallos de las cachés",
+            f"# TYPE {PREFIJO}_cache_total counter",
+        ]
+        for (nombre, resultado), cuenta in sorted(cache.items()):
+            lineas.append(f'{PREFIJO}_cache_total{{cache="{_etiqueta(nombre)}",resultado="{resultado}"}} {cuenta}')
+        return "\n".join(lineas) + "\n"
+
+
+def _percentil(ordenadas, q):
+    if not ordenadas:
+        return 0.0
+    return ordenadas[min(int(q * len(ordenadas)), len(ordenadas) - 1)]
+
+
+def _etiqueta(texto):
+    return str(texto).replace("\\", "\\\\").replace('"', '\\"')
+
+
+class _Span:
+    __slots__ = ("registro", "nombre", "atributos", "inicio", "tamano")
+
+    def __init__(self, registro, nombre, tamano, atributos):
+        self.registro = registro
+        self.nombre = nombre
+        self.atributos = atributos
+        self.tamano = tamano
+
+    def __enter__(self):
+        self.inicio = time.perf_counter()
+        return self
+
+    def __exit__(self, tipo, valor, traza):
+        if tipo is not None:
+            self.atributos["error"] = tipo.__name__
+        self.registro.registrar(self.nombre, time.perf_counter() - self.inicio, self.tamano, **self.atributos)
+        return False
+
+    def anotar(self, tamano=None, **atributos):
+        """Agregar el tamaño de la respuesta u otros atributos antes de cerrar el span"""
+        if tamano is not None:
+            self.tamano = tamano
+        self.atributos.update(atributos)
+
+
+class _SpanNulo:
+    """Span que no mide nada (instrumentación apagada)"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def anotar(self, tamano=None, **atributos):
+        pass
+
+
+_SPAN_NULO = _SpanNulo()
+registro = Registro()
+
+
+def medir(nombre, tamano=None, **atributos):
+    """Contexto que mide un bloque: ``with medir("mapa:construir") as span: ...``"""
+    if not registro.activo:
+        return _SPAN_NULO
+    return _Span(registro, nombre, tamano, atributos)
+
+
+def activar(activo=True):
+    """Encender o apagar la instrumentación en todo el proceso"""
+    registro.activo = activo
+
+
+class OyenteMongo(monitoring.CommandListener):
+    """Registra la duración de cada comando de MongoDB (``mongo:<comando>``)"""
+
+    def __init__(self):
+        self._colecciones = {}
+
+    def started(self, event):
+        if registro.activo:
+            self._colecciones[event.request_id] = event.command.get(event.command_name)
+
+    def succeeded(self, event):
+        coleccion = self._colecciones.pop(event.request_id, None)
+        if not registro.activo:
+            return
+        cursor = event.reply.get("cursor") or {}
+        lote = cursor.get("firstBatch", cursor.get("nextBatch"))
+        atributos = {"coleccion": coleccion} if isinstance(coleccion, str) else {}
+        if lote is not None:
+            atributos["documentos"] = len(lote)
+        registro.registrar(f"mongo:{event.command_name}", event.duration_micros / 1e6, **atributos)
+
+    def failed(self, event):
+        self._colecciones.pop(event.request_id, None)
+        if not registro.activo:
+            return
+        registro.registrar(f"mongo:{event.command_name}", event.duration_micros / 1e6, error=str(event.failure))
+
+
+class _Exportador(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip("/") not in ("/metrics", "/metrics.json"):
+            self.send_error(404)
+            return
+        json_ = self.path.rstrip("/").endswith(".json")
+        cuerpo = (registro.a_json() if json_ else registro.a_prometheus()).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json" if json_ else "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(cuerpo)))
+        self.end_headers()
+        self.wfile.write(cuerpo)
+
+    def log_message(self, *args):
+        pass
+
+
+def servir_metricas(puerto):
+    """Servidor HTTP en un hilo de fondo con ``/metrics`` y ``/metrics.json``"""
+    servidor = ThreadingHTTPServer(("0.0.0.0", int(puerto)), _Exportador)
+    threading.Thread(target=servidor.serve_forever, name="metricas-http", daemon=True).start()
+    return servidor
@@ -0,0 +1,123 @@
+"""Conexión compartida a MongoDB Atlas.
+
+Un único ``MongoClient`` por proceso, creado de forma perezosa y reutilizado
+entre todos los reruns y sesiones de Streamlit. Incluye chequeo de salud con
+TTL y backoff exponencial entre chequeos fallidos. El cliente no se cierra ni
+se reemplaza tras un fallo: pymongo vigila los servidores y reconecta solo, y
+las colecciones obtenidas antes siguen siendo válidas.
+"""
+import os
+import threading
+import time
+from urllib.parse import quote_plus
+
+import streamlit as st
+from pymongo import MongoClient
+
+from metricas import OyenteMongo
+
+# Configuración MongoDB (NUEVAS CREDENCIALES)
+usuario = quote_plus(os.environ.get("MONGO_USUARIO", "lauratkd16"))
+clave = quote_plus(os.environ.get("MONGO_CLAVE", "fKYKOOnlSOmLCr06"))
+cluster = os.environ.get("MONGO_CLUSTER", "cluster0.hxuwi7t.mongodb.net")
+base_datos = os.environ.get("MONGO_BASE_DATOS", "sample_mflix")
+uri = f"mongodb+srv://{usuario}:{clave}@{cluster}/?retryWrites=true&w=majority&appName=Cluster0&tlsAllowInvalidCertificates=true"
+
+# Parámetros del pool (ajustables por variables de entorno)
+MAX_POOL_SIZE = int(os.environ.get("MONGO_MAX_POOL_SIZE", "20"))
+MIN_POOL_SIZE = int(os.environ.get("MONGO_MIN_POOL_SIZE", "1"))
+MAX_IDLE_TIME_MS = int(os.environ.get("MONGO_MAX_IDLE_TIME_MS", "300000"))
+SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000"))
+
+# Chequeo de salud y reconexión
+HEALTH_TTL = float(os.environ.get("MONGO_HEALTH_TTL", "30"))
+BACKOFF_BASE = float(os.environ.get("MONGO_BACKOFF_BASE", "1"))
+BACKOFF_MAX = float(os.environ.get("MONGO_BACKOFF_MAX", "60"))
+
+
+class MongoManager:
+    """Administrador de la conexión a MongoDB compartido por todo el proceso"""
+
+    def __init__(self, uri, base_datos, **opciones):
+        self.uri = uri
+        self.base_datos = base_datos
+        self.opciones = opciones
+        self._client = None
+        self._lock = threading.Lock()
+        self._fallos = 0
+        self._proximo_intento = 0.0
+        self._ultimo_chequeo = 0.0
+        self._sano = None
+        self._ultimo_error = None
+
+    @property
+    def client(self):
+        """Devuelve el cliente, creándolo en el primer uso"""
+        if self._client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = MongoClient(self.uri, **self.opciones)
+        return self._client
+
+    @property
+    def db(self):
+        return self.client[self.base_datos]
+
+    def collection(self, nombre):
+        """Obtener una colección servida desde el cliente compartido"""
+        return self.db[nombre]
+
+    def _backoff(self):
+        return min(BACKOFF_BASE * (2 ** max(self._fallos - 1, 0)), BACKOFF_MAX)
+
+    def close(self):
+        with self._lock:
+            if self._client is not None:
+                try:
+                    self._client.close()
+                except Exception:
+                    pass
+                self._client = None
+
+    def ping(self, forzar=False):
+        """Chequeo de salud con TTL; tras fallos espera con backoff antes de reintentar"""
+        ahora = time.monotonic()
+        if not forzar and self._sano is not None and ahora - self._ultimo_chequeo < HEALTH_TTL:
+            return self._sano
+        if self._fallos and ahora < self._proximo_intento:
+            return False
+        try:
+            self.client.admin.command("ping")
+            self._fallos = 0
+            self._sano = True
+            self._ultimo_error = None
+        except Exception as e:
+            # Incluye errores al crear el cliente (p. ej. resolución DNS del SRV)
+            self._fallos += 1
+            self._proximo_intento = ahora + self._backoff()
+            self._sano = False
+            self._ultimo_error = e
+        self._ultimo_chequeo = ahora
+        return self._sano
+
+    def estado(self):
+        """Texto de estado para mostrar en la interfaz"""
+        if self.ping():
+            return "✅ Conectado a MongoDB Atlas"
+        return f"❌ Error al conectar con MongoDB: {self._ultimo_error}"
+
+
+@st.cache_resource
+def get_mongo_manager():
+    """Administrador de MongoDB único por proceso (cacheado entre reruns)"""
+    return MongoManager(
+        uri,
+        base_datos,
+        maxPoolSize=MAX_POOL_SIZE,
+        minPoolSize=MIN_POOL_SIZE,
+        maxIdleTimeMS=MAX_IDLE_TIME_MS,
+        serverSelectionTimeoutMS=SERVER_SELECTION_TIMEOUT_MS,
+        connect=False,
+        # Tiempos de cada comando para el panel de rendimiento (ver metricas.py)
+        event_listeners=[OyenteMongo()],
+    )
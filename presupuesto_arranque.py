@@ -0,0 +1,74 @@
+"""Control del tiempo de arranque de la app.
+
+Importa en un proceso nuevo lo que ``app.py`` carga en cada arranque
+(``comun``, ``secciones`` y la sección por defecto) con ``python -X
+importtime`` y falla si:
+
+- aparece alguno de los módulos pesados que solo deben cargarse al abrir
+  la sección que los usa, o
+- el tiempo total de importación supera el presupuesto
+  (``PRESUPUESTO_ARRANQUE_MS``).
+
+Uso (en CI o antes de desplegar)::
+
+    python presupuesto_arranque.py
+"""
+import os
+import re
+import subprocess
+import sys
+import tempfile
+
+# Lo que se importa en cada arranque, sin importar la sección elegida
+MODULOS_ARRANQUE = ("comun", "secciones", "secciones.dashboard")
+# Dependencias que solo usan algunas secciones (pandas ya trae el núcleo de
+# pyarrow, pero no sus lectores de CSV/Parquet)
+PROHIBIDOS = ("cv2", "matplotlib", "seaborn", "pyarrow.csv", "pyarrow.parquet", "shapely", "geopandas",
+              "tifffile", "folium", "plotly.subplots", "plotly.express")
+PRESUPUESTO_MS = float(os.environ.get("PRESUPUESTO_ARRANQUE_MS", "2000"))
+
+_LINEA = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+def medir(modulos=MODULOS_ARRANQUE):
+    """Importar ``modulos`` en un proceso limpio; devuelve ``[(modulo, propio_us, acumulado_us, nivel)]``"""
+    raiz = os.path.dirname(os.path.abspath(__file__))
+    with tempfile.TemporaryDirectory() as temporal:
+        # La cola de escritura y las fotos pendientes crean archivos al importarse
+        entorno = dict(os.environ, PYTHONPATH=raiz, COLA_DB=os.path.join(temporal, "cola.sqlite"),
+                       MEDIOS_PENDIENTES=os.path.join(temporal, "medios"))
+        salida = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import " + ", ".join(modulos)],
+            cwd=temporal, env=entorno, capture_output=True, text=True, check=True,
+        ).stderr
+    filas = []
+    for linea in salida.splitlines():
+        m = _LINEA.match(linea)
+        if m:
+            filas.append((m.group(4), int(m.group(1)), int(m.group(2)), len(m.group(3)) // 2))
+    return filas
+
+
+def revisar(filas, presupuesto_ms=PRESUPUESTO_MS):
+    """Lista de problemas encontrados (vacía si el arranque está dentro del presupuesto)"""
+    problemas = []
+    importados = {modulo for modulo, *_ in filas}
+    for prohibido in PROHIBIDOS:
+        if prohibido in importados:
+            problemas.append(f"{prohibido} se importa al arrancar")
+    total_ms = sum(acumulado for _, _, acumulado, nivel in filas if nivel == 0) / 1000
+    if total_ms > presupuesto_ms:
+        problemas.append(f"el arranque tarda {total_ms:.0f} ms (presupuesto: {presupuesto_ms:.0f} ms)")
+    return total_ms, problemas
+
+
+if __name__ == "__main__":
+    filas = medir()
+    total_ms, problemas = revisar(filas)
+    print(f"Importación al arrancar: {total_ms:.0f} ms (presupuesto: {PRESUPUESTO_MS:.0f} ms)")
+    print("Módulos de primer nivel más lentos:")
+    for modulo, _, acumulado, _ in sorted((f for f in filas if f[3] == 0), key=lambda f: -f[2])[:10]:
+        print(f"  {acumulado / 1000:8.1f} ms  {modulo}")
+    for problema in problemas:
+        print(f"❌ {problema}")
+    sys.exit(1 if problemas else 0)
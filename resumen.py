@@ -0,0 +1,206 @@
+"""Resumen precalculado para el dashboard.
+
+Por cada colección de registros se mantienen contadores en la colección
+``resumen_dashboard``: un documento por dimensión y valor (tipo, especie,
+día, celda de la grilla...) con el número de registros y la suma de algunos
+campos numéricos. Los formularios lo actualizan con ``$inc`` al insertar,
+así el dashboard solo lee unos pocos documentos pequeños.
+
+Reconstrucción completa (registros antiguos o si el resumen se desajusta);
+se arma aparte y reemplaza los contadores al final, así el dashboard no
+queda vacío mientras tanto::
+
+    python resumen.py
+"""
+import math
+from collections import defaultdict
+
+from pymongo import ReplaceOne, UpdateOne
+
+from geo import CAMPO_GEO
+
+COLECCION_RESUMEN = "resumen_dashboard"
+# Tamaño en grados de las celdas precalculadas (~11 km en el ecuador)
+CELDA_RESUMEN = 0.1
+# Dimensiones por las que se cuenta y campos numéricos que se suman
+DIMENSIONES = {
+    "catalogo_fauna": ("tipo", "especie", "dia", "celda"),
+    "registros_clima": ("lluvia", "dia", "celda"),
+}
+SUMAS = {
+    "catalogo_fauna": ("cantidad",),
+    "registros_clima": ("temperatura", "intensidad"),
+}
+
+
+def celda(lat, lon, tamano=CELDA_RESUMEN):
+    """Identificador "x:y" de la celda de la grilla que contiene el punto"""
+    return f"{math.floor(lon / tamano)}:{math.floor(lat / tamano)}"
+
+
+def centro_celda(clave, tamano=CELDA_RESUMEN):
+    """(lat, lon) del centro de una celda a partir de su identificador"""
+    x, y = (int(v) for v in clave.split(":"))
+    return (y + 0.5) * tamano, (x + 0.5) * tamano
+
+
+def _valores(registro, dimension):
+    if dimension == "dia":
+        return str(registro.get("fecha", ""))[:10] or None
+    if dimension == "celda":
+        punto = registro.get(CAMPO_GEO)
+        if not punto:
+            return None
+        lon, lat = punto["coordinates"]
+        return celda(lat, lon)
+    valor = registro.get(dimension)
+    return valor if valor not in (None, "") else "Sin dato"
+
+
+def _operacion(nombre, dimension, valor, n, sumas):
+    inicial = {"coleccion": nombre, "dimension": dimension, "valor": valor}
+    if dimension == "celda":
+        inicial["lat"], inicial["lon"] = centro_celda(valor)
+    return UpdateOne(
+        {"_id": f"{nombre}|{dimension}|{valor}"},
+        {"$inc": {"n": n, **{f"suma_{c}": s for c, s in sumas.items()}}, "$setOnInsert": inicial},
+        upsert=True,
+    )
+
+
+def _operaciones(nombre, registros):
+    acumulado = defaultdict(lambda: [0, defaultdict(float)])
+    for registro in registros:
+        for dimension in DIMENSIONES[nombre]:
+            valor = _valores(registro, dimension)
+            if valor is None:
+                continue
+            entrada = acumulado[(dimension, valor)]
+            entrada[0] += 1
+            for campo in SUMAS[nombre]:
+                if isinstance(registro.get(campo), (int, float)):
+                    entrada[1][campo] += registro[campo]
+    return [
+        _operacion(nombre, dimension, valor, n, sumas)
+        for (dimension, valor), (n, sumas) in acumulado.items()
+    ]
+
+
+def _posterior(registro, limite):
+    try:
+        return limite is None or "_id" not in registro or registro["_id"] > limite
+    except TypeError:
+        return True
+
+
+def registrar(resumen, nombre, registros):
+    """Sumar uno o varios registros recién insertados en la colección ``nombre``"""
+    if isinstance(registros, dict):
+        registros = [registros]
+    operaciones = _operaciones(nombre, registros)
+    if not operaciones:
+        return 0
+    resumen.bulk_write(operaciones, ordered=False)
+    # Durante una reconstrucción, los registros que el recorrido no va a ver
+    # también se suman a la colección temporal
+    reconstruccion = resumen.find_one({"_id": f"{nombre}|reconstruccion"})
+    if reconstruccion is not None:
+        nuevos = [r for r in registros if _posterior(r, reconstruccion["limite"])]
+        if nuevos:
+            resumen.database[reconstruccion["temporal"]].bulk_write(_operaciones(nombre, nuevos), ordered=False)
+    return len(operaciones)
+
+
+def reconstruir(resumen, coleccion, nombre, lote=1000):
+    """Recalcular desde cero el resumen de una colección.
+
+    Los contadores se arman en una colección temporal con los registros que
+    existían al empezar (``_id`` hasta el último de ese momento) y luego
+    reemplazan a los del resumen; los que llegan mientras tanto los suma
+    ``registrar`` también en la temporal, así no se cuentan dos veces.
+    """
+    marca = f"{nombre}|reconstruccion"
+    temporal = resumen.database[f"{resumen.name}_reconstruccion_{nombre}"]
+    temporal.drop()
+    ultimo = coleccion.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+    limite = ultimo["_id"] if ultimo else None
+    resumen.replace_one({"_id": marca}, {"temporal": temporal.name, "limite": limite}, upsert=True)
+    try:
+        proyeccion = {"_id": 0, CAMPO_GEO: 1, "fecha": 1, **{c: 1 for c in DIMENSIONES[nombre] + SUMAS[nombre]}}
+        pendientes, total = [], 0
+        registros = coleccion.find({"_id": {"$lte": limite}}, proyeccion) if limite is not None else []
+        for registro in registros:
+            pendientes.append(registro)
+            if len(pendientes) >= lote:
+                temporal.bulk_write(_operaciones(nombre, pendientes), ordered=False)
+                total += len(pendientes)
+                pendientes = []
+        if pendientes:
+            temporal.bulk_write(_operaciones(nombre, pendientes), ordered=False)
+            total += len(pendientes)
+
+        # Reemplazo documento a documento: el resumen nunca queda vacío
+        vigentes, reemplazos = set(), []
+        for doc in temporal.find({}):
+            vigentes.add(doc["_id"])
+            reemplazos.append(ReplaceOne({"_id": doc["_id"]}, doc, upsert=True))
+            if len(reemplazos) >= lote:
+                resumen.bulk_write(reemplazos, ordered=False)
+                reemplazos = []
+        if reemplazos:
+            resumen.bulk_write(reemplazos, ordered=False)
+        obsoletos = [d["_id"] for d in resumen.find({"coleccion": nombre}, {"_id": 1}) if d["_id"] not in vigentes]
+        if obsoletos:
+            resumen.delete_many({"_id": {"$in": obsoletos}})
+    finally:
+        resumen.delete_one({"_id": marca})
+        temporal.drop()
+    return total
+
+
+def asegurar_resumen(resumen, coleccion, nombre):
+    """Índice del resumen y reconstrucción si aún no existe para la colección"""
+    resumen.create_index([("coleccion", 1), ("dimension", 1)], name="coleccion_dimension")
+    if resumen.find_one({"coleccion": nombre}, {"_id": 1}) is None and coleccion.find_one({}, {"_id": 1}):
+        return reconstruir(resumen, coleccion, nombre)
+    return 0
+
+
+def conteos(resumen, nombre, dimension, suma=None):
+    """``{valor: n}`` (o ``{valor: suma}``) de una dimensión del resumen"""
+    campo = f"suma_{suma}" if suma else "n"
+    return {
+        d["valor"]: d.get(campo, 0)
+        for d in resumen.find({"coleccion": nombre, "dimension": dimension}, {"valor": 1, campo: 1})
+    }
+
+
+def celdas_en_viewport(resumen, nombre, viewport, tamano):
+    """Celdas precalculadas dentro del viewport, reagrupadas al ``tamano`` del zoom.
+
+    Solo es válido si ``tamano`` no es menor que ``CELDA_RESUMEN``; el
+    resultado tiene el mismo formato que ``mapa.agregar_en_celdas``.
+    """
+    filtro = {"coleccion": nombre, "dimension": "celda"}
+    if viewport:
+        sur, oeste, norte, este = viewport
+        filtro["lat"] = {"$gte": sur - CELDA_RESUMEN, "$lte": norte + CELDA_RESUMEN}
+        filtro["lon"] = {"$gte": oeste - CELDA_RESUMEN, "$lte": este + CELDA_RESUMEN}
+    grupos = defaultdict(lambda: [0, 0.0, 0.0])
+    for d in resumen.find(filtro, {"lat": 1, "lon": 1, "n": 1}):
+        g = grupos[(math.floor(d["lon"] / tamano), math.floor(d["lat"] / tamano))]
+        g[0] += d["n"]
+        g[1] += d["lat"] * d["n"]
+        g[2] += d["lon"] * d["n"]
+    return [{"lat": la / n, "lon": lo / n, "n": n} for n, la, lo in grupos.values() if n]
+
+
+if __name__ == "__main__":
+    from mongo import MongoManager, base_datos, uri
+
+    manager = MongoManager(uri, base_datos)
+    resumen = manager.collection(COLECCION_RESUMEN)
+    for nombre in DIMENSIONES:
+        total = reconstruir(resumen, manager.collection(nombre), nombre)
+        print(f"{nombre}: {total} registros resumidos")
+    manager.close()
@@ -0,0 +1,26 @@
+"""Secciones de la app, una por módulo.
+
+Cada módulo expone ``mostrar()`` e importa sus dependencias pesadas
+(OpenCV, Plotly, PyArrow, shapely...) recién cuando se abre la sección, así
+el arranque en frío solo paga por la sección que se está viendo.
+"""
+import importlib
+
+from metricas import medir
+
+SECCIONES = {
+    "📊 Dashboard Principal": "dashboard",
+    "📁 Datos CSV/Satélite": "satelite",
+    "🌐 Datos IoT ThingSpeak": "iot",
+    "🚁 Análisis de Imágenes Drone": "imagenes_drone",
+    "🌧️ Registro Manual Clima": "clima",
+    "🐦 Registro de Fauna": "fauna",
+    "🗂️ Historial de Registros": "registros",
+    "📈 Análisis Espacio-Temporal": "analisis",
+}
+
+
+def mostrar(nombre):
+    """Importar (la primera vez) y dibujar la sección elegida"""
+    with medir(f"seccion:{SECCIONES[nombre]}"):
+        importlib.import_module(f"{__name__}.{SECCIONES[nombre]}").mostrar()
@@ -0,0 +1,118 @@
+"""Sección "📈 Análisis Espacio-Temporal": avistamientos frente a clima y sensores IoT"""
+from datetime import date, timedelta
+
+import plotly.graph_objects as go
+import streamlit as st
+from plotly.subplots import make_subplots
+
+from analitica import (COLECCION_ANALITICA, actualizar, asegurar_analitica, distribucion_temperatura,
+                       especies_por_lluvia, iot_diario, tendencias, zonas)
+from cache_compartida import en_cache
+from comun import coleccion_clima, mongo, preparar_resumen
+from metricas import medir
+from series import get_series_store
+
+CANAL_IOT = "2928250"
+# Cada cuánto se buscan días con registros nuevos para recalcular
+TTL_ACTUALIZACION = 60
+
+
+@en_cache(ttl=TTL_ACTUALIZACION)
+def actualizar_analitica():
+    """Recalcular los días que recibieron registros (como mucho una vez por minuto en todo el despliegue)"""
+    preparar_resumen("catalogo_fauna")
+    preparar_resumen("registros_clima")
+    asegurar_analitica(mongo.collection(COLECCION_ANALITICA))
+    with medir("analitica:actualizar") as span:
+        recalculados = actualizar(mongo.db)
+        span.anotar(**recalculados)
+    return recalculados
+
+
+def mostrar():
+    st.header("📈 Análisis Espacio-Temporal")
+    st.write("Avistamientos de fauna por día o semana y zona, junto a la lluvia, la temperatura "
+             "y los sensores IoT de esos días.")
+
+    try:
+        with st.spinner("Actualizando los resúmenes diarios..."):
+            recalculados = actualizar_analitica()
+        analitica = mongo.collection(COLECCION_ANALITICA)
+        disponibles = zonas(analitica)
+    except Exception as e:
+        st.warning(f"No se pudo actualizar el análisis: {e}")
+        return
+    if any(recalculados.values()):
+        st.caption(f"Días recalculados: {recalculados.get('catalogo_fauna', 0)} de fauna, "
+                   f"{recalculados.get('registros_clima', 0)} de clima.")
+
+    hoy = date.today()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        rango = st.date_input("Rango de fechas", (hoy - timedelta(days=90), hoy))
+    with col2:
+        frecuencia = st.radio("Agrupar por", ["D", "W"], horizontal=True,
+                              format_func=lambda f: "Día" if f == "D" else "Semana")
+    with col3:
+        zona = st.selectbox("Zona", ["", *disponibles],
+                            format_func=lambda z: "Todas" if not z else f"{disponibles[z][0]:.2f}, {disponibles[z][1]:.2f}")
+    if not (isinstance(rango, tuple) and len(rango) == 2):
+        st.info("Elige la fecha final del rango.")
+        return
+    desde, hasta = rango
+
+    iot = None
+    campo_iot = st.selectbox("Cruzar con el sensor IoT", [None, 1, 2, 3, 4],
+                             format_func=lambda c: "Ninguno" if c is None else f"Campo {c}: Sensor {c}")
+    if campo_iot:
+        # Lecturas ya sincronizadas en la sección IoT (almacén local de series)
+        iot = iot_diario(get_series_store(), CANAL_IOT, campo_iot, desde, hasta)
+        if iot.empty:
+            st.caption("No hay lecturas guardadas del sensor en este rango; sincronízalas en 🌐 Datos IoT ThingSpeak.")
+
+    with medir("analitica:tendencias", frecuencia=frecuencia):
+        df = tendencias(analitica, desde, hasta, frecuencia, zona or None, iot)
+    if df.empty:
+        st.info("No hay avistamientos en este rango.")
+    else:
+        # Todas las zonas: sumar avistamientos y promediar el clima de cada periodo
+        serie = df.groupby("periodo").agg(
+            avistamientos=("avistamientos", "sum"), temperatura=("temperatura", "mean"),
+            intensidad=("intensidad", "mean"), iot=("iot", "mean"),
+        )
+        fig = make_subplots(specs=[[{"secondary_y": True}]])
+        fig.add_trace(go.Bar(x=serie.index, y=serie["avistamientos"], name="Avistamientos",
+                             marker_color="#4CAF50"), secondary_y=False)
+        fig.add_trace(go.Scatter(x=serie.index, y=serie["temperatura"], name="Temperatura (°C)",
+                                 mode="lines+markers", line=dict(color="#FF5722")), secondary_y=True)
+        fig.add_trace(go.Scatter(x=serie.index, y=serie["intensidad"], name="Intensidad de lluvia",
+                                 mode="lines+markers", line=dict(color="#2196F3")), secondary_y=True)
+        if iot is not None and serie["iot"].notna().any():
+            fig.add_trace(go.Scatter(x=serie.index, y=serie["iot"], name=f"Sensor {campo_iot}",
+                                     mode="lines", line=dict(color="#9C27B0", dash="dot")), secondary_y=True)
+        fig.update_layout(height=420, title_text="Avistamientos y clima", legend=dict(orientation="h"))
+        fig.update_yaxes(title_text="Avistamientos", secondary_y=False)
+        st.plotly_chart(fig, use_container_width=True)
+
+        with st.expander("📋 Detalle por zona"):
+            st.dataframe(df.round({"temperatura": 2, "intensidad": 2, "iot": 2}), use_container_width=True, hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.caption("🐦 Avistamientos por especie según la intensidad de lluvia")
+        por_lluvia = especies_por_lluvia(analitica, desde, hasta, zona or None)
+        if por_lluvia.empty:
+            st.info("Sin avistamientos en este rango.")
+        else:
+            st.dataframe(por_lluvia, use_container_width=True)
+    with col2:
+        st.caption("🌡️ Lecturas de clima por rango de temperatura")
+        try:
+            distribucion = distribucion_temperatura(coleccion_clima(), desde, hasta)
+        except Exception as e:
+            st.warning(f"No se pudo calcular la distribución: {e}")
+        else:
+            if distribucion.empty:
+                st.info("Sin lecturas de clima en este rango.")
+            else:
+                st.bar_chart(distribucion.set_index("rango")["lecturas"])
@@ -0,0 +1,68 @@
+"""Sección "🌧️ Registro Manual Clima": formulario de condiciones climáticas"""
+from datetime import datetime
+
+import streamlit as st
+
+from comun import cola, estado_mongo, medios, timezone
+from geo import CAMPO_GEO, punto_geojson
+
+
+def mostrar():
+    mongo_status = estado_mongo()
+    st.header("🌧️ Registro Manual de Condiciones Climáticas")
+    st.markdown(f"<span style='color:green'>{mongo_status}</span>", unsafe_allow_html=True)
+
+    st.write("Selecciona la ubicación del reporte haciendo clic en el mapa:")
+
+    from streamlit_folium import st_folium
+    import folium
+
+    # Mapa para seleccionar ubicación
+    default_lat, default_lon = 4.6097, -74.0817
+    clima_map = folium.Map(location=[default_lat, default_lon], zoom_start=10, tiles="OpenStreetMap")
+    map_data = st_folium(clima_map, width=700, height=400)
+
+    lat, lon = None, None
+    if map_data and map_data.get('last_clicked'):
+        lat = map_data['last_clicked']['lat']
+        lon = map_data['last_clicked']['lng']
+        st.success(f"Ubicación seleccionada: {lat:.5f}, {lon:.5f}")
+
+    with st.form("clima_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            fecha = st.date_input("📅 Fecha", datetime.now())
+            hora = st.time_input("🕐 Hora", datetime.now().time())
+        with col2:
+            esta_lloviendo = st.selectbox("🌧️ ¿Está lloviendo?", ["No", "Llovizna", "Lluvia ligera", "Lluvia fuerte"])
+            intensidad = st.slider("Intensidad de lluvia (1-10)", 1, 10, 1)
+            temperatura = st.number_input("🌡️ Temperatura (°C)", min_value=-10, max_value=50, value=20)
+        observaciones = st.text_area("📝 Observaciones adicionales")
+        foto_clima = st.file_uploader("📷 Foto de las condiciones climáticas", type=["png", "jpg", "jpeg"])
+        submitted = st.form_submit_button("💾 Guardar Registro")
+
+        if submitted:
+            if lat is None or lon is None:
+                st.error("Debes seleccionar una ubicación en el mapa.")
+            else:
+                registro = {
+                    'fecha': str(fecha),
+                    'hora': str(hora),
+                    'ubicacion': f"{lat},{lon}",
+                    CAMPO_GEO: punto_geojson(lat, lon),
+                    'lluvia': esta_lloviendo,
+                    'intensidad': int(intensidad),
+                    'temperatura': float(temperatura),
+                    'observaciones': observaciones,
+                    'fotos': [medios.recibir(foto_clima)] if foto_clima else [],
+                    'timestamp': datetime.now(timezone).isoformat()
+                }
+                try:
+                    cola.encolar("registros_clima", registro)
+                    st.success("✅ Registro guardado! Se enviará a la base de datos en segundo plano.")
+                except Exception as e:
+                    st.error(f"Error al guardar el registro: {e}")
+
+                st.json(registro)
+                if foto_clima:
+                    st.image(foto_clima, caption="Foto del clima registrada")
@@ -0,0 +1,172 @@
+"""Sección "📊 Dashboard Principal": métricas, resumen y mapa de registros"""
+import pandas as pd
+import streamlit as st
+
+from comun import (coleccion_clima, coleccion_fauna, coleccion_indices, coleccion_resumen, medios,
+                   preparar_geo, preparar_resumen)
+from drone import NOMBRES_INDICES
+from geo import CAMPO_GEO, bounds_de_mapa, filtro_viewport
+from medios import primera_foto
+from metricas import medir
+from resumen import CELDA_RESUMEN, celdas_en_viewport, conteos
+
+
+def mostrar():
+    st.header("📊 Dashboard de Monitoreo en Tiempo Real")
+
+    # Contar registros en MongoDB (conteo estimado: metadatos, sin recorrer la colección)
+    try:
+        total_fauna = coleccion_fauna().estimated_document_count()
+    except Exception:
+        total_fauna = 0
+    try:
+        total_clima = coleccion_clima().estimated_document_count()
+    except Exception:
+        total_clima = 0
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Registros de Fauna", f"{total_fauna}")
+    with col2:
+        st.metric("Registros de Clima", f"{total_clima}")
+
+    # Resumen precalculado (se actualiza al guardar cada registro)
+    try:
+        preparar_resumen("catalogo_fauna")
+        preparar_resumen("registros_clima")
+        fauna_por_tipo = conteos(coleccion_resumen(), "catalogo_fauna", "tipo")
+        fauna_por_dia = conteos(coleccion_resumen(), "catalogo_fauna", "dia")
+        clima_por_dia = conteos(coleccion_resumen(), "registros_clima", "dia")
+        if fauna_por_tipo or fauna_por_dia or clima_por_dia:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.caption("🐦 Avistamientos por tipo")
+                st.bar_chart(pd.Series(fauna_por_tipo, name="Avistamientos").sort_values(ascending=False))
+            with col2:
+                st.caption("📅 Registros por día")
+                por_dia = pd.DataFrame({"Fauna": fauna_por_dia, "Clima": clima_por_dia}).fillna(0).sort_index()
+                st.line_chart(por_dia.tail(90))
+    except Exception as e:
+        st.warning(f"No se pudo leer el resumen del dashboard: {e}")
+
+    st.subheader("🗺️ Ubicaciones de Monitoreo")
+
+    # --- NUEVO: Obtener datos de MongoDB ---
+    try:
+        # Solo se consultan los puntos dentro del área visible del mapa
+        vista = st.session_state.get('dashboard_vista', {})
+        filtro = filtro_viewport(vista.get('viewport'))
+
+        from mapa import (LIMITE_DETALLE, LIMITE_IMAGENES_INDICES, LIMITE_MINIATURAS_MAPA, UMBRAL_AGREGACION,
+                          agregar_capa_indices, agregar_celdas_al_mapa, agregar_en_celdas,
+                          agregar_puntos_al_mapa, filtro_celda, puntos_clima, puntos_fauna, supera_umbral,
+                          tamano_celda)
+
+        with st.expander("⚙️ Opciones del mapa"):
+            umbral = st.number_input(
+                "Máximo de marcadores individuales (por encima se agrupan en celdas)",
+                min_value=100, max_value=20000, value=UMBRAL_AGREGACION, step=100
+            )
+            capa_indices = st.selectbox(
+                "Capa de índices de vegetación (imágenes de drone)",
+                ["Ninguna", *NOMBRES_INDICES]
+            )
+
+        preparar_geo("catalogo_fauna")
+        preparar_geo("registros_clima")
+        zoom = vista.get('zoom', 8)
+        agregado = supera_umbral(coleccion_fauna(), filtro, umbral) or supera_umbral(coleccion_clima(), filtro, umbral)
+
+        with medir("mapa:consultar", agregado=agregado):
+            fauna_map, clima_map = [], []
+            if agregado:
+                # Demasiados puntos: agrupar en celdas en el servidor
+                tamano = tamano_celda(zoom)
+                if tamano >= CELDA_RESUMEN:
+                    # Zoom alejado: basta con reagrupar las celdas precalculadas
+                    fauna_celdas = celdas_en_viewport(coleccion_resumen(), "catalogo_fauna", vista.get('viewport'), tamano)
+                    clima_celdas = celdas_en_viewport(coleccion_resumen(), "registros_clima", vista.get('viewport'), tamano)
+                else:
+                    fauna_celdas = agregar_en_celdas(coleccion_fauna(), filtro, tamano)
+                    clima_celdas = agregar_en_celdas(coleccion_clima(), filtro, tamano)
+            else:
+                fauna_data = list(coleccion_fauna().find(filtro, {CAMPO_GEO: 1, "tipo": 1, "especie": 1, "cantidad": 1, "fotos": 1, "_id": 0}))
+                clima_data = list(coleccion_clima().find(filtro, {CAMPO_GEO: 1, "lluvia": 1, "temperatura": 1, "fotos": 1, "_id": 0}))
+
+                # Miniaturas de la primera foto de cada registro, en una sola consulta
+                con_foto = [i for i in map(primera_foto, fauna_data + clima_data) if i]
+                fotos = medios.miniaturas(con_foto[:LIMITE_MINIATURAS_MAPA])
+
+                fauna_map = puntos_fauna(fauna_data, fotos)
+                clima_map = puntos_clima(clima_data, fotos)
+
+        # Mostrar mapa con folium
+        from streamlit_folium import st_folium
+        import folium
+
+        with medir("mapa:construir", marcadores=len(fauna_map) + len(clima_map)):
+            m = folium.Map(location=vista.get('centro', [4.6097, -74.0817]), zoom_start=zoom, tiles="OpenStreetMap")
+
+            if agregado:
+                agregar_celdas_al_mapa(m, fauna_celdas, "green", "Fauna")
+                agregar_celdas_al_mapa(m, clima_celdas, "blue", "Clima")
+                st.caption("Hay muchos puntos en esta zona: se muestran agrupados. Haz clic en un grupo para ver sus registros o acerca el mapa.")
+
+            # Puntos de fauna (verde) y de clima (azul)
+            agregar_puntos_al_mapa(m, fauna_map, "green")
+            agregar_puntos_al_mapa(m, clima_map, "blue")
+
+            # Índices de vegetación de los vuelos de drone (capa de calor)
+            if capa_indices != "Ninguna":
+                preparar_geo("indices_drone")
+                documentos = coleccion_indices().find(filtro, {"indices": 1, "celdas": 1}).limit(LIMITE_IMAGENES_INDICES)
+                if agregar_capa_indices(m, documentos, capa_indices):
+                    st.caption(f"Capa de calor: las zonas más intensas tienen el {capa_indices} más bajo (menor vigor).")
+
+            # Leyenda personalizada con texto negro
+            legend_html = """
+            <div style="position: fixed; 
+                        bottom: 50px; left: 50px; width: 180px; height: 70px; 
+                        background-color: white; border:2px solid grey; z-index:9999; font-size:14px;
+                        border-radius: 8px; padding: 10px;">
+            <b style="color:black;">Leyenda</b><br>
+            <span style="color:green;">●</span> <span style="color:black;">Fauna</span><br>
+            <span style="color:blue;">●</span> <span style="color:black;">Clima</span>
+            </div>
+            """
+            m.get_root().html.add_child(folium.Element(legend_html))
+
+        with medir("mapa:st_folium"):
+            map_data = st_folium(m, width=900, height=500, key="dashboard_map")
+
+        # Si el usuario movió el mapa, volver a consultar con el nuevo viewport
+        viewport = bounds_de_mapa(map_data.get('bounds')) if map_data else None
+        if viewport and viewport != vista.get('viewport'):
+            centro = map_data.get('center') or {}
+            st.session_state['dashboard_vista'] = {
+                'viewport': viewport,
+                'centro': [centro.get('lat', 4.6097), centro.get('lng', -74.0817)],
+                'zoom': map_data.get('zoom') or vista.get('zoom', 8),
+            }
+            st.rerun()
+
+        # Detalle bajo demanda del grupo seleccionado
+        clic = map_data.get('last_object_clicked') if map_data else None
+        if agregado and clic:
+            filtro_grupo = filtro_celda(clic['lat'], clic['lng'], tamano_celda(zoom))
+            st.markdown("**📍 Registros del grupo seleccionado**")
+            col1, col2 = st.columns(2)
+            with col1:
+                st.caption("🟢 Fauna")
+                st.dataframe(pd.DataFrame(list(coleccion_fauna().find(
+                    filtro_grupo, {"fecha": 1, "tipo": 1, "especie": 1, "cantidad": 1, "_id": 0}
+                ).limit(LIMITE_DETALLE))), use_container_width=True)
+            with col2:
+                st.caption("🔵 Clima")
+                st.dataframe(pd.DataFrame(list(coleccion_clima().find(
+                    filtro_grupo, {"fecha": 1, "lluvia": 1, "temperatura": 1, "_id": 0}
+                ).limit(LIMITE_DETALLE))), use_container_width=True)
+
+    except Exception as e:
+        st.warning("No se pudieron mostrar los registros en el mapa. Verifica la conexión a MongoDB y el formato de las ubicaciones.")
+        st.text(f"Error: {e}")
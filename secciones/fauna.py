@@ -0,0 +1,118 @@
+"""Sección "🐦 Registro de Fauna": formulario de avistamientos y últimas fotos"""
+from datetime import datetime
+
+import streamlit as st
+
+from comun import cola, coleccion_fauna, estado_mongo, medios, timezone
+from geo import CAMPO_GEO, punto_geojson
+from medios import primera_foto
+
+
+def mostrar():
+    mongo_status = estado_mongo()
+    st.header("🐦 Registro de Fauna y Especies")
+    st.markdown(f"<span style='color:green'>{mongo_status}</span>", unsafe_allow_html=True)
+
+    st.write("Selecciona la ubicación del avistamiento haciendo clic en el mapa:")
+
+    # IMPORTANTE: importar folium y st_folium aquí
+    from streamlit_folium import st_folium
+    import folium
+
+    # Definir coordenadas por defecto
+    default_lat, default_lon = 4.6097, -74.0817
+
+    # Mapa para seleccionar ubicación
+    fauna_map = folium.Map(location=[default_lat, default_lon], zoom_start=10, tiles="OpenStreetMap")
+    map_data_fauna = st_folium(fauna_map, width=700, height=400)
+
+    lat_fauna, lon_fauna = None, None
+    if map_data_fauna and map_data_fauna.get('last_clicked'):
+        lat_fauna = map_data_fauna['last_clicked']['lat']
+        lon_fauna = map_data_fauna['last_clicked']['lng']
+        st.success(f"Ubicación seleccionada: {lat_fauna:.5f}, {lon_fauna:.5f}")
+
+    with st.form("fauna_form"):
+        col1, col2 = st.columns(2)
+        with col1:
+            fecha_avistamiento = st.date_input("📅 Fecha de Avistamiento", datetime.now())
+            hora_avistamiento = st.time_input("🕐 Hora", datetime.now().time())
+        with col2:
+            tipo_especie = st.selectbox("🔍 Tipo de Especie", 
+                ["Ave", "Mamífero", "Reptil", "Anfibio", "Pez", "Insecto", "Otro"])
+            nombre_especie = st.text_input("📛 Nombre de la especie (si se conoce)")
+            cantidad = st.number_input("🔢 Cantidad observada", min_value=1, value=1)
+        comportamiento = st.multiselect("🎭 Comportamiento observado", 
+            ["Alimentándose", "Descansando", "Volando", "Nadando", "Nidificando", 
+             "En grupo", "Solitario", "Interacción social"])
+        descripcion = st.text_area("📝 Descripción detallada")
+        fotos_fauna = st.file_uploader("📸 Fotos de la especie", 
+                                     type=["png", "jpg", "jpeg"], 
+                                     accept_multiple_files=True)
+        condiciones_clima = st.text_input("🌤️ Condiciones climáticas durante el avistamiento")
+        submitted_fauna = st.form_submit_button("💾 Guardar Avistamiento")
+
+        if submitted_fauna:
+            if lat_fauna is None or lon_fauna is None:
+                st.error("Debes seleccionar una ubicación en el mapa.")
+            else:
+                registro_fauna = {
+                    'fecha': str(fecha_avistamiento),
+                    'hora': str(hora_avistamiento),
+                    'ubicacion': f"{lat_fauna},{lon_fauna}",
+                    CAMPO_GEO: punto_geojson(lat_fauna, lon_fauna),
+                    'tipo': tipo_especie,
+                    'especie': nombre_especie,
+                    'cantidad': int(cantidad),
+                    'comportamiento': comportamiento,
+                    'descripcion': descripcion,
+                    'condiciones': condiciones_clima,
+                    'fotos': [medios.recibir(foto) for foto in fotos_fauna or []],
+                    'timestamp': datetime.now(timezone).isoformat()
+                }
+                try:
+                    cola.encolar("catalogo_fauna", registro_fauna)
+                    st.success("✅ Avistamiento registrado! Se enviará a la base de datos en segundo plano.")
+                except Exception as e:
+                    st.error(f"Error al guardar el avistamiento: {e}")
+
+                st.json(registro_fauna)
+                if fotos_fauna:
+                    st.subheader("📸 Fotos Registradas:")
+                    cols = st.columns(min(len(fotos_fauna), 3))
+                    for i, foto in enumerate(fotos_fauna):
+                        with cols[i % 3]:
+                            st.image(foto, caption=f"Foto {i+1}")
+
+    # Últimos avistamientos con foto (solo se cargan las miniaturas)
+    with st.expander("📸 Últimos avistamientos con foto"):
+        try:
+            recientes = list(coleccion_fauna().find(
+                {"fotos.0": {"$exists": True}}, {"especie": 1, "tipo": 1, "fecha": 1, "fotos": 1}
+            ).sort("_id", -1).limit(12))
+            if not recientes:
+                st.info("Aún no hay avistamientos con foto.")
+            ids = [primera_foto(d) for d in recientes]
+            miniaturas = medios.miniaturas(ids)
+            errores = medios.errores(ids)
+            cols = st.columns(4)
+            for i, d in enumerate(recientes):
+                id_foto = primera_foto(d)
+                with cols[i % 4]:
+                    miniatura = miniaturas.get(id_foto)
+                    if miniatura:
+                        st.image(miniatura, caption=f"{d.get('especie') or d.get('tipo', '')} · {d.get('fecha', '')}")
+                    elif id_foto in errores:
+                        st.caption(f"⚠️ {errores[id_foto]}")
+                    else:
+                        st.caption("🕓 Miniatura en proceso")
+                    # El original se trae solo cuando se pide
+                    if st.button("🔍 Original", key=f"original_{id_foto}"):
+                        try:
+                            foto = d["fotos"][0]
+                            st.download_button("⬇️ Descargar", medios.original(id_foto), file_name=foto["nombre"],
+                                               mime=foto.get("tipo"), key=f"descargar_{id_foto}")
+                        except Exception as e:
+                            st.warning(f"Original no disponible: {e}")
+        except Exception as e:
+            st.warning(f"No se pudieron cargar las fotos: {e}")
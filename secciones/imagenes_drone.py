@@ -0,0 +1,311 @@
+"""Sección "🚁 Análisis de Imágenes Drone": análisis individual, por lotes e índices georreferenciados"""
+import io
+from datetime import datetime
+
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+import streamlit as st
+from PIL import Image
+
+from cache_compartida import get_cache_compartida
+from comun import coleccion_indices, mongo, timezone
+from metricas import medir, registro
+from drone import (PIXELES_MAPA, PROCESOS_LOTE, RANGOS_VEGETACION, CacheAnalisis, abrir_fuente, analizar_imagen,
+                   analizar_lote, documento_indices, fuente_de_bytes, indices_por_celda, leer_gps,
+                   muestra_reducida, reporte_vuelo)
+from trabajos import ERROR, LISTO, MODO as MODO_TRABAJOS, ColaTrabajos
+
+# Cada cuánto se consulta la cola mientras hay análisis en los trabajadores
+INTERVALO_COLA = 2
+
+
+@st.cache_resource
+def get_cache_analisis():
+    """Caché de análisis de imágenes compartida por todas las sesiones (y réplicas, con CACHE_URL)"""
+    compartida = get_cache_compartida()
+    return CacheAnalisis(compartida=compartida if compartida.compartida else None)
+
+
+@st.cache_resource
+def get_cola_trabajos():
+    """Cola de trabajos pesados (modo ``TRABAJOS_MODO=cola``)"""
+    cola = ColaTrabajos(mongo.db)
+    cola.asegurar_indices()
+    return cola
+
+
+class TrabajoFallido(RuntimeError):
+    """Análisis que terminó con error en el trabajador; se puede volver a encolar"""
+
+    def __init__(self, mensaje, clave, datos, **parametros):
+        super().__init__(mensaje)
+        self.clave = clave
+        self.datos = datos
+        self.parametros = parametros
+
+    def reintentar(self):
+        get_cola_trabajos().encolar("drone:analizar", self.clave, self.datos, **self.parametros)
+
+
+def resultado_en_cola(clave, datos, vista_previa=False, mapa=False):
+    """Resultado del trabajador si ya terminó; si no, encolarlo y devolver None"""
+    cola = get_cola_trabajos()
+    trabajo = cola.estado(clave)
+    if trabajo is None:
+        cola.encolar("drone:analizar", clave, datos, vista_previa=vista_previa, mapa=mapa)
+        return None
+    if trabajo["estado"] == ERROR:
+        raise TrabajoFallido(trabajo.get("error", "el trabajador no pudo analizar la imagen"),
+                             clave, datos, vista_previa=vista_previa, mapa=mapa)
+    if trabajo["estado"] != LISTO:
+        return None
+    resultado = cola.resultado(clave)
+    get_cache_analisis().guardar(clave, resultado)
+    return resultado
+
+
+@st.fragment(run_every=INTERVALO_COLA)
+def esperar_trabajos(claves):
+    """Progreso de los análisis en cola; recarga la página cuando terminan todos"""
+    hechos = get_cola_trabajos().terminados(claves)
+    if hechos == len(claves):
+        st.rerun()
+    st.progress(hechos / len(claves), text=f"⏳ {hechos} de {len(claves)} análisis terminados en los trabajadores...")
+
+
+def analyze_drone_image(fuente, datos, vista_previa=False, mapa=False, pendientes=None):
+    """Analizar colores RGB y vegetación de una imagen en una sola pasada (ver drone.py)
+
+    ``fuente`` sale de ``fuente_de_bytes(datos)``: los TIFF sin comprimir se
+    leen por bloques y se reparten entre ``PROCESOS_LOTE`` procesos. El resultado se guarda por hash de ``datos`` (bytes del archivo), así que
+    los reruns y las subidas repetidas de la misma imagen no se recalculan.
+    En modo cola el análisis lo hace un trabajador: devuelve None y agrega la
+    clave a ``pendientes`` hasta que termine.
+    """
+    try:
+        cache = get_cache_analisis()
+        clave = cache.clave(datos, RANGOS_VEGETACION, vista_previa=vista_previa, mapa=mapa)
+        resultado = cache.obtener(clave)
+        registro.cache("drone", resultado is not None)
+        if resultado is None and MODO_TRABAJOS == "cola":
+            resultado = resultado_en_cola(clave, datos, vista_previa=vista_previa, mapa=mapa)
+            if resultado is None and pendientes is not None:
+                pendientes.append(clave)
+        elif resultado is None:
+            f = abrir_fuente(fuente)
+            with medir("drone:analizar", pixeles=f.ancho * f.alto, tamano=len(datos)):
+                resultado = analizar_imagen(f, procesos=PROCESOS_LOTE, vista_previa=vista_previa, mapa=mapa)
+            cache.guardar(clave, resultado)
+        return resultado
+    except TrabajoFallido as e:
+        st.error(f"Error en análisis de vegetación: {e}")
+        if st.button("🔁 Reintentar análisis", key=f"reintentar_{e.clave}"):
+            e.reintentar()
+            st.rerun()
+        return None
+    except Exception as e:
+        st.error(f"Error en análisis de vegetación: {e}")
+        return None
+
+
+def guardar_indices_vuelo(archivos, altura_manual):
+    """Calcular y guardar los índices por celda de las imágenes con GPS.
+
+    Devuelve ``(guardadas, sin_gps, fallidas)``; una imagen dañada o que no
+    se puede leer como RGB se salta y queda en ``fallidas`` con su error.
+    """
+    guardadas, sin_gps, fallidas = 0, [], []
+    for archivo in archivos:
+        datos = archivo.getvalue()
+        try:
+            imagen = Image.open(io.BytesIO(datos))
+            gps = leer_gps(imagen, datos)
+            if gps is None:
+                sin_gps.append(archivo.name)
+                continue
+            altura = gps["altura_relativa"] or altura_manual
+            doc = documento_indices(
+                archivo.name, CacheAnalisis.clave(datos), gps, altura,
+                imagen.width, imagen.height, indices_por_celda(imagen)
+            )
+        except Exception as e:
+            fallidas.append((archivo.name, e))
+            continue
+        doc["timestamp"] = datetime.now(timezone).isoformat()
+        coleccion_indices().replace_one({"_id": doc["_id"]}, doc, upsert=True)
+        guardadas += 1
+    return guardadas, sin_gps, fallidas
+
+
+def analizar_lote_en_cola(archivos, vista_previa=False):
+    """Encolar las imágenes del vuelo; devuelve ``([resultado, Exception o None], claves pendientes)``"""
+    cache = get_cache_analisis()
+    resultados, pendientes = [], []
+    for archivo in archivos:
+        datos = archivo.getvalue()
+        clave = cache.clave(datos, vista_previa=vista_previa, mapa=False)
+        try:
+            resultado = cache.obtener(clave) or resultado_en_cola(clave, datos, vista_previa=vista_previa)
+        except Exception as e:
+            resultado = e
+        if resultado is None:
+            pendientes.append(clave)
+        resultados.append(resultado)
+    return resultados, pendientes
+
+
+def mostrar_reporte_vuelo(resultados):
+    """Cobertura total del vuelo, imágenes atípicas y tabla descargable"""
+    tabla, totales, errores = reporte_vuelo(resultados)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        for veg_type, percentage in totales.items():
+            st.metric(f"{veg_type} (vuelo)", f"{percentage:.1f}%")
+    with col2:
+        fig_pie = px.pie(values=list(totales.values()), names=list(totales.keys()), title="Cobertura del Vuelo")
+        st.plotly_chart(fig_pie, use_container_width=True)
+
+    atipicas = tabla[tabla["Atípica"] != ""]
+    if not atipicas.empty:
+        st.warning(f"⚠️ {len(atipicas)} imágenes con cobertura atípica: {', '.join(f'{i} (N.º {n})' for n, i in zip(atipicas['N.º'], atipicas['Imagen']))}")
+    st.dataframe(tabla, use_container_width=True, hide_index=True)
+    st.download_button("⬇️ Descargar reporte CSV", tabla.to_csv(index=False), file_name="reporte_vuelo.csv", mime="text/csv")
+    for n, nombre, mensaje in errores:
+        st.error(f"Error al procesar imagen {nombre} (N.º {n}): {mensaje}")
+
+
+# A partir de cuántas imágenes se propone el modo lote
+UMBRAL_LOTE = 10
+
+# Colores del mapa de clases: sin clase, Vegetación Sana, Vegetación Seca, Suelo/Tierra
+COLORES_CLASES = np.array([[200, 200, 200], [46, 125, 50], [205, 175, 60], [121, 85, 72]], dtype=np.uint8)
+
+
+def mostrar():
+    st.header("🚁 Análisis de Imágenes de Drone")
+    
+    uploaded_images = st.file_uploader(
+        "📸 Sube imágenes de drone (PNG, JPG, JPEG, TIFF)", 
+        type=["png", "jpg", "jpeg", "tif", "tiff"], 
+        accept_multiple_files=True
+    )
+    vista_previa = st.checkbox(
+        "⚡ Vista previa rápida",
+        help="Analiza una versión reducida de cada imagen (recomendado para ortomosaicos grandes)"
+    )
+    mostrar_mapa = st.checkbox("🗺️ Mostrar mapa de clases")
+    
+    modo_lote = st.toggle(
+        "📦 Modo lote (vuelo completo)",
+        value=bool(uploaded_images) and len(uploaded_images) > UMBRAL_LOTE,
+        help="Analiza todas las imágenes en paralelo y muestra un único reporte del vuelo"
+    )
+
+    if uploaded_images and modo_lote:
+        st.subheader(f"📦 Reporte del vuelo ({len(uploaded_images)} imágenes)")
+        if MODO_TRABAJOS == "cola":
+            resultados, pendientes = analizar_lote_en_cola(uploaded_images, vista_previa)
+            if pendientes:
+                esperar_trabajos(pendientes)
+                resultados = None
+        else:
+            progreso = st.progress(0.0, text="Analizando imágenes...")
+            resultados = analizar_lote(
+                [(f.name, f.getvalue()) for f in uploaded_images],
+                vista_previa=vista_previa,
+                cache=get_cache_analisis(),
+                al_avanzar=lambda hechas, total: progreso.progress(hechas / total, text=f"Analizadas {hechas} de {total}")
+            )
+            progreso.empty()
+        if resultados is not None:
+            mostrar_reporte_vuelo([(f.name, r) for f, r in zip(uploaded_images, resultados)])
+            fallidos = [r for r in resultados if isinstance(r, TrabajoFallido)]
+            if fallidos and st.button(f"🔁 Reintentar {len(fallidos)} imágenes con error"):
+                for fallido in fallidos:
+                    fallido.reintentar()
+                st.rerun()
+
+    elif uploaded_images:
+        pendientes = []
+        for uploaded_image in uploaded_images:
+            st.subheader(f"🖼️ Análisis: {uploaded_image.name}")
+            
+            try:
+                # Un solo análisis por imagen: promedios, cobertura, histogramas y mapa
+                datos = uploaded_image.getvalue()
+                en_cola = len(pendientes)
+                with fuente_de_bytes(datos) as fuente:
+                    analisis = analyze_drone_image(fuente, datos, vista_previa=vista_previa,
+                                                   mapa=mostrar_mapa, pendientes=pendientes)
+                    # Para mostrar basta una versión reducida (no se decodifica un TIFF grande entero)
+                    original = muestra_reducida(abrir_fuente(fuente), PIXELES_MAPA) if analisis else None
+                if analisis is None:
+                    if len(pendientes) > en_cola:
+                        st.info("⏳ Imagen en cola: la analiza un proceso trabajador.")
+                    continue
+
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.image(original[..., :3], caption="Imagen Original", use_column_width=True)
+                
+                with col2:
+                    st.subheader("🎨 Análisis de Colores RGB")
+                    for color, value in analisis.promedios_rgb.items():
+                        st.metric(f"Promedio {color}", f"{value:.1f}")
+
+                    fig_hist = go.Figure([
+                        go.Scatter(y=analisis.histogramas[i], name=nombre, line=dict(color=color), mode='lines')
+                        for i, (nombre, color) in enumerate([("Rojo", "red"), ("Verde", "green"), ("Azul", "blue")])
+                    ])
+                    fig_hist.update_layout(height=250, margin=dict(t=30, b=0), title_text="Histograma RGB")
+                    st.plotly_chart(fig_hist, use_container_width=True)
+                
+                # Análisis de vegetación
+                st.subheader("🌱 Análisis de Vegetación")
+                vegetation_analysis = analisis.cobertura
+                
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    for veg_type, percentage in vegetation_analysis.items():
+                        st.metric(veg_type, f"{percentage:.1f}%")
+                
+                with col2:
+                    # Gráfico de distribución
+                    fig_pie = px.pie(
+                        values=list(vegetation_analysis.values()),
+                        names=list(vegetation_analysis.keys()),
+                        title="Distribución de Cobertura"
+                    )
+                    st.plotly_chart(fig_pie, use_container_width=True)
+
+                if analisis.mapa_clases is not None:
+                    st.image(COLORES_CLASES[analisis.mapa_clases], caption="Mapa de clases (verde: sana, amarillo: seca, café: suelo)", use_column_width=True)
+            
+            except Exception as e:
+                st.error(f"Error al procesar imagen {uploaded_image.name}: {e}")
+        if pendientes:
+            esperar_trabajos(pendientes)
+
+    if uploaded_images:
+        st.markdown("---")
+        st.subheader("🌡️ Índices de Vegetación Georreferenciados")
+        st.caption("Calcula VARI, ExG y GLI en una grilla sobre cada imagen con GPS y los guarda para la capa de calor del Dashboard.")
+        altura_manual = st.number_input(
+            "Altura de vuelo sobre el terreno (m), para imágenes sin altura relativa en sus metadatos",
+            min_value=5, max_value=1000, value=100
+        )
+        if st.button("🌡️ Guardar índices en el mapa"):
+            with st.spinner("Calculando índices de vegetación..."):
+                try:
+                    guardadas, sin_gps, fallidas = guardar_indices_vuelo(uploaded_images, altura_manual)
+                    st.success(f"✅ Índices guardados para {guardadas} imágenes.")
+                    if sin_gps:
+                        st.warning(f"Sin coordenadas GPS (no se guardaron): {', '.join(sin_gps)}")
+                    for nombre, error in fallidas:
+                        st.error(f"No se pudieron calcular los índices de {nombre}: {error}")
+                except Exception as e:
+                    st.error(f"Error al guardar los índices: {e}")
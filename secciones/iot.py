@@ -0,0 +1,182 @@
+"""Sección "🌐 Datos IoT ThingSpeak": gráficos en vivo e histórico de los sensores"""
+from datetime import datetime, timedelta
+
+import pandas as pd
+import plotly.graph_objects as go
+import requests
+import streamlit as st
+from plotly.subplots import make_subplots
+
+from ajustes import Ajustes, COLECCION_AJUSTES, usuario_actual
+from comun import mongo, timezone
+from metricas import medir
+from series import get_series_store
+from thingspeak import INTERVALO_VIVO, feeds_a_dataframe, get_poller, get_thingspeak_client
+
+ENLACES_INICIALES = [
+    "https://thingspeak.mathworks.com/channels/2928250/charts/1",
+    "https://thingspeak.mathworks.com/channels/2928250/charts/2",
+    "https://thingspeak.mathworks.com/channels/2928250/charts/3",
+    "https://thingspeak.mathworks.com/channels/2928250/charts/4"
+]
+
+
+def fetch_thingspeak_data(channel_id, results=60):
+    """Obtener datos de ThingSpeak (todos los campos del canal en una llamada)"""
+    try:
+        return get_thingspeak_client().feeds(channel_id, results=results)
+    except requests.HTTPError:
+        st.warning(f"No se pudieron obtener datos del canal {channel_id}")
+        return None
+    except Exception as e:
+        st.error(f"Error al conectar con ThingSpeak: {e}")
+        return None
+
+
+def figura_iot(df_iot, fields):
+    """Gráficos 2x2 de los campos del canal"""
+    fig = make_subplots(
+        rows=2, cols=2,
+        subplot_titles=[f"Campo {i}: {name}" for i, name in fields.items()],
+        vertical_spacing=0.1
+    )
+    for i, (field_id, field_name) in enumerate(fields.items()):
+        columna = f'field{field_id}'
+        if columna in df_iot:
+            row = (i // 2) + 1
+            col = (i % 2) + 1
+            # Las lecturas faltantes quedan como NaN (huecos en la línea)
+            fig.add_trace(
+                go.Scatter(x=df_iot.index, y=df_iot[columna], name=field_name, mode='lines+markers'),
+                row=row, col=col
+            )
+    fig.update_layout(height=600, title_text="Datos IoT en Tiempo Real")
+    return fig
+
+
+@st.fragment(run_every=INTERVALO_VIVO)
+def grafico_iot_en_vivo(channel_id, fields, ventana=500):
+    """Gráfico IoT que se refresca solo, agregando los puntos nuevos del poller compartido"""
+    get_poller(channel_id).asegurar()
+    clave = f'iot_vivo_{channel_id}'
+    previo = st.session_state.get(clave)
+    if previo is None:
+        df_iot = feeds_a_dataframe(fetch_thingspeak_data(channel_id))
+    else:
+        nuevos = get_thingspeak_client().entradas_desde(channel_id, previo['ultimo_id'])
+        df_iot = previo['df']
+        if nuevos:
+            df_iot = pd.concat([df_iot, feeds_a_dataframe({'feeds': nuevos})]).iloc[-ventana:]
+    ultimo_id = int(df_iot['entry_id'].iloc[-1]) if 'entry_id' in df_iot and len(df_iot) else None
+    st.session_state[clave] = {'df': df_iot, 'ultimo_id': ultimo_id}
+
+    st.plotly_chart(figura_iot(df_iot, fields), use_container_width=True)
+    st.caption(f"Última actualización: {datetime.now(timezone).strftime('%H:%M:%S')}")
+
+
+def mostrar():
+    st.header("🌐 Monitoreo IoT en Tiempo Real")
+    
+    st.info("Canal ThingSpeak ID: 2928250")
+    
+    # ==============================
+    # NUEVO: Permitir agregar más enlaces de monitoreo ThingSpeak
+    # ==============================
+    st.subheader("➕ Agregar más enlaces de monitoreo ThingSpeak")
+    with st.expander("Agregar enlace de ThingSpeak"):
+        new_link = st.text_input("Pega aquí el enlace del gráfico de ThingSpeak (ejemplo: https://thingspeak.mathworks.com/channels/XXXXX/charts/1)")
+        # Con login (o el espacio ?usuario=, ver ajustes.py) los enlaces se guardan en MongoDB:
+        # sobreviven a recargas y se ven desde cualquier réplica. Los anónimos los tienen solo en su sesión.
+        usuario = usuario_actual()
+        ajustes = Ajustes(mongo.collection(COLECCION_AJUSTES), usuario) if usuario and mongo.ping() else None
+        try:
+            enlaces = ajustes.leer("thingspeak_links") if ajustes else None
+            if ajustes and enlaces is None:
+                enlaces = list(ENLACES_INICIALES)
+                ajustes.guardar("thingspeak_links", enlaces)
+        except Exception:
+            ajustes = None
+        if ajustes is None:
+            # Anónimo o sin MongoDB: quedan solo en esta sesión
+            enlaces = st.session_state.setdefault('thingspeak_links', list(ENLACES_INICIALES))
+        if st.button("Agregar enlace"):
+            if new_link and new_link not in enlaces:
+                if ajustes is not None:
+                    ajustes.agregar("thingspeak_links", new_link)
+                enlaces.append(new_link)
+                st.success("Enlace agregado correctamente.")
+            elif new_link in enlaces:
+                st.warning("Ese enlace ya fue agregado.")
+            else:
+                st.warning("Por favor ingresa un enlace válido.")
+        quitar = st.selectbox("Quitar un enlace", ["", *enlaces], format_func=lambda v: v or "—")
+        if quitar and st.button("Quitar enlace"):
+            if ajustes is not None:
+                ajustes.quitar("thingspeak_links", quitar)
+            enlaces.remove(quitar)
+            st.success("Enlace quitado.")
+
+    # ==============================
+    # Botón para actualizar datos
+    # ==============================
+    # Configuración de campos
+    fields = {
+        1: "Sensor 1",
+        2: "Sensor 2", 
+        3: "Sensor 3",
+        4: "Sensor 4"
+    }
+
+    en_vivo = st.toggle("🔴 Modo en vivo", help=f"Actualiza los gráficos cada {INTERVALO_VIVO:.0f} s sin recargar la página")
+    if en_vivo:
+        grafico_iot_en_vivo("2928250", fields)
+    elif st.button("🔄 Actualizar Datos"):
+        with st.spinner("Obteniendo datos de ThingSpeak..."):
+            data = fetch_thingspeak_data("2928250")
+            st.plotly_chart(figura_iot(feeds_a_dataframe(data), fields), use_container_width=True)
+    
+    # ==============================
+    # Histórico local de sensores
+    # ==============================
+    st.subheader("📈 Histórico de Sensores")
+    hoy = datetime.utcnow().date()
+    col1, col2 = st.columns(2)
+    with col1:
+        rango = st.date_input("Rango de fechas (UTC)", (hoy - timedelta(days=30), hoy))
+    with col2:
+        campo_hist = st.selectbox("Campo", [1, 2, 3, 4], format_func=lambda i: f"Campo {i}: Sensor {i}")
+
+    if isinstance(rango, tuple) and len(rango) == 2:
+        desde = datetime.combine(rango[0], datetime.min.time())
+        hasta = datetime.combine(rango[1], datetime.max.time())
+        store = get_series_store()
+
+        if st.button("⬇️ Sincronizar histórico"):
+            with st.spinner("Descargando lecturas faltantes de ThingSpeak..."):
+                try:
+                    with medir("series:sincronizar"):
+                        nuevas = store.sincronizar(get_thingspeak_client(), "2928250", desde)
+                    st.success(f"{nuevas} lecturas sincronizadas.")
+                except Exception as e:
+                    st.error(f"Error al sincronizar con ThingSpeak: {e}")
+
+        serie = store.consultar("2928250", campo_hist, desde, hasta)
+        if serie.empty:
+            st.info("No hay lecturas guardadas en este rango. Usa «Sincronizar histórico» para descargarlas.")
+        else:
+            # Banda min/max por intervalo y línea del promedio
+            fig_hist = go.Figure([
+                go.Scatter(x=serie.index, y=serie['max'], mode='lines', line=dict(width=0), showlegend=False, hoverinfo='skip'),
+                go.Scatter(x=serie.index, y=serie['min'], mode='lines', line=dict(width=0), fill='tonexty',
+                           fillcolor='rgba(33,150,243,0.2)', name='Mín/Máx'),
+                go.Scatter(x=serie.index, y=serie['mean'], mode='lines', line=dict(color='#2196F3'), name='Promedio'),
+            ])
+            fig_hist.update_layout(height=400, title_text=f"Campo {campo_hist}: Sensor {campo_hist}")
+            st.plotly_chart(fig_hist, use_container_width=True)
+
+    # ==============================
+    # Mostrar todos los enlaces de gráficos ThingSpeak
+    # ==============================
+    st.subheader("🔗 Enlaces Directos a Gráficos")
+    for i, link in enumerate(enlaces, 1):
+        st.markdown(f"[📊 Ver Gráfico Campo {i}]({link})")
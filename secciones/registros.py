@@ -0,0 +1,151 @@
+"""Sección "🗂️ Historial de Registros": tabla paginada de fauna y clima con filtros"""
+import os
+import tempfile
+
+import pandas as pd
+import streamlit as st
+
+from comun import coleccion_clima, coleccion_fauna, coleccion_resumen, preparar_historial
+from historial import TAMANO_PAGINA, filtro_historial, pagina
+from metricas import medir
+from resumen import conteos
+
+TIPOS_FAUNA = ["Ave", "Mamífero", "Reptil", "Anfibio", "Pez", "Insecto", "Otro"]
+CATEGORIAS_LLUVIA = ["No", "Llovizna", "Lluvia ligera", "Lluvia fuerte"]
+# La descarga desde la app pasa por la memoria del servidor: las exportaciones
+# más grandes se hacen con ``python carga_masiva.py exportar``
+MAX_EXPORTACION = int(os.environ.get("MAX_EXPORTACION_APP", "100000"))
+
+
+def mostrar():
+    st.header("🗂️ Historial de Registros")
+    st.write("Consulta los registros guardados por página, filtrando por fecha, especie, lluvia o área.")
+
+    fuente = st.radio("Registros", ["🐦 Fauna", "🌧️ Clima"], horizontal=True)
+    nombre, coleccion = (("catalogo_fauna", coleccion_fauna()) if fuente == "🐦 Fauna"
+                         else ("registros_clima", coleccion_clima()))
+
+    col1, col2 = st.columns(2)
+    with col1:
+        desde = st.date_input("📅 Desde", value=None)
+    with col2:
+        hasta = st.date_input("📅 Hasta", value=None)
+
+    iguales = {}
+    if nombre == "catalogo_fauna":
+        try:
+            # Especies conocidas desde el resumen precalculado (sin recorrer la colección)
+            especies = sorted(e for e in conteos(coleccion_resumen(), nombre, "especie") if e != "Sin dato")
+        except Exception:
+            especies = []
+        col1, col2 = st.columns(2)
+        with col1:
+            iguales["tipo"] = st.selectbox("🔍 Tipo", ["", *TIPOS_FAUNA], format_func=lambda v: v or "Todos")
+        with col2:
+            iguales["especie"] = st.selectbox("📛 Especie", ["", *especies], format_func=lambda v: v or "Todas")
+    else:
+        iguales["lluvia"] = st.selectbox("🌧️ Lluvia", ["", *CATEGORIAS_LLUVIA], format_func=lambda v: v or "Todas")
+
+    area = None
+    aoi = st.session_state.get('aoi')
+    if aoi and aoi.get("type") in ("Polygon", "MultiPolygon"):
+        if st.checkbox("📐 Solo dentro del área de interés"):
+            area = aoi
+    else:
+        st.caption("Para filtrar por área, dibuja o sube un área de interés en 📁 Datos CSV/Satélite.")
+
+    filtro = filtro_historial(nombre, desde, hasta, area, **iguales)
+
+    # Pila de cursores: el de cada página ya vista; cambiar un filtro vuelve a la primera
+    firma = repr((nombre, filtro))
+    estado = st.session_state.get('historial')
+    if not estado or estado["firma"] != firma:
+        estado = st.session_state['historial'] = {"firma": firma, "cursores": [None]}
+
+    try:
+        preparar_historial(nombre)
+        with medir("historial:pagina", coleccion=nombre, pagina=len(estado["cursores"])) as span:
+            documentos, siguiente = pagina(coleccion, nombre, filtro, estado["cursores"][-1])
+            span.anotar(documentos=len(documentos))
+    except Exception as e:
+        st.warning(f"No se pudo consultar el historial: {e}")
+        return
+
+    if not documentos:
+        st.info("No hay registros con estos filtros.")
+    else:
+        df = pd.DataFrame(documentos).drop(columns="_id")
+        if "comportamiento" in df:
+            df["comportamiento"] = df["comportamiento"].map(lambda v: ", ".join(v) if isinstance(v, list) else v)
+        st.dataframe(df, use_container_width=True, hide_index=True)
+
+    numero = len(estado["cursores"])
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Anterior", disabled=numero == 1):
+            estado["cursores"].pop()
+            st.rerun()
+    with col2:
+        inicio = (numero - 1) * TAMANO_PAGINA
+        st.caption(f"Página {numero} · registros {inicio + 1 if documentos else inicio}–{inicio + len(documentos)}")
+    with col3:
+        if st.button("Siguiente ➡️", disabled=siguiente is None):
+            estado["cursores"].append(siguiente)
+            st.rerun()
+
+    st.markdown("---")
+    importar_exportar(nombre, coleccion, filtro)
+
+
+def importar_exportar(nombre, coleccion, filtro):
+    """Carga masiva de registros históricos y descarga de los registros filtrados"""
+    from carga_masiva import exportar, importar
+
+    with st.expander("📦 Importar / exportar registros"):
+        st.write("Importa registros históricos desde CSV o Parquet: columnas `fecha` y `ubicacion` "
+                 "(\"lat,lon\") o latitud/longitud, más los campos del formulario. Las filas sin "
+                 "fecha o ubicación válidas se omiten.")
+        archivo = st.file_uploader("Archivo de registros", type=["csv", "parquet"], key=f"importar_{nombre}")
+        if archivo and st.button("📥 Importar", key=f"boton_importar_{nombre}"):
+            progreso = st.empty()
+            try:
+                with medir("carga:importar", tamano=archivo.size, coleccion=nombre):
+                    r = importar(coleccion, nombre, archivo.getvalue(), resumen=coleccion_resumen(),
+                                 formato="parquet" if archivo.name.lower().endswith(".parquet") else "csv",
+                                 al_avanzar=lambda r: progreso.caption(f"{r.leidos:,} filas leídas..."))
+                progreso.empty()
+                st.success(f"✅ {r.insertados:,} registros importados · {r.repetidos:,} ya existían · "
+                           f"{r.rechazados:,} filas rechazadas")
+                if r.motivos:
+                    st.dataframe(pd.DataFrame([(f + 2, m) for f, m in r.motivos], columns=["Línea", "Motivo"]),
+                                 hide_index=True)
+                st.session_state.pop('historial', None)
+            except Exception as e:
+                st.error(f"Error al importar: {e}")
+
+        formato = st.radio("Formato de exportación", ["csv", "parquet"], horizontal=True, key=f"formato_{nombre}")
+        if st.button("📤 Preparar exportación (con los filtros actuales)", key=f"boton_exportar_{nombre}"):
+            try:
+                demasiados = coleccion.count_documents(filtro, limit=MAX_EXPORTACION + 1) > MAX_EXPORTACION
+            except Exception as e:
+                st.error(f"Error al exportar: {e}")
+                return
+            if demasiados:
+                st.warning(f"La exportación supera {MAX_EXPORTACION:,} registros: acota los filtros o usa "
+                           f"`python carga_masiva.py exportar {nombre} archivo.{formato}` en el servidor.")
+                return
+            # Se escribe por lotes en un archivo temporal; solo el archivo final pasa a la descarga
+            destino = os.path.join(tempfile.mkdtemp(), f"{nombre}.{formato}")
+            try:
+                with medir("carga:exportar", coleccion=nombre):
+                    total = exportar(coleccion, nombre, destino, formato, filtro)
+                with open(destino, "rb") as f:
+                    datos = f.read()
+                st.download_button(f"⬇️ Descargar {total:,} registros", datos, os.path.basename(destino),
+                                   "text/csv" if formato == "csv" else "application/octet-stream")
+            except Exception as e:
+                st.error(f"Error al exportar: {e}")
+            finally:
+                if os.path.exists(destino):
+                    os.remove(destino)
+                os.rmdir(os.path.dirname(destino))
@@ -0,0 +1,33 @@
+"""Panel de rendimiento en la barra lateral (solo con ``METRICAS_ADMIN=1``)"""
+import pandas as pd
+import streamlit as st
+
+from metricas import activar, registro
+
+
+def mostrar():
+    with st.sidebar.expander("🛠️ Rendimiento"):
+        activo = st.toggle("Instrumentación activa", value=registro.activo, key="metricas_activas")
+        if activo != registro.activo:
+            activar(activo)
+            st.rerun()
+
+        resumen = pd.DataFrame(registro.resumen())
+        if resumen.empty:
+            st.caption("Sin mediciones todavía." if activo else "Activa la instrumentación para medir.")
+            return
+        resumen["total_s"] = (resumen["n"] * resumen["media_ms"] / 1000).round(2)
+        st.caption("Operaciones (más costosas primero)")
+        st.dataframe(resumen.sort_values("total_s", ascending=False).set_index("nombre"), use_container_width=True)
+
+        st.caption("Últimos spans")
+        st.dataframe(pd.DataFrame(registro.spans(30)), use_container_width=True)
+
+        col1, col2 = st.columns(2)
+        with col1:
+            st.download_button("JSON", registro.a_json(), "metricas.json", "application/json")
+        with col2:
+            st.download_button("Prometheus", registro.a_prometheus(), "metricas.prom", "text/plain")
+        if st.button("🧹 Limpiar mediciones"):
+            registro.limpiar()
+            st.rerun()
@@ -0,0 +1,223 @@
+"""Sección "📁 Datos CSV/Satélite": paneles de Earth Engine, carga de CSV y área de interés"""
+import os
+
+import pandas as pd
+import streamlit as st
+
+from aoi import (EXTENSIONES_AREA, IndiceEspacial, area_desde_geojson, geojson_de_area, leer_area,
+                 version_coleccion)
+from comun import coleccion_clima, coleccion_fauna, mongo
+from metricas import medir
+from ingesta import (DATOS_DIR, archivos_servidor, cargar_parquet, columnas_numericas, csv_a_parquet,
+                     leer_metadatos, medias_filas)
+
+
+@st.cache_resource(max_entries=4)
+def indice_coleccion(nombre, version, campos):
+    """Índice espacial de una colección; se reconstruye solo cuando cambia ``version``"""
+    return IndiceEspacial.desde_coleccion(mongo.collection(nombre), campos)
+
+
+@st.cache_resource(max_entries=2)
+def indice_csv(ruta_parquet, columna_lat, columna_lon):
+    """Índice espacial de las filas de un CSV convertido a Parquet.
+
+    Solo guarda las coordenadas y la posición de cada fila; los valores de las
+    filas dentro del área se leen del Parquet al agregar (``medias_filas``).
+    """
+    df = cargar_parquet(ruta_parquet, [columna_lat, columna_lon])
+    df["fila"] = range(len(df))
+    return IndiceEspacial.desde_dataframe(df, columna_lat, columna_lon)
+
+
+def load_csv_data(origen):
+    """Convertir un CSV (bytes o ruta) a Parquet tipado en caché (ver ingesta.py)"""
+    try:
+        with medir("ingesta:csv_a_parquet", tamano=len(origen) if isinstance(origen, bytes) else None):
+            return csv_a_parquet(origen)
+    except Exception as e:
+        st.error(f"Error al cargar CSV: {e}")
+        return None, None
+
+
+def mostrar():
+    st.header("🌍 Panel Avanzado Google Earth Engine")
+    st.info("Selecciona en el mapa el territorio que deseas explorar y el tipo de datos satelitales que quieres visualizar. Luego, accede al panel avanzado de Google Earth Engine para análisis históricos y visualización detallada.")
+
+    # Mapa interactivo con tiles claros y usabilidad mejorada
+    try:
+        from streamlit_folium import st_folium
+        import folium
+
+        default_lat, default_lon = 4.6097, -74.0817
+        lat = st.session_state.get('gee_lat', default_lat)
+        lon = st.session_state.get('gee_lon', default_lon)
+
+        from folium.plugins import Draw
+
+        m = folium.Map(location=[lat, lon], zoom_start=10, tiles="OpenStreetMap")
+        folium.Marker([lat, lon], tooltip="Ubicación seleccionada").add_to(m)
+        # Herramienta para dibujar el área de interés (polígono o rectángulo)
+        Draw(draw_options={"polyline": False, "circle": False, "marker": False, "circlemarker": False},
+             edit_options={"edit": False}).add_to(m)
+        map_data = st_folium(m, width=900, height=500)
+
+        dibujos = (map_data or {}).get('all_drawings') or []
+        if dibujos:
+            st.session_state['aoi'] = geojson_de_area(
+                area_desde_geojson({"type": "FeatureCollection", "features": dibujos})
+            )
+
+        if map_data and map_data.get('last_clicked'):
+            lat = map_data['last_clicked']['lat']
+            lon = map_data['last_clicked']['lng']
+            st.session_state['gee_lat'] = lat
+            st.session_state['gee_lon'] = lon
+
+        st.markdown(f"**Ubicación seleccionada:** {lat:.5f}, {lon:.5f}")
+
+    except Exception as e:
+        st.warning("No se pudo cargar el mapa interactivo. Instala `streamlit-folium` y `folium` para habilitar esta función.")
+        st.text(f"Error: {e}")
+
+    tipo_dato = st.radio(
+        "Selecciona el tipo de datos satelitales a explorar:",
+        [
+            "🌱 Índices Vegetativos (NDVI, VARI, NDWI, EVI)",
+            "🌧️ Precipitaciones y Temperatura",
+            "☀️ Radiación Solar",
+            "🏠 Conteo de Estructuras (Casas/Edificaciones)"
+        ]
+    )
+
+    if tipo_dato == "🌱 Índices Vegetativos (NDVI, VARI, NDWI, EVI)":
+        st.subheader("🌱 Índices Vegetativos (NDVI, VARI, NDWI, EVI)")
+        st.markdown("""
+        Visualiza el histórico de índices vegetativos como NDVI, VARI, NDWI y EVI para cualquier zona seleccionada en el mapa.
+        [🔗 Ver panel de índices vegetativos en Google Earth Engine](https://code.earthengine.google.com/ed96e4d6474264c5aed574d58a1e615d?hideCode=true)
+        """)
+
+    elif tipo_dato == "🌧️ Precipitaciones y Temperatura":
+        st.subheader("🌧️ Precipitaciones y Temperatura")
+        st.markdown("""
+        Consulta el histórico de precipitaciones y temperatura superficial para la zona seleccionada.
+        [🔗 Ver panel de precipitaciones y temperatura en Google Earth Engine](https://code.earthengine.google.com/42f6864d239da85005c039039a791b3a?hideCode=true)
+        """)
+
+    elif tipo_dato == "☀️ Radiación Solar":
+        st.subheader("☀️ Radiación Solar")
+        st.markdown("""
+        Visualiza el histórico de radiación solar para cualquier punto seleccionado en el mapa.
+        [🔗 Ver panel de radiación solar en Google Earth Engine](https://code.earthengine.google.com/eee3a83423627bc8ec346d6d6258b992?hideCode=true)
+        """)
+
+    elif tipo_dato == "🏠 Conteo de Estructuras (Casas/Edificaciones)":
+        st.subheader("🏠 Conteo de Estructuras (Casas/Edificaciones)")
+        st.markdown("""
+        Estima la cantidad de estructuras (casas, edificaciones) detectadas automáticamente por satélite en la zona seleccionada.
+        [🔗 Ver panel de conteo de estructuras en Google Earth Engine](https://code.earthengine.google.com/166b66f395bb18ae8ddd09eb985ddca0?hideCode=true)
+        """)
+
+    # ==============================
+    # Carga de archivos CSV / exportaciones satelitales
+    # ==============================
+    st.markdown("---")
+    st.subheader("📂 Datos CSV / Exportaciones Satelitales")
+    archivo_csv = st.file_uploader("Sube un archivo CSV", type=["csv"])
+    en_servidor = archivos_servidor()
+    archivo_servidor = st.selectbox(
+        f"...o elige un archivo grande de la carpeta del servidor ({DATOS_DIR}/)",
+        ["Ninguno", *en_servidor]
+    ) if en_servidor else "Ninguno"
+
+    origen = None
+    if archivo_csv:
+        origen = archivo_csv.getvalue()
+    elif archivo_servidor != "Ninguno":
+        origen = os.path.join(DATOS_DIR, archivo_servidor)
+
+    if origen is not None:
+        with st.spinner("Convirtiendo a Parquet tipado (solo la primera vez)..."):
+            ruta_parquet, meta = load_csv_data(origen)
+        if ruta_parquet:
+            st.session_state['csv_parquet'] = ruta_parquet
+            detectadas = meta['columnas']
+            st.caption(
+                f"{meta['filas']:,} filas · latitud: {detectadas['lat'] or '—'} · "
+                f"longitud: {detectadas['lon'] or '—'} · tiempo: {detectadas['tiempo'] or '—'}"
+            )
+            columnas = st.multiselect("Columnas a cargar", meta['nombres'], default=meta['nombres'][:10])
+            col1, col2 = st.columns(2)
+            with col1:
+                inicio = st.number_input("Desde la fila", min_value=0, max_value=max(meta['filas'] - 1, 0), value=0, step=1000)
+            with col2:
+                cantidad = st.number_input("Cantidad de filas", min_value=1, max_value=100000, value=1000, step=1000)
+
+            coordenadas = [c for c in (detectadas['lat'], detectadas['lon']) if c]
+            df_csv = cargar_parquet(ruta_parquet, list(dict.fromkeys(columnas + coordenadas)), int(inicio), int(inicio + cantidad))
+            st.dataframe(df_csv[columnas], use_container_width=True)
+            if len(coordenadas) == 2:
+                st.map(df_csv[coordenadas].dropna().set_axis(['lat', 'lon'], axis=1))
+
+    # ==============================
+    # Agregados dentro del área de interés
+    # ==============================
+    st.markdown("---")
+    st.subheader("📐 Resumen del Área de Interés")
+    st.write("Dibuja un polígono o rectángulo en el mapa de arriba, o sube el área como archivo.")
+    archivo_area = st.file_uploader("Área de interés (GeoJSON, KML, GeoPackage o shapefile en .zip)",
+                                    type=EXTENSIONES_AREA)
+    if archivo_area:
+        try:
+            st.session_state['aoi'] = geojson_de_area(leer_area(archivo_area.getvalue(), archivo_area.name))
+        except Exception as e:
+            st.error(f"No se pudo leer el área de interés: {e}")
+
+    if st.session_state.get('aoi'):
+        area = area_desde_geojson(st.session_state['aoi'])
+        oeste, sur, este, norte = area.bounds
+        st.caption(f"Área: {sur:.4f}, {oeste:.4f} → {norte:.4f}, {este:.4f}")
+        try:
+            with st.spinner("Preparando índices espaciales (solo la primera vez)..."):
+                indice_fauna = indice_coleccion("catalogo_fauna", version_coleccion(coleccion_fauna()), ("tipo", "cantidad"))
+                indice_clima = indice_coleccion("registros_clima", version_coleccion(coleccion_clima()), ("temperatura", "intensidad"))
+            with medir("aoi:agregar", puntos=len(indice_fauna) + len(indice_clima)):
+                fauna_aoi = indice_fauna.agregar(area, sumas=["cantidad"], por="tipo")
+                clima_aoi = indice_clima.agregar(area, medias=["temperatura", "intensidad"])
+
+            col1, col2, col3, col4 = st.columns(4)
+            with col1:
+                st.metric("Avistamientos de fauna", f"{fauna_aoi['registros']:,}")
+            with col2:
+                st.metric("Individuos observados", f"{fauna_aoi['sumas']['cantidad']:,.0f}")
+            with col3:
+                temperatura = clima_aoi['medias']['temperatura']
+                st.metric("Temperatura media", "—" if pd.isna(temperatura) else f"{temperatura:.1f} °C")
+            with col4:
+                intensidad = clima_aoi['medias']['intensidad']
+                st.metric("Intensidad de lluvia media", "—" if pd.isna(intensidad) else f"{intensidad:.1f}")
+            if not fauna_aoi['por'].empty:
+                st.bar_chart(fauna_aoi['por'])
+        except Exception as e:
+            st.warning("No se pudieron calcular los agregados de MongoDB en el área.")
+            st.text(f"Error: {e}")
+
+        ruta_parquet = st.session_state.get('csv_parquet')
+        if ruta_parquet and os.path.exists(ruta_parquet):
+            detectadas = leer_metadatos(ruta_parquet)['columnas']
+            if detectadas['lat'] and detectadas['lon']:
+                try:
+                    with st.spinner("Indexando las filas del CSV (solo la primera vez)..."):
+                        indice_filas = indice_csv(ruta_parquet, detectadas['lat'], detectadas['lon'])
+                    numericas = [c for c in columnas_numericas(ruta_parquet) if c not in (detectadas['lat'], detectadas['lon'])]
+                    filas = indice_filas.atributos["fila"].to_numpy()[indice_filas.dentro(area)]
+                    st.markdown(f"**📂 CSV cargado:** {len(filas):,} de {len(indice_filas):,} filas dentro del área")
+                    if numericas and len(filas):
+                        medias = medias_filas(ruta_parquet, filas, numericas)
+                        st.dataframe(pd.Series(medias, name="Media en el área"), use_container_width=True)
+                except Exception as e:
+                    st.warning("No se pudieron calcular los agregados del CSV en el área.")
+                    st.text(f"Error: {e}")
+
+    st.markdown("---")
+    st.caption("Para análisis personalizados, puedes modificar los scripts en Google Earth Engine según tus necesidades. Selecciona la zona de interés en el mapa de GEE y copia las coordenadas para usarlas en los scripts.")
@@ -0,0 +1,165 @@
+"""Almacén local de series de tiempo de los sensores IoT.
+
+Las lecturas de ThingSpeak se guardan en SQLite (una fila por canal, campo y
+entrada) y se completan de forma incremental, de modo que las vistas de
+histórico no vuelven a descargar nada que ya tengamos. Las consultas por
+rango de fechas se reducen en el propio SQLite a min/max/promedio por
+intervalo, para no enviar cientos de miles de puntos a Plotly.
+"""
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import pandas as pd
+import streamlit as st
+
+from thingspeak import feeds_a_dataframe
+
+SERIES_DB = os.environ.get("SERIES_DB", "series_iot.sqlite")
+# Número aproximado de puntos que se envían a un gráfico
+PUNTOS_GRAFICO = 2000
+# ThingSpeak devuelve como máximo 8000 entradas por llamada
+PAGINA = 8000
+FORMATO_API = "%Y-%m-%d %H:%M:%S"
+
+_ESQUEMA = """
+CREATE TABLE IF NOT EXISTS lecturas (
+    canal TEXT NOT NULL,
+    campo INTEGER NOT NULL,
+    entry_id INTEGER NOT NULL,
+    ts INTEGER NOT NULL,
+    valor REAL,
+    PRIMARY KEY (canal, campo, entry_id)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS lecturas_ts ON lecturas (canal, campo, ts);
+"""
+
+
+def epoch(created_at):
+    """Segundos UTC de un ``created_at`` de ThingSpeak"""
+    fecha = datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")
+    return int(fecha.replace(tzinfo=timezone.utc).timestamp())
+
+
+def _fecha_api(segundos):
+    return datetime.fromtimestamp(segundos, tz=timezone.utc).strftime(FORMATO_API)
+
+
+def filas_de_feeds(canal, feeds):
+    """Convertir entradas de ``feeds.json`` en filas (canal, campo, entry_id, ts, valor)"""
+    df = feeds_a_dataframe({"feeds": feeds})
+    campos = [c for c in df.columns if c.startswith("field")]
+    if df.empty or not campos or "entry_id" not in df:
+        return []
+    df = df[df["entry_id"].notna()]
+    ts = (df.index - pd.Timestamp(0, tz="UTC")) // pd.Timedelta(seconds=1)
+    largo = (
+        df[campos]
+        .set_axis(pd.MultiIndex.from_arrays([df["entry_id"].astype("int64"), ts], names=["entry_id", "ts"]))
+        .rename(columns=lambda c: int(c[len("field"):]))
+        .stack()
+        .dropna()
+    )
+    return [
+        (str(canal), int(campo), int(entry_id), int(t), float(valor))
+        for (entry_id, t, campo), valor in largo.items()
+    ]
+
+
+class SeriesStore:
+    """Series de tiempo por canal y campo en un archivo SQLite"""
+
+    def __init__(self, ruta=SERIES_DB):
+        self.ruta = ruta
+        self._escritura = threading.Lock()
+        with self._conectar() as con:
+            con.executescript(_ESQUEMA)
+
+    @contextmanager
+    def _conectar(self):
+        con = sqlite3.connect(self.ruta, timeout=30)
+        try:
+            con.execute("PRAGMA journal_mode=WAL")
+            with con:
+                yield con
+        finally:
+            con.close()
+
+    def guardar(self, canal, feeds):
+        """Insertar entradas de ThingSpeak; las repetidas se ignoran"""
+        filas = filas_de_feeds(canal, feeds)
+        with self._escritura, self._conectar() as con:
+            con.executemany("INSERT OR IGNORE INTO lecturas VALUES (?, ?, ?, ?, ?)", filas)
+        return len(filas)
+
+    def extremos(self, canal):
+        """Primer y último instante (epoch) guardados para el canal"""
+        with self._conectar() as con:
+            return con.execute(
+                "SELECT MIN(ts), MAX(ts) FROM lecturas WHERE canal = ?", (str(canal),)
+            ).fetchone()
+
+    def sincronizar(self, client, canal, desde, api_key=None):
+        """Completar el almacén desde ``desde`` (datetime UTC) hasta ahora.
+
+        Solo se descargan los tramos que faltan: la historia anterior a la
+        primera lectura guardada y lo posterior a la última.
+        """
+        inicio = int(desde.replace(tzinfo=timezone.utc).timestamp())
+        primero, ultimo = self.extremos(canal)
+        guardadas = 0
+        if primero is None:
+            guardadas += self._descargar(client, canal, inicio, None, api_key)
+        else:
+            if inicio < primero:
+                guardadas += self._descargar(client, canal, inicio, primero - 1, api_key)
+            guardadas += self._descargar(client, canal, ultimo + 1, None, api_key)
+        return guardadas
+
+    def _descargar(self, client, canal, inicio, fin, api_key):
+        # ThingSpeak devuelve las últimas 8000 entradas del rango, así que se
+        # pagina hacia atrás moviendo el extremo final
+        guardadas = 0
+        while fin is None or fin >= inicio:
+            data = client.feeds_rango(
+                canal, _fecha_api(inicio), _fecha_api(fin) if fin is not None else None, api_key
+            )
+            feeds = data.get("feeds") or []
+            guardadas += self.guardar(canal, feeds)
+            if len(feeds) < PAGINA:
+                break
+            fin = epoch(feeds[0]["created_at"]) - 1
+        return guardadas
+
+    def consultar(self, canal, campo, desde, hasta, puntos=PUNTOS_GRAFICO):
+        """Serie de un campo entre dos fechas, reducida a ``puntos`` intervalos.
+
+        Devuelve un DataFrame indexado por fecha con columnas ``min``, ``max``
+        y ``mean``; en intervalos con una sola lectura las tres coinciden.
+        """
+        t0 = int(desde.replace(tzinfo=timezone.utc).timestamp())
+        t1 = int(hasta.replace(tzinfo=timezone.utc).timestamp())
+        ancho = max((t1 - t0) // max(puntos, 1), 1)
+        with self._conectar() as con:
+            filas = con.execute(
+                """
+                SELECT MIN(ts), MIN(valor), MAX(valor), AVG(valor)
+                FROM lecturas
+                WHERE canal = ? AND campo = ? AND ts BETWEEN ? AND ?
+                GROUP BY (ts - ?) / ?
+                ORDER BY 1
+                """,
+                (str(canal), int(campo), t0, t1, t0, ancho),
+            ).fetchall()
+        df = pd.DataFrame(filas, columns=["ts", "min", "max", "mean"])
+        df.index = pd.to_datetime(df.pop("ts"), unit="s", utc=True)
+        return df
+
+
+@st.cache_resource
+def get_series_store():
+    """Almacén de series único por proceso"""
+    return SeriesStore()
+
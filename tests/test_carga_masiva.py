@@ -0,0 +1,39 @@
+"""Importación masiva: toda fila leída se inserta, ya existía o se rechaza"""
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+mongomock = pytest.importorskip("mongomock")
+
+from carga_masiva import importar  # noqa: E402
+
+CSV = b"""fecha,ubicacion,tipo,especie,cantidad
+2025-01-01,"4.5,-74.1",Ave,Colibri,1
+2025-01-02,bad,Ave,Colibri,2
+no-es-fecha,"4.6,-74.2",Ave,Colibri,3
+2025-01-04,"4.7,-74.3",Ave,Colibri,4
+"""
+
+
+def test_filas_contabilizadas():
+    coleccion = mongomock.MongoClient().db.catalogo_fauna
+    r = importar(coleccion, "catalogo_fauna", CSV, formato="csv")
+    assert r.leidos == 4
+    assert r.insertados + r.repetidos + r.rechazados == r.leidos
+    assert sorted(r.motivos) == [(1, "ubicación inválida"), (2, "fecha inválida")]
+    assert coleccion.count_documents({}) == 2
+
+
+def test_timestamp_en_hora_local():
+    coleccion = mongomock.MongoClient().db.registros_clima
+    csv = b"""timestamp,ubicacion,lluvia
+2025-03-02T03:30:00Z,"4.5,-74.1",No
+"""
+    r = importar(coleccion, "registros_clima", csv, formato="csv")
+    assert r.insertados == 1
+    doc = coleccion.find_one()
+    # 03:30 UTC es 22:30 del día anterior en Bogotá (UTC-5)
+    assert (doc["fecha"], doc["hora"]) == ("2025-03-01", "22:30:00")
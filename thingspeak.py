@@ -0,0 +1,246 @@
+"""Capa de acceso a ThingSpeak.
+
+Un cliente por proceso con ``requests.Session`` (conexiones reutilizadas),
+que trae todos los campos de un canal en una sola llamada a ``feeds.json``,
+guarda la respuesta con un TTL y, al refrescar, solo pide las entradas
+posteriores a la última vista. Con una caché compartida (``CACHE_URL``, ver
+``cache_compartida.py``) las réplicas de la app publican los feeds de los
+canales públicos y los toman de ahí: una sola consulta a ThingSpeak por TTL
+para todo el despliegue.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+import requests
+import streamlit as st
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from cache_compartida import get_cache_compartida
+from metricas import medir, registro
+
+API_URL = "https://api.thingspeak.com"
+# ThingSpeak acepta una actualización cada 15 s en cuentas gratuitas
+TTL = float(os.environ.get("THINGSPEAK_TTL", "15"))
+INTERVALO_VIVO = float(os.environ.get("THINGSPEAK_INTERVALO_VIVO", "15"))
+# El poller se detiene si ninguna sesión lo consulta durante este tiempo
+INACTIVIDAD_VIVO = float(os.environ.get("THINGSPEAK_INACTIVIDAD_VIVO", "120"))
+TIMEOUT = float(os.environ.get("THINGSPEAK_TIMEOUT", "10"))
+MAX_RESULTADOS = 8000
+
+
+def feeds_a_dataframe(data):
+    """Convertir la respuesta de ``feeds.json`` en un DataFrame tipado.
+
+    El índice es un ``DatetimeIndex`` (UTC) tomado de ``created_at`` y cada
+    columna ``fieldN`` queda como float, con NaN donde no hay lectura.
+    """
+    feeds = (data or {}).get("feeds") or []
+    df = pd.DataFrame.from_records(feeds)
+    if df.empty or "created_at" not in df:
+        return pd.DataFrame(index=pd.DatetimeIndex([], tz="UTC", name="created_at"))
+    df.index = pd.DatetimeIndex(pd.to_datetime(df.pop("created_at"), utc=True, errors="coerce"))
+    df = df[df.index.notna()]
+    campos = [c for c in df.columns if c.startswith("field")]
+    df[campos] = df[campos].apply(pd.to_numeric, errors="coerce")
+    return df
+
+
+class _EstadoCanal:
+    """Feeds en memoria de un canal y posición de la última entrada"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.channel = None
+        self.feeds = []
+        self.ultimo_id = None
+        self.ultima_fecha = None
+        self.pedidos = 0
+        self.actualizado = 0.0
+
+    def agregar(self, data):
+        self.channel = data.get("channel", self.channel)
+        nuevos = data.get("feeds") or []
+        if self.ultimo_id is not None:
+            nuevos = [f for f in nuevos if f.get("entry_id") is not None and f["entry_id"] > self.ultimo_id]
+        self.feeds = (self.feeds + nuevos)[-MAX_RESULTADOS:]
+        if self.feeds:
+            self.ultimo_id = self.feeds[-1].get("entry_id")
+            self.ultima_fecha = self.feeds[-1].get("created_at")
+        return nuevos
+
+    def datos(self, results):
+        return {"channel": self.channel, "feeds": self.feeds[-results:]}
+
+
+class ThingSpeakClient:
+    """Cliente compartido de ThingSpeak con caché TTL y refresco incremental"""
+
+    def __init__(self, base_url=API_URL, ttl=TTL, timeout=TIMEOUT, compartida=None):
+        self.base_url = base_url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.compartida = compartida
+        self.session = requests.Session()
+        reintentos = Retry(total=2, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+        self.session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=reintentos))
+        self.session.mount("http://", HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=reintentos))
+        self._canales = {}
+        self._lock = threading.Lock()
+
+    def _estado(self, channel_id):
+        with self._lock:
+            return self._canales.setdefault(str(channel_id), _EstadoCanal())
+
+    def _get(self, channel_id, params, api_key=None):
+        if api_key:
+            params = dict(params, api_key=api_key)
+        with medir("thingspeak:feeds", canal=str(channel_id)) as span:
+            response = self.session.get(
+                f"{self.base_url}/channels/{channel_id}/feeds.json", params=params, timeout=self.timeout
+            )
+            span.anotar(tamano=len(response.content), estado=response.status_code)
+            response.raise_for_status()
+            return response.json()
+
+    @staticmethod
+    def _inicio(created_at):
+        """Parámetro ``start`` (UTC) a partir del ``created_at`` de la última entrada"""
+        fecha = datetime.strptime(created_at, "%Y-%m-%dT%H:%M:%SZ")
+        return (fecha + timedelta(seconds=1)).strftime("%Y-%m-%d %H:%M:%S")
+
+    def refrescar(self, channel_id, results=60, api_key=None):
+        """Traer del servidor solo lo nuevo; devuelve la lista de entradas agregadas"""
+        estado = self._estado(channel_id)
+        with estado.lock:
+            return self._refrescar(estado, channel_id, results, api_key)
+
+    def _refrescar(self, estado, channel_id, results, api_key):
+        completo = estado.ultima_fecha is None or results > estado.pedidos
+        # Los canales con clave de lectura no se publican en la caché compartida
+        compartir = self.compartida is not None and not api_key
+        data = self._leer_compartido(channel_id, results) if compartir else None
+        publicar = data is None
+        if data is not None:
+            # Otra réplica ya consultó el canal dentro del TTL
+            pedidos = data["pedidos"]
+        elif completo:
+            # Carga inicial (o piden más historia de la que tenemos)
+            data = self._get(channel_id, {"results": min(results, MAX_RESULTADOS)}, api_key)
+            pedidos = results
+        else:
+            # Sin ``results`` ThingSpeak devuelve como mucho 100 entradas
+            data = self._get(channel_id, {"start": self._inicio(estado.ultima_fecha), "results": MAX_RESULTADOS},
+                             api_key)
+            if len(data.get("feeds") or []) >= MAX_RESULTADOS:
+                # Respuesta llena: puede faltar un tramo entre lo que teníamos y lo nuevo
+                completo, pedidos = True, estado.pedidos
+                data = self._get(channel_id, {"results": min(pedidos, MAX_RESULTADOS)}, api_key)
+        if completo:
+            estado.feeds, estado.ultimo_id, estado.ultima_fecha = [], None, None
+            estado.pedidos = pedidos
+        nuevos = estado.agregar(data)
+        estado.actualizado = time.monotonic()
+        if compartir and publicar:
+            self._publicar(channel_id, estado)
+        return nuevos
+
+    def _leer_compartido(self, channel_id, results):
+        try:
+            data = self.compartida.obtener(f"thingspeak:{channel_id}")
+        except Exception:
+            return None
+        if data is None or data["pedidos"] < results:
+            return None
+        return data
+
+    def _publicar(self, channel_id, estado):
+        try:
+            self.compartida.guardar(
+                f"thingspeak:{channel_id}",
+                {"channel": estado.channel, "feeds": estado.feeds, "pedidos": estado.pedidos},
+                self.ttl,
+            )
+        except Exception:
+            # Sin caché compartida cada réplica sigue con su propia copia
+            pass
+
+    def entradas_desde(self, channel_id, entry_id):
+        """Entradas en memoria posteriores a ``entry_id`` (sin llamar a la API)"""
+        estado = self._estado(channel_id)
+        with estado.lock:
+            if entry_id is None:
+                return list(estado.feeds)
+            return [f for f in estado.feeds if f.get("entry_id") is not None and f["entry_id"] > entry_id]
+
+    def feeds_rango(self, channel_id, start, end=None, api_key=None):
+        """Hasta 8000 entradas desde ``start`` (fechas UTC "YYYY-MM-DD HH:MM:SS"), sin caché"""
+        params = {"start": start, "results": MAX_RESULTADOS}
+        if end:
+            params["end"] = end
+        return self._get(channel_id, params, api_key)
+
+    def feeds(self, channel_id, results=60, api_key=None):
+        """Feeds del canal con todos sus campos, como los devuelve ``feeds.json``"""
+        estado = self._estado(channel_id)
+        with estado.lock:
+            vigente = time.monotonic() - estado.actualizado < self.ttl
+            registro.cache("thingspeak", vigente and results <= estado.pedidos)
+            if not vigente or results > estado.pedidos:
+                self._refrescar(estado, channel_id, results, api_key)
+            return estado.datos(results)
+
+
+class PollerCanal:
+    """Hilo de fondo que consulta un canal a intervalos, compartido por todas las sesiones.
+
+    Las sesiones en modo en vivo llaman a ``asegurar()`` y leen los puntos
+    nuevos con ``ThingSpeakClient.entradas_desde``; así N espectadores cuestan
+    una sola consulta a ThingSpeak por intervalo.
+    """
+
+    def __init__(self, client, channel_id, intervalo=INTERVALO_VIVO, inactividad=INACTIVIDAD_VIVO, results=60):
+        self.client = client
+        self.channel_id = channel_id
+        self.intervalo = intervalo
+        self.inactividad = inactividad
+        self.results = results
+        self.ultimo_error = None
+        self._ultimo_uso = 0.0
+        self._hilo = None
+        self._lock = threading.Lock()
+
+    def asegurar(self):
+        """Marcar uso y arrancar el hilo si no está corriendo"""
+        self._ultimo_uso = time.monotonic()
+        with self._lock:
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(
+                    target=self._ciclo, name=f"thingspeak-{self.channel_id}", daemon=True
+                )
+                self._hilo.start()
+
+    def _ciclo(self):
+        while time.monotonic() - self._ultimo_uso < self.inactividad:
+            try:
+                self.client.refrescar(self.channel_id, results=self.results)
+                self.ultimo_error = None
+            except Exception as e:
+                self.ultimo_error = e
+            time.sleep(self.intervalo)
+
+
+@st.cache_resource
+def get_thingspeak_client():
+    """Cliente de ThingSpeak único por proceso (cacheado entre reruns)"""
+    cache = get_cache_compartida()
+    return ThingSpeakClient(compartida=cache if cache.compartida else None)
+
+
+@st.cache_resource
+def get_poller(channel_id):
+    """Poller único por canal para todo el proceso"""
+    return PollerCanal(get_thingspeak_client(), channel_id)
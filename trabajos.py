@@ -0,0 +1,234 @@
+"""Cola de trabajos pesados en MongoDB, atendida por procesos trabajadores.
+
+El análisis de una imagen de drone ocupa la CPU durante segundos; hecho
+dentro del servidor de Streamlit compite con todas las sesiones de esa
+réplica. Con ``TRABAJOS_MODO=cola`` la app solo encola el trabajo (los bytes
+de entrada van a GridFS) y uno o más procesos ``python trabajos.py`` lo
+toman y dejan el resultado en GridFS:
+
+- El ``_id`` del trabajo es la clave de caché del análisis (hash de la imagen
+  y las opciones), así que pedir dos veces lo mismo no duplica trabajo.
+- Los trabajadores toman trabajos con ``find_one_and_update`` (de
+  ``pendiente`` a ``en_proceso``): nunca dos procesan el mismo.
+- Un trabajo en proceso por más de ``TRABAJOS_VENCIMIENTO`` segundos
+  (trabajador caído) se vuelve a tomar, hasta ``MAX_INTENTOS`` veces.
+- Los trabajos terminados se borran tras ``TRABAJOS_RETENCION`` segundos.
+
+Uso (solo con ``TRABAJOS_MODO=cola``; el procfile y render.yaml no levantan
+trabajadores por defecto, ver el bloque comentado de render.yaml)::
+
+    python trabajos.py --procesos 2
+"""
+import os
+import pickle
+import socket
+import time
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from drone import analizar_imagen, fuente_de_bytes
+
+COLECCION_TRABAJOS = "trabajos"
+# "local": se analiza en el servidor de la app; "cola": en los trabajadores
+MODO = os.environ.get("TRABAJOS_MODO", "local")
+# Espera entre consultas a la cola cuando no hay trabajos
+INTERVALO = float(os.environ.get("TRABAJOS_INTERVALO", "1"))
+VENCIMIENTO = float(os.environ.get("TRABAJOS_VENCIMIENTO", "600"))
+RETENCION = float(os.environ.get("TRABAJOS_RETENCION", "3600"))
+BACKOFF_MAX = float(os.environ.get("TRABAJOS_BACKOFF_MAX", "60"))
+MAX_INTENTOS = 3
+
+PENDIENTE, EN_PROCESO, LISTO, ERROR = "pendiente", "en_proceso", "listo", "error"
+
+# Tareas que saben ejecutar los trabajadores: tipo -> función(datos, **parametros)
+TAREAS = {}
+
+
+def tarea(tipo):
+    """Registrar una función como tarea de la cola"""
+    def registrar(funcion):
+        TAREAS[tipo] = funcion
+        return funcion
+    return registrar
+
+
+@tarea("drone:analizar")
+def _analizar_drone(datos, vista_previa=False, mapa=False):
+    with fuente_de_bytes(datos) as fuente:
+        return analizar_imagen(fuente, vista_previa=vista_previa, mapa=mapa)
+
+
+class ColaTrabajos:
+    """Trabajos en la colección ``trabajos``; entradas y resultados en su bucket GridFS"""
+
+    def __init__(self, db, coleccion=COLECCION_TRABAJOS, vencimiento=VENCIMIENTO):
+        import gridfs
+
+        self.coleccion = db[coleccion]
+        self.fs = gridfs.GridFS(db, collection=coleccion)
+        self.vencimiento = vencimiento
+
+    def asegurar_indices(self):
+        self.coleccion.create_index([("estado", 1), ("creado", 1)], name="estado_creado")
+
+    def _guardar_archivo(self, id_archivo, datos):
+        from gridfs.errors import FileExists
+
+        try:
+            self.fs.put(datos, _id=id_archivo)
+        except FileExists:
+            # Otra réplica lo subió al mismo tiempo; el contenido es el mismo
+            pass
+
+    def encolar(self, tipo, clave, datos, **parametros):
+        """Encolar ``datos`` para la tarea ``tipo`` con id ``clave`` (si no estaba ya)"""
+        actual = self.coleccion.find_one({"_id": clave}, {"estado": 1})
+        if actual is not None and actual["estado"] != ERROR:
+            return clave
+        self._guardar_archivo(f"{clave}:entrada", datos)
+        try:
+            self.coleccion.update_one(
+                {"_id": clave, "estado": {"$in": [None, ERROR]}},
+                {"$set": {"tipo": tipo, "parametros": parametros, "estado": PENDIENTE, "intentos": 0,
+                          "creado": time.time()},
+                 "$unset": {"error": "", "terminado": ""}},
+                upsert=actual is None,
+            )
+        except DuplicateKeyError:
+            # Otra réplica lo encoló entre la consulta y la escritura
+            pass
+        return clave
+
+    def estado(self, clave):
+        """Documento del trabajo (estado, intentos, error...) o None"""
+        return self.coleccion.find_one({"_id": clave}, {"parametros": 0})
+
+    def terminados(self, claves):
+        """Cuántos de los trabajos ``claves`` ya terminaron (bien o con error)"""
+        return self.coleccion.count_documents({"_id": {"$in": list(claves)}, "estado": {"$in": [LISTO, ERROR]}})
+
+    def resultado(self, clave):
+        return pickle.loads(self.fs.get(f"{clave}:resultado").read())
+
+    def tomar(self, trabajador):
+        """Reservar el trabajo pendiente más antiguo (o uno vencido); None si no hay"""
+        ahora = time.time()
+        return self.coleccion.find_one_and_update(
+            {"$or": [{"estado": PENDIENTE},
+                     {"estado": EN_PROCESO, "inicio": {"$lt": ahora - self.vencimiento}}],
+             "intentos": {"$lt": MAX_INTENTOS}},
+            {"$set": {"estado": EN_PROCESO, "trabajador": trabajador, "inicio": ahora}, "$inc": {"intentos": 1}},
+            sort=[("creado", 1)],
+            return_document=ReturnDocument.AFTER,
+        )
+
+    def procesar(self, trabajo):
+        """Ejecutar un trabajo tomado y dejar su resultado o su error"""
+        clave = trabajo["_id"]
+        try:
+            datos = self.fs.get(f"{clave}:entrada").read()
+            resultado = TAREAS[trabajo["tipo"]](datos, **trabajo["parametros"])
+        except Exception as e:
+            cambios = {"estado": ERROR, "error": str(e)[:500], "terminado": time.time()}
+        else:
+            self.fs.delete(f"{clave}:resultado")
+            self._guardar_archivo(f"{clave}:resultado", pickle.dumps(resultado, protocol=pickle.HIGHEST_PROTOCOL))
+            cambios = {"estado": LISTO, "terminado": time.time()}
+        # Si venció y lo tomó otro trabajador, su resultado es el que vale
+        self.coleccion.update_one({"_id": clave, "trabajador": trabajo["trabajador"], "inicio": trabajo["inicio"]},
+                                  {"$set": cambios})
+        return cambios["estado"] == LISTO
+
+    def liberar(self, trabajo):
+        """Devolver a pendiente un trabajo tomado que no se pudo terminar"""
+        self.coleccion.update_one({"_id": trabajo["_id"], "trabajador": trabajo["trabajador"],
+                                   "inicio": trabajo["inicio"], "estado": EN_PROCESO},
+                                  {"$set": {"estado": PENDIENTE}})
+
+    def mantenimiento(self, retencion=RETENCION):
+        """Marcar como error los trabajos abandonados y borrar los terminados antiguos"""
+        ahora = time.time()
+        self.coleccion.update_many(
+            {"$or": [{"estado": EN_PROCESO, "inicio": {"$lt": ahora - self.vencimiento}}, {"estado": PENDIENTE}],
+             "intentos": {"$gte": MAX_INTENTOS}},
+            {"$set": {"estado": ERROR, "error": "Ningún trabajador terminó el análisis", "terminado": ahora}},
+        )
+        viejos = [d["_id"] for d in self.coleccion.find(
+            {"estado": {"$in": [LISTO, ERROR]}, "terminado": {"$lt": ahora - retencion}}, {"_id": 1})]
+        for clave in viejos:
+            self.fs.delete(f"{clave}:entrada")
+            self.fs.delete(f"{clave}:resultado")
+        if viejos:
+            self.coleccion.delete_many({"_id": {"$in": viejos}})
+        return len(viejos)
+
+
+def trabajar(cola, trabajador, intervalo=INTERVALO, cada_mantenimiento=60):
+    """Atender la cola para siempre, con espera exponencial si MongoDB falla"""
+    fallos = 0
+    ultimo_mantenimiento = float("-inf")
+    while True:
+        try:
+            if time.monotonic() - ultimo_mantenimiento > cada_mantenimiento:
+                cola.mantenimiento()
+                ultimo_mantenimiento = time.monotonic()
+            trabajo = cola.tomar(trabajador)
+            fallos = 0
+        except Exception as e:
+            fallos += 1
+            espera = min(intervalo * 2 ** fallos, BACKOFF_MAX)
+            print(f"[{trabajador}] Error con MongoDB: {e}; reintento en {espera:.0f} s", flush=True)
+            time.sleep(espera)
+            continue
+        if trabajo is None:
+            time.sleep(intervalo)
+            continue
+        inicio = time.perf_counter()
+        try:
+            ok = cola.procesar(trabajo)
+        except Exception as e:
+            # Falló al guardar el resultado o el estado: se devuelve a la cola (o vence y se retoma)
+            print(f"[{trabajador}] Error al guardar {trabajo['_id'][:12]}: {e}", flush=True)
+            try:
+                cola.liberar(trabajo)
+            except Exception:
+                pass
+            time.sleep(min(intervalo * 2, BACKOFF_MAX))
+            continue
+        print(f"[{trabajador}] {trabajo['tipo']} {trabajo['_id'][:12]} "
+              f"{'listo' if ok else 'con error'} en {time.perf_counter() - inicio:.1f} s", flush=True)
+
+
+def _proceso(numero):
+    # Cada proceso abre su propio cliente de MongoDB (no se comparten tras el fork)
+    from mongo import MongoManager, base_datos, uri
+
+    cola = ColaTrabajos(MongoManager(uri, base_datos).db)
+    trabajar(cola, f"{socket.gethostname()}-{os.getpid()}-{numero}")
+
+
+if __name__ == "__main__":
+    import argparse
+    import multiprocessing
+
+    from mongo import MongoManager, base_datos, uri
+
+    parser = argparse.ArgumentParser(description="Trabajadores de la cola de análisis pesados")
+    parser.add_argument("--procesos", type=int, default=os.cpu_count() or 1,
+                        help="procesos trabajadores (por defecto, uno por núcleo)")
+    args = parser.parse_args()
+
+    manager = MongoManager(uri, base_datos)
+    ColaTrabajos(manager.db).asegurar_indices()
+    manager.close()
+
+    print(f"Atendiendo la cola '{COLECCION_TRABAJOS}' con {args.procesos} proceso(s)", flush=True)
+    if args.procesos == 1:
+        _proceso(0)
+    else:
+        procesos = [multiprocessing.Process(target=_proceso, args=(i,), daemon=True) for i in range(args.procesos)]
+        for p in procesos:
+            p.start()
+        for p in procesos:
+            p.join()